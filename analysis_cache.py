@@ -0,0 +1,326 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import chess
+
+try:
+    import fcntl
+except ImportError:  # Windows: merges aren't locked against each other
+    fcntl = None
+
+# On-disk transposition table shared between runs and processes.
+#
+# File layout: a 64-byte header, then bucket_count buckets of
+# SLOTS_PER_BUCKET slots. A slot is (check, data, score):
+#   data   uint64   move (16 bits: from | to << 6 | promotion << 12, NO_MOVE = none)
+#                   | depth << 16 | flag << 24
+#   score  float64  score in the transposition table's convention (mates relative to the node)
+#   check  uint64   position hash ^ data ^ score bits, so a slot half written by
+#                   another process, or one belonging to another position, fails to verify
+# The header holds the fingerprint of the evaluator whose scores the file
+# stores (see evaluator_fingerprint). A file of another evaluator, or of
+# another layout version, is never probed and gets replaced on the next
+# merge. Files only ever appear complete (built under a temporary name and
+# renamed into place), so readers never lock; writers take an exclusive
+# flock while merging.
+MAGIC = b"CAIC"
+VERSION = 2
+HEADER_FORMAT = "<4sIQIQ36x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SLOT_FORMAT = "<QQd"
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+SLOTS_PER_BUCKET = 4
+BUCKET_SIZE = SLOT_SIZE * SLOTS_PER_BUCKET
+NO_MOVE = 0xFFFF
+
+DEFAULT_SIZE_MB = 64
+MIN_DEPTH = 2  # shallower entries are cheaper to search again than to look up
+
+
+def key_hash(key):
+    """Stable 64-bit hash of a board._transposition_key() (Python's hash() differs between processes)."""
+    pawns, knights, bishops, rooks, queens, kings, white, black, turn, castling, ep = key
+    data = struct.pack("<9Qbb", pawns, knights, bishops, rooks, queens, kings, white, black, castling,
+                       bool(turn), -1 if ep is None else ep)
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def evaluator_fingerprint(evaluator):
+    """64-bit id of an evaluator and its weights: a hash of its fingerprint(), or of its class without one."""
+    fingerprint = getattr(evaluator, "fingerprint", None)
+    if fingerprint is not None:
+        text = fingerprint()
+    else:
+        text = f"{type(evaluator).__module__}.{type(evaluator).__qualname__}"
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def encode_move(move):
+    if move is None:
+        return NO_MOVE
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(value):
+    if value == NO_MOVE:
+        return None
+    return chess.Move(value & 63, value >> 6 & 63, value >> 12 or None)
+
+
+def _check(h, data, score):
+    return h ^ data ^ struct.unpack("<Q", struct.pack("<d", score))[0]
+
+
+def _same_file(f, path):
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class AnalysisCache:
+    """Fixed-size on-disk table of (position -> depth, score, flag, best move).
+
+    Nothing is read at startup: the file is memory-mapped on the first
+    probe and the OS pages in only the buckets that get used. merge()
+    writes a transposition table back under a file lock, so several
+    processes can share one file. fingerprint (evaluator_fingerprint of
+    the evaluator behind the scores) must match the file's for it to be
+    used at all.
+    """
+
+    def __init__(self, path, size_mb=DEFAULT_SIZE_MB, min_depth=MIN_DEPTH, fingerprint=0):
+        self.path = path
+        self.size_mb = size_mb
+        self.min_depth = min_depth
+        self.fingerprint = fingerprint
+        self.map = None
+        self.bucket_count = 0
+        self.file_fingerprint = None  # of the mapped file, None if it isn't a current analysis cache
+        self.opened = False
+        self.probes = 0
+        self.hits = 0
+
+    def _open(self):
+        self.opened = True
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                    return
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return
+        self.bucket_count, self.file_fingerprint = self._read_header(self.map)
+
+    def _read_header(self, data):
+        """(bucket count, fingerprint); the fingerprint is None for a file of another version or a truncated one."""
+        magic, version, bucket_count, slots, fingerprint = struct.unpack_from(HEADER_FORMAT, data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not an analysis cache")
+        if version != VERSION or slots != SLOTS_PER_BUCKET:
+            return 0, None
+        if len(data) < HEADER_SIZE + bucket_count * BUCKET_SIZE:
+            return 0, None
+        return bucket_count, fingerprint
+
+    @property
+    def usable(self):
+        """Whether the mapped file holds scores of this cache's evaluator."""
+        return self.map is not None and self.file_fingerprint == self.fingerprint
+
+    def probe(self, key):
+        """(depth, score, flag, move) stored for a transposition key, or None."""
+        if not self.opened:
+            self._open()
+        if not self.usable:
+            return None
+        self.probes += 1
+        h = key_hash(key)
+        offset = HEADER_SIZE + (h % self.bucket_count) * BUCKET_SIZE
+        for slot in range(SLOTS_PER_BUCKET):
+            check, data, score = struct.unpack_from(SLOT_FORMAT, self.map, offset + slot * SLOT_SIZE)
+            if check and check == _check(h, data, score):
+                self.hits += 1
+                return (data >> 16 & 0xFF, score, data >> 24 & 0xFF, decode_move(data & 0xFFFF))
+        return None
+
+    def _create(self, f):
+        bucket_count = max(1, self.size_mb * 1024 * 1024 // BUCKET_SIZE)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, bucket_count, SLOTS_PER_BUCKET, self.fingerprint))
+        f.truncate(HEADER_SIZE + bucket_count * BUCKET_SIZE)  # sparse: unused buckets read as zeros
+        f.flush()
+
+    def _replace(self):
+        # A new empty file under the same name, complete before it shows up
+        # there; processes that still have the old one mapped keep reading it
+        # instead of seeing it change
+        fd, new_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".",
+                                        prefix=os.path.basename(self.path) + ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._create(f)
+            os.replace(new_path, self.path)
+        except BaseException:
+            os.unlink(new_path)
+            raise
+
+    def merge(self, table):
+        """Writes the entries of a transposition table {key: (depth, score, flag, move)}; returns how many.
+
+        A slot of the same position is replaced by an entry at least as
+        deep; otherwise the bucket's empty or shallowest slot is taken if
+        it isn't deeper than the new entry.
+        """
+        entries = [(key, entry) for key, entry in table.items() if entry[0] >= self.min_depth]
+        if not entries:
+            return 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        written = 0
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            self._replace()
+            return self.merge(table)
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                if not _same_file(f, self.path):
+                    # Another merge replaced the file while we waited for the lock
+                    return self.merge(table)
+                if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+                    self._replace()
+                    return self.merge(table)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE) as data:
+                    bucket_count, fingerprint = self._read_header(data)
+                    if fingerprint != self.fingerprint:
+                        # Scores of another evaluator (or layout), or a broken
+                        # file: start over rather than mix them with ours
+                        data.close()
+                        self._replace()
+                        return self.merge(table)
+                    for key, (depth, score, flag, move) in entries:
+                        h = key_hash(key)
+                        offset = HEADER_SIZE + (h % bucket_count) * BUCKET_SIZE
+                        replace = None
+                        shallowest = shallowest_depth = None
+                        for slot in range(SLOTS_PER_BUCKET):
+                            slot_offset = offset + slot * SLOT_SIZE
+                            check, old_data, old_score = struct.unpack_from(SLOT_FORMAT, data, slot_offset)
+                            if check == 0:
+                                slot_depth = -1
+                            elif check == _check(h, old_data, old_score):
+                                # Same position: replace it or keep it, never store it twice
+                                replace = slot_offset if depth >= old_data >> 16 & 0xFF else False
+                                break
+                            else:
+                                slot_depth = old_data >> 16 & 0xFF
+                            if shallowest_depth is None or slot_depth < shallowest_depth:
+                                shallowest, shallowest_depth = slot_offset, slot_depth
+                        if replace is None and shallowest_depth <= depth:
+                            replace = shallowest
+                        if not replace:
+                            continue
+                        packed = encode_move(move) | min(depth, 0xFF) << 16 | flag << 24
+                        score = float(score)
+                        struct.pack_into(SLOT_FORMAT, data, replace, _check(h, packed, score), packed, score)
+                        written += 1
+                    data.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        # Pick up a file created by this merge on the next probe
+        if not self.usable:
+            self.close()
+        return written
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.map = None
+        self.opened = False
+
+    def info(self):
+        """Size and fill of the file (samples up to 10000 buckets)."""
+        if not self.opened:
+            self._open()
+        if self.map is None:
+            return {"path": self.path, "exists": os.path.exists(self.path), "entries": 0}
+        if self.file_fingerprint is None:
+            return {"path": self.path, "exists": True, "entries": 0,
+                    "note": "old version or truncated, replaced on the next merge"}
+        sample = min(self.bucket_count, 10000)
+        step = self.bucket_count / sample
+        used = 0
+        for index in range(sample):
+            offset = HEADER_SIZE + int(index * step) * BUCKET_SIZE
+            for slot in range(SLOTS_PER_BUCKET):
+                if struct.unpack_from("<Q", self.map, offset + slot * SLOT_SIZE)[0]:
+                    used += 1
+        capacity = self.bucket_count * SLOTS_PER_BUCKET
+        return {
+            "path": self.path,
+            "exists": True,
+            "bytes": len(self.map),
+            "fingerprint": f"{self.file_fingerprint:016x}",
+            "matches_evaluator": self.file_fingerprint == self.fingerprint,
+            "capacity": capacity,
+            "fill": round(used / (sample * SLOTS_PER_BUCKET), 4),
+            "entries": int(used / (sample * SLOTS_PER_BUCKET) * capacity),
+        }
+
+
+def time_to_depth(engine, board, depth):
+    # Empty in-memory tables, without merging them into the cache like clear()
+    engine.transposition_table.clear()
+    engine.eval_cache.clear()
+    start = time.perf_counter()
+    _, _, stats = engine.search(board.copy(), depth)
+    return time.perf_counter() - start, stats.nodes
+
+
+def main():
+    import minmax
+
+    parser = argparse.ArgumentParser(description="Inspect the persistent analysis cache or measure what it saves.")
+    parser.add_argument("path", help="cache file")
+    parser.add_argument("--bench", action="store_true",
+                        help="search the positions cold, merge, then search them again warm")
+    parser.add_argument("--fen", action="append", help="benchmark position (repeatable, default: start position)")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=DEFAULT_SIZE_MB, help="size of a new cache file")
+    args = parser.parse_args()
+
+    if args.bench:
+        boards = [chess.Board(fen) for fen in args.fen or [chess.STARTING_FEN]]
+        engine = minmax.Engine()
+        cold = 0.0
+        for board in boards:
+            elapsed, nodes = time_to_depth(engine, board, args.depth)
+            cold += elapsed
+            print(f"cold {board.fen()}: {elapsed:.2f}s, {nodes} nodes")
+            cache = AnalysisCache(args.path, args.size_mb, fingerprint=evaluator_fingerprint(engine.evaluator))
+            print(f"  merged {cache.merge(engine.transposition_table)} entries")
+        warm = 0.0
+        for board in boards:
+            cache = engine.open_persistent_cache(args.path, args.size_mb)
+            elapsed, nodes = time_to_depth(engine, board, args.depth)
+            warm += elapsed
+            print(f"warm {board.fen()}: {elapsed:.2f}s, {nodes} nodes, {cache.hits}/{cache.probes} cache hits")
+            engine.close_persistent_cache(merge=False)
+        print(f"time to depth {args.depth}: cold {cold:.2f}s, warm {warm:.2f}s")
+
+    fingerprint = evaluator_fingerprint(minmax.Engine().evaluator)
+    for name, value in AnalysisCache(args.path, args.size_mb, fingerprint=fingerprint).info().items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
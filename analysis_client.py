@@ -0,0 +1,117 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+from analysis_server import DEFAULT_PORT
+
+# Positions the load test cycles through
+LOAD_TEST_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2PP1N2/PP3PPP/RNBQ1RK1 w - - 0 7",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+    "8/5k2/8/3P4/8/8/5K2/8 w - - 0 1",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 b - - 3 10",
+]
+
+
+class AnalysisClient:
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, timeout=300):
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _post(self, path, payload=None):
+        data = json.dumps(payload or {}).encode()
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def analyse(self, fen, depth=None, movetime=None, nodes=None, multipv=1, request_id=None):
+        payload = {"fen": fen, "multipv": multipv}
+        if depth is not None:
+            payload["depth"] = depth
+        if movetime is not None:
+            payload["movetime"] = movetime
+        if nodes is not None:
+            payload["nodes"] = nodes
+        if request_id is not None:
+            payload["id"] = request_id
+        return self._post("/analyse", payload)
+
+    def cancel(self, request_id):
+        return self._post(f"/cancel/{request_id}")
+
+    def status(self):
+        with urllib.request.urlopen(self.base_url + "/status", timeout=self.timeout) as response:
+            return json.load(response)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def load_test(client, requests, concurrency, depth=None, movetime=None, multipv=1):
+    """Sends requests analysis requests from concurrency threads; returns the latencies in seconds."""
+    latencies = []
+    errors = []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def run():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            fen = LOAD_TEST_FENS[index % len(LOAD_TEST_FENS)]
+            start = time.perf_counter()
+            try:
+                client.analyse(fen, depth=depth, movetime=movetime, multipv=multipv)
+            except OSError as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=run) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or load-test the local analysis server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fen", help="analyse one position and print the result")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--movetime", type=int, help="milliseconds")
+    parser.add_argument("--multipv", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=50, help="load test: number of requests")
+    parser.add_argument("--concurrency", type=int, default=4, help="load test: parallel clients")
+    args = parser.parse_args()
+
+    client = AnalysisClient(args.host, args.port)
+    if args.fen:
+        print(json.dumps(client.analyse(args.fen, args.depth, args.movetime, multipv=args.multipv), indent=2))
+        return
+
+    start = time.perf_counter()
+    latencies, errors = load_test(client, args.requests, args.concurrency, args.depth, args.movetime, args.multipv)
+    elapsed = time.perf_counter() - start
+    print(f"{len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.2f} req/s), {len(errors)} errors")
+    print(f"latency p50 {percentile(latencies, 50) * 1000:.0f} ms  p99 {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"server: {client.status()}")
+
+
+if __name__ == "__main__":
+    main()
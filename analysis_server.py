@@ -0,0 +1,275 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+DEFAULT_DEPTH = 3
+MAX_MULTIPV = 10
+
+
+# --- Worker process ---
+
+def worker_main(conn, cancel_event, cache=None):
+    """Runs in a worker process: keeps the engine warm and answers search requests."""
+    import chess
+    import minmax
+
+    engine = minmax.Engine()
+    if cache:
+        engine.open_persistent_cache(cache)
+    engine.search(chess.Board(), 1)  # warm up imports and caches before the first request
+
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            try:
+                result = analyse(request, cancel_event, chess, minmax, engine)
+            except Exception as e:
+                # Report it and stay alive for the next request
+                result = {"error": f"{type(e).__name__}: {e}", "lines": [], "bestmove": None, "time_ms": 0}
+            conn.send(result)
+    finally:
+        # Worker processes skip atexit handlers
+        engine.close_persistent_cache()
+
+
+def analyse(request, cancel_event, chess, minmax, engine):
+    board = chess.Board(request["fen"])
+    start = time.perf_counter()
+    control = minmax.SearchControl(max_nodes=request.get("nodes"))
+    control.stop_event = cancel_event
+    if request.get("movetime"):
+        control.deadline = time.perf_counter() + request["movetime"] / 1000
+
+    # All lines come from one search sharing its iterative deepening and hash table
+    _, _, stats = engine.search(board, request["depth"], control, multipv=request["multipv"])
+    lines = [{
+        "move": move.uci(),
+        "score": round(score, 4),
+        "depth": stats.depth,
+        "pv": [m.uci() for m in pv],
+    } for move, score, pv in stats.lines]
+
+    return {
+        "bestmove": lines[0]["move"] if lines else None,
+        "score": lines[0]["score"] if lines else None,
+        "pv": lines[0]["pv"] if lines else [],
+        "lines": lines,
+        "nodes": stats.nodes,
+        "time_ms": int((time.perf_counter() - start) * 1000),
+        "cancelled": cancel_event.is_set(),
+    }
+
+
+# --- Scheduling in the server process ---
+
+class Job:
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.done = threading.Event()
+        self.result = None
+        self.cancelled = False
+        self.worker = None
+        self.queued_at = time.perf_counter()
+
+
+class WorkerHandle:
+    """A worker process plus the server thread that feeds it jobs."""
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.spawn()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def spawn(self):
+        self.cancel_event = multiprocessing.Event()
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main,
+                                               args=(child_conn, self.cancel_event, self.pool.cache), daemon=True)
+        self.process.start()
+        child_conn.close()  # so recv() sees EOF when the process dies
+
+    def search(self, request):
+        """The worker's result for request; a worker that dies on it is replaced."""
+        try:
+            self.conn.send(request)
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.conn.close()
+            self.process.join(timeout=5)
+            exitcode = self.process.exitcode
+            self.spawn()
+            return {"error": f"worker {self.index} died (exit code {exitcode}) and was restarted",
+                    "lines": [], "bestmove": None, "time_ms": 0}
+
+    def run(self):
+        while True:
+            job = self.pool.jobs.get()
+            if job is None:
+                self.conn.send(None)
+                return
+            with self.pool.lock:
+                if job.cancelled:
+                    continue  # finished by cancel()
+                self.cancel_event.clear()
+                job.worker = self
+            result = self.search(job.request)
+            result["queue_ms"] = int((time.perf_counter() - job.queued_at) * 1000) - result["time_ms"]
+            with self.pool.lock:
+                job.worker = None
+                job.result = result
+                self.pool.active.pop(job.id, None)
+                self.pool.completed += 1
+            job.done.set()
+
+
+class WorkerPool:
+    """Warm engine workers fed from one FIFO queue."""
+
+    def __init__(self, workers, cache=None):
+        self.cache = cache  # persistent analysis cache file shared by the workers
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.active = {}  # job id -> Job, queued or running
+        self.completed = 0
+        self.ids = itertools.count(1)
+        self.workers = [WorkerHandle(self, index) for index in range(workers)]
+
+    def submit(self, request, job_id=None):
+        with self.lock:
+            job_id = str(job_id) if job_id is not None else str(next(self.ids))
+            if job_id in self.active:
+                raise ValueError(f"Request id already in use: {job_id}")
+            job = Job(job_id, request)
+            self.active[job_id] = job
+        self.jobs.put(job)
+        return job
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.active.pop(str(job_id), None)
+            if job is None:
+                return False
+            job.cancelled = True
+            if job.worker is not None:
+                job.worker.cancel_event.set()
+                return True
+            # Still queued: answer now instead of when a worker gets to it
+            job.result = {"cancelled": True, "lines": [], "bestmove": None}
+        job.done.set()
+        return True
+
+    def status(self):
+        with self.lock:
+            running = sum(1 for job in self.active.values() if job.worker is not None)
+            return {
+                "workers": len(self.workers),
+                "running": running,
+                "queued": len(self.active) - running,
+                "completed": self.completed,
+            }
+
+    def shutdown(self):
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.thread.join(timeout=5)
+            worker.process.join(timeout=5)
+
+
+def parse_request(body):
+    """Validates a JSON analysis request and fills in the defaults."""
+    import chess
+    import minmax
+
+    data = json.loads(body or b"{}")
+    fen = data.get("fen", chess.STARTING_FEN)
+    chess.Board(fen)  # raises ValueError for a bad FEN
+    depth = int(data.get("depth", DEFAULT_DEPTH if not data.get("movetime") else minmax.MAX_DEPTH))
+    if not 1 <= depth <= minmax.MAX_DEPTH:
+        raise ValueError(f"depth must be between 1 and {minmax.MAX_DEPTH}")
+    request = {
+        "fen": fen,
+        "depth": depth,
+        "movetime": int(data["movetime"]) if data.get("movetime") else None,
+        "nodes": int(data["nodes"]) if data.get("nodes") else None,
+        "multipv": max(1, min(MAX_MULTIPV, int(data.get("multipv", 1)))),
+    }
+    return request, data.get("id")
+
+
+# --- HTTP front-end ---
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    pool = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self.send_json(200, self.pool.status())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/analyse":
+            try:
+                request, job_id = parse_request(body)
+                job = self.pool.submit(request, job_id)
+            except (ValueError, TypeError) as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            job.done.wait()
+            self.send_json(500 if "error" in job.result else 200, dict(job.result, id=job.id))
+        elif self.path.startswith("/cancel/"):
+            job_id = self.path[len("/cancel/"):]
+            self.send_json(200, {"id": job_id, "cancelled": self.pool.cancel(job_id)})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analysis server with warm engine workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", help="persistent analysis cache file, shared between runs")
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.workers, args.cache)
+    AnalysisHandler.pool = pool
+    server = ThreadingHTTPServer((args.host, args.port), AnalysisHandler)
+    print(f"Analysing on http://{args.host}:{args.port} with {args.workers} workers")
+    print("POST /analyse {fen, depth, movetime, nodes, multipv, id}  POST /cancel/<id>  GET /status")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+DEFAULT_DEPTH = 2
+QUEUE_SIZE_PER_WORKER = 16   # positions queued per worker before the reader waits
+PENDING_GAMES_PER_WORKER = 8  # games read ahead of the writer per worker
+MAX_CACHE_ENTRIES = 200_000  # finished positions remembered for deduplication
+CHECKPOINT_EVERY = 10  # games between checkpoints
+PROGRESS_EVERY = 5.0  # seconds between progress lines
+
+
+# --- Worker process ---
+
+def worker_main(tasks, results, depth, cache=None):
+    """Runs in a worker process: analyses (hash, fen) tasks until it gets None."""
+    import minmax
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the main process
+    engine = minmax.Engine()
+    if cache:
+        engine.open_persistent_cache(cache)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        key, fen = task
+        results.put((key, analyse(chess.Board(fen), depth, engine)))
+    # Worker processes skip atexit handlers
+    engine.close_persistent_cache()
+
+
+def analyse(board, depth, engine):
+    """Static MinMax score and the engine's best move, both scored from white's point of view."""
+    static = engine.evaluator.evaluate_board(board)
+    if board.is_game_over():
+        return {"static": round(static, 4), "score": round(static, 4), "best": None, "depth": 0}
+    best_move, score, stats = engine.search(board, depth)
+    if board.turn == chess.BLACK:
+        score = -score
+    return {"static": round(static, 4), "score": round(score, 4), "best": best_move.uci(), "depth": stats.depth}
+
+
+# --- Games waiting for their positions ---
+
+class PendingGame:
+    def __init__(self, index, game, end_offset):
+        self.index = index
+        self.game = game
+        self.end_offset = end_offset  # input position right after this game, for the checkpoint
+        self.nodes = [game] + list(game.mainline())  # node i holds the position before move i + 1
+        self.keys = [chess.polyglot.zobrist_hash(node.board()) for node in self.nodes]
+        self.results = {}
+        self.missing = set(self.keys)
+
+    def fill(self, key, result):
+        if key in self.missing:
+            self.missing.discard(key)
+            self.results[key] = result
+
+    def done(self):
+        return not self.missing
+
+
+def annotate_game(pending):
+    """Adds [%eval] comments and the engine's preferred move to the game; returns the JSONL records."""
+    records = []
+    nodes = pending.nodes
+    for ply, node in enumerate(nodes):
+        result = pending.results[pending.keys[ply]]
+        board = node.board()
+        played = nodes[ply + 1].move if ply + 1 < len(nodes) else None
+        records.append({
+            "game": pending.index,
+            "ply": ply,
+            "fen": board.fen(),
+            "move": played.uci() if played else None,
+            "best": result["best"],
+            "score": result["score"],
+            "static": result["static"],
+            "depth": result["depth"],
+        })
+        if ply == 0:
+            continue
+        comment = f"[%eval {format_eval(result['score'])}]"
+        before = pending.results[pending.keys[ply - 1]]
+        if before["best"] and before["best"] != node.move.uci():
+            comment += f" best: {nodes[ply - 1].board().san(chess.Move.from_uci(before['best']))}"
+        node.comment = (node.comment + " " + comment).strip() if node.comment else comment
+    return records
+
+
+def format_eval(score):
+    """A %eval value: pawns, or #N / #-N for a mate in N for white / black."""
+    import minmax
+
+    moves = minmax.mate_in(score)
+    if moves is not None:
+        return f"#{int(moves)}"
+    return f"{score:.2f}"
+
+
+# --- Checkpoints ---
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def open_output(path, size):
+    """Opens an output for appending, cut back to size (what the checkpoint saw) when resuming."""
+    if path is None:
+        return None
+    f = open(path, "a+", encoding="utf-8")
+    f.truncate(size)
+    f.seek(size)
+    return f
+
+
+# --- Pipeline ---
+
+class Annotator:
+    """Streams games from a PGN file through a pool of worker processes.
+
+    The reader keeps at most a few games per worker in flight and blocks on
+    the bounded task queue, so memory stays flat however big the archive
+    is. A position already analysed (same Zobrist hash) or already queued
+    is not sent again. Games are written in input order as soon as all
+    their positions are back, and a checkpoint records how far input and
+    outputs got.
+    """
+
+    def __init__(self, workers, depth, pgn_out, jsonl_out, checkpoint_path, checkpoint, quiet=False, cache=None):
+        self.depth = depth
+        self.pgn_out = pgn_out
+        self.jsonl_out = jsonl_out
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = checkpoint
+        self.quiet = quiet
+
+        self.tasks = multiprocessing.Queue(maxsize=workers * QUEUE_SIZE_PER_WORKER)
+        self.results = multiprocessing.Queue()
+        self.processes = [multiprocessing.Process(target=worker_main, args=(self.tasks, self.results, depth, cache), daemon=True)
+                          for _ in range(workers)]
+        for process in self.processes:
+            process.start()
+        self.max_pending = workers * PENDING_GAMES_PER_WORKER
+
+        self.cache = {}  # zobrist hash -> result
+        self.waiting = {}  # zobrist hash -> games waiting for it
+        self.pending = collections.deque()
+        self.positions = 0  # positions in the games read
+        self.analysed = 0  # positions actually searched
+        self.start = time.perf_counter()
+        self.last_progress = self.start
+
+    def run(self, pgn):
+        index = self.checkpoint["games"]
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            self.add_game(PendingGame(index, game, pgn.tell()))
+            index += 1
+            while len(self.pending) >= self.max_pending:
+                self.collect(block=True)
+        while self.pending:
+            self.collect(block=True)
+        self.save()
+
+    def add_game(self, pending):
+        self.pending.append(pending)
+        self.positions += len(pending.keys)
+        for node, key in zip(pending.nodes, pending.keys):
+            if key not in pending.missing:
+                continue
+            result = self.cache.get(key)
+            if result is not None:
+                pending.fill(key, result)
+            elif key in self.waiting:
+                self.waiting[key].append(pending)
+            else:
+                self.waiting[key] = [pending]
+                self.submit((key, node.board().fen()))
+        self.write_finished()
+
+    def submit(self, task):
+        # Never block on a full task queue without draining results, or the
+        # workers could stall on the result queue
+        while True:
+            try:
+                self.tasks.put(task, timeout=0.05)
+                return
+            except queue.Full:
+                self.collect(block=False)
+
+    def collect(self, block):
+        try:
+            key, result = self.results.get(timeout=0.05 if block else 0.001)
+        except queue.Empty:
+            return
+        while True:
+            self.analysed += 1
+            if len(self.cache) >= MAX_CACHE_ENTRIES:
+                self.cache.clear()
+            self.cache[key] = result
+            for pending in self.waiting.pop(key, ()):
+                pending.fill(key, result)
+            try:
+                key, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+        self.write_finished()
+        self.progress()
+
+    def write_finished(self):
+        written = False
+        while self.pending and self.pending[0].done():
+            pending = self.pending.popleft()
+            records = annotate_game(pending)
+            if self.pgn_out is not None:
+                print(pending.game, file=self.pgn_out, end="\n\n")
+            if self.jsonl_out is not None:
+                for record in records:
+                    self.jsonl_out.write(json.dumps(record) + "\n")
+            self.checkpoint["games"] = pending.index + 1
+            self.checkpoint["offset"] = pending.end_offset
+            written = True
+            if self.checkpoint["games"] % CHECKPOINT_EVERY == 0:
+                self.save()
+        return written
+
+    def save(self):
+        for out, field in ((self.pgn_out, "pgn_size"), (self.jsonl_out, "jsonl_size")):
+            if out is not None:
+                out.flush()
+                self.checkpoint[field] = out.tell()
+        if self.checkpoint_path:
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def rate(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return self.positions / elapsed, self.analysed / elapsed
+
+    def progress(self):
+        now = time.perf_counter()
+        if self.quiet or now - self.last_progress < PROGRESS_EVERY:
+            return
+        self.last_progress = now
+        positions_rate, analysed_rate = self.rate()
+        print(f"{self.checkpoint['games']} games, {self.positions} positions ({positions_rate:.1f}/s), "
+              f"{self.analysed} searched ({analysed_rate:.1f}/s)", file=sys.stderr)
+
+    def close(self, interrupted=False):
+        if interrupted:
+            # Queued positions are thrown away; don't wait to flush them to the workers
+            self.tasks.cancel_join_thread()
+        else:
+            for _ in self.processes:
+                self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=0 if interrupted else 5)
+            if process.is_alive():
+                process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate a PGN archive with MinMax scores and engine best moves.")
+    parser.add_argument("pgn", help="input PGN file")
+    parser.add_argument("--out", help="annotated PGN output")
+    parser.add_argument("--jsonl", help="one JSON record per position")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <out or jsonl>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--cache", help="persistent analysis cache file, shared between runs")
+    args = parser.parse_args()
+    if not args.out and not args.jsonl:
+        parser.error("give --out and/or --jsonl")
+
+    checkpoint_path = args.checkpoint or (args.out or args.jsonl) + ".checkpoint"
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path)
+    if checkpoint is not None and (checkpoint.get("pgn") != os.path.abspath(args.pgn) or checkpoint.get("depth") != args.depth):
+        parser.error(f"{checkpoint_path} belongs to another run; use --restart or another --checkpoint")
+    if checkpoint is None:
+        checkpoint = {"pgn": os.path.abspath(args.pgn), "depth": args.depth, "games": 0, "offset": 0,
+                      "pgn_size": 0, "jsonl_size": 0}
+    elif not args.quiet:
+        print(f"Resuming after game {checkpoint['games']}", file=sys.stderr)
+
+    pgn_out = open_output(args.out, checkpoint["pgn_size"])
+    jsonl_out = open_output(args.jsonl, checkpoint["jsonl_size"])
+    annotator = Annotator(args.workers, args.depth, pgn_out, jsonl_out, checkpoint_path, checkpoint, args.quiet, args.cache)
+    games_before = checkpoint["games"]
+    interrupted = False
+    try:
+        with open(args.pgn, encoding="utf-8-sig", errors="replace") as pgn:
+            pgn.seek(checkpoint["offset"])
+            annotator.run(pgn)
+    except KeyboardInterrupt:
+        interrupted = True
+        # Outputs past the last checkpoint are cut off again on resume
+        print("Interrupted; rerun the same command to resume from the last checkpoint", file=sys.stderr)
+    finally:
+        annotator.close(interrupted)
+        for out in (pgn_out, jsonl_out):
+            if out is not None:
+                out.close()
+
+    elapsed = time.perf_counter() - annotator.start
+    positions_rate, analysed_rate = annotator.rate()
+    print(f"{checkpoint['games'] - games_before} games, {annotator.positions} positions in {elapsed:.1f}s: "
+          f"{positions_rate:.1f} positions/s, {annotator.analysed} searched ({analysed_rate:.1f}/s) "
+          f"with {args.workers} workers", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
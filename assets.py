@@ -0,0 +1,102 @@
+import os
+import pygame
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(BASE_DIR, "images")
+
+# Scaled piece images are written here as raw RGBA so later launches skip
+# PNG decoding and scaling. Set to None to disable the disk cache.
+PIECE_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "pieces")
+
+PIECE_NAMES = [color + piece for color in ['w', 'b'] for piece in ['P', 'R', 'N', 'B', 'Q', 'K']]
+
+_piece_images = {}  # square size -> {name: surface}
+_fonts = {}
+
+
+def get_display(size, caption):
+    """Returns the one display surface, resizing the window only when needed."""
+    if not pygame.get_init():
+        pygame.init()
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != tuple(size):
+        screen = pygame.display.set_mode(size)
+    pygame.display.set_caption(caption)
+    return screen
+
+
+def get_font(name, size, bold=False):
+    key = (name, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+    return font
+
+
+def _load_cached_piece(name, size):
+    if PIECE_CACHE_DIR is None:
+        return None
+    path = os.path.join(PIECE_CACHE_DIR, f"{size}", f"{name}.rgba")
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if os.path.getmtime(path) < os.path.getmtime(os.path.join(IMAGE_DIR, f"{name}.png")):
+            return None
+        return pygame.image.frombytes(data, (size, size), "RGBA")
+    except (OSError, ValueError):
+        return None
+
+
+def _store_cached_piece(name, size, img):
+    if PIECE_CACHE_DIR is None:
+        return
+    directory = os.path.join(PIECE_CACHE_DIR, f"{size}")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{name}.rgba"), "wb") as f:
+            f.write(pygame.image.tobytes(img, "RGBA"))
+    except OSError:
+        pass
+
+
+def get_piece_images(square_size):
+    """Piece surfaces scaled to square_size, loaded once per process."""
+    pieces = _piece_images.get(square_size)
+    if pieces is not None:
+        return pieces
+
+    pieces = {}
+    for name in PIECE_NAMES:
+        img = _load_cached_piece(name, square_size)
+        if img is None:
+            try:
+                img = pygame.image.load(os.path.join(IMAGE_DIR, f"{name}.png"))
+                img = pygame.transform.scale(img, (square_size, square_size))
+                _store_cached_piece(name, square_size, img)
+            except pygame.error:
+                print(f"Error loading image: images/{name}.png. Make sure the 'images' folder exists and contains all piece images.")
+                # Fallback for missing images
+                img = pygame.Surface((square_size, square_size))
+                img.fill((100, 100, 100)) # Gray square as placeholder
+        if pygame.display.get_surface() is not None:
+            img = img.convert_alpha()
+        pieces[name] = img
+    _piece_images[square_size] = pieces
+    return pieces
+
+
+_text_surfaces = {}
+MAX_TEXT_SURFACES = 512
+
+
+def render_text(font, text, color):
+    """Antialiased text surface, rendered once per (font, text, color)."""
+    key = (id(font), text, tuple(color))
+    surface = _text_surfaces.get(key)
+    if surface is None:
+        if len(_text_surfaces) >= MAX_TEXT_SURFACES:
+            _text_surfaces.clear()
+        surface = _text_surfaces[key] = font.render(text, True, color)
+    return surface
@@ -0,0 +1,265 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import chess
+
+# Fixed benchmark positions: (name, category, fen). Changing this list
+# invalidates stored baselines; add positions rather than edit them.
+POSITIONS = [
+    ("start", "opening", chess.STARTING_FEN),
+    ("italian", "opening", "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4"),
+    ("kiwipete", "middlegame", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1P/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("qgd", "middlegame", "r1bq1rk1/pp1nbppp/2p1pn2/3p2B1/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 7"),
+    ("rook_pawns", "endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+    ("lucena", "endgame", "1K1k4/1P6/8/8/8/8/r7/2R5 w - - 0 1"),
+    ("back_rank", "tactical", "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1"),
+    ("wac001", "tactical", "2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1"),
+]
+CATEGORIES = ("opening", "middlegame", "endgame", "tactical")
+
+DEFAULT_DEPTH = 3
+DEFAULT_EVAL_ITERATIONS = 300  # evaluate_board calls per position
+DEFAULT_NPS_TOLERANCE = 0.2  # allowed drop in evals/s and nodes/s (timings are noisy, see --repeat)
+DEFAULT_NODES_TOLERANCE = 0.02  # allowed growth of the node count to a fixed depth
+
+
+def machine_info():
+    """Where and on what code the numbers were measured."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "host": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "system": f"{platform.system()} {platform.release()}",
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "python_chess": chess.__version__,
+    }
+
+
+def bench_eval(evaluator, board, iterations):
+    """evaluate_board calls per second on one position (no eval cache in the way)."""
+    evaluator.evaluate_board(board)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        evaluator.evaluate_board(board)
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed > 0 else 0.0
+
+
+def bench_search(create_engine, board, depth, repeat):
+    """Fixed-depth search from empty tables; timings are the fastest of repeat runs.
+
+    Node counts don't depend on the machine, so they're taken from the first
+    run and only checked to stay the same in the others.
+    """
+    result = None
+    for _ in range(repeat):
+        engine = create_engine()
+        best_move, score, stats = engine.search(board.copy(), depth)
+        time_to_depth = []
+        elapsed = 0.0
+        for iteration in stats.iterations:
+            elapsed += iteration["elapsed"]
+            time_to_depth.append(round(elapsed, 6))
+        run = {
+            "best_move": best_move.uci() if best_move else None,
+            "score": score,
+            "depth": stats.depth,
+            "nodes": stats.nodes,
+            "elapsed": round(stats.elapsed, 6),
+            "nps": stats.nps,
+            "time_to_depth": time_to_depth,
+        }
+        if result is None:
+            result = run
+        elif run["nodes"] != result["nodes"]:
+            raise RuntimeError(f"{board.fen()}: {run['nodes']} nodes, the first run searched {result['nodes']}")
+        elif run["elapsed"] < result["elapsed"]:
+            result.update(elapsed=run["elapsed"], nps=run["nps"], time_to_depth=run["time_to_depth"])
+    return result
+
+
+def run_benchmark(depth=DEFAULT_DEPTH, eval_iterations=DEFAULT_EVAL_ITERATIONS, repeat=1, categories=CATEGORIES,
+                  create_engine=None, log=print):
+    """Runs the benchmark positions of the given categories; returns the results dict."""
+    import minmax
+    from analysis_cache import evaluator_fingerprint
+
+    if create_engine is None:
+        create_engine = minmax.Engine
+    evaluator = create_engine().evaluator
+    positions = {}
+    for name, category, fen in POSITIONS:
+        if category not in categories:
+            continue
+        board = chess.Board(fen)
+        evals_per_sec = bench_eval(evaluator, board, eval_iterations)
+        search = bench_search(create_engine, board, depth, repeat)
+        positions[name] = dict(category=category, fen=fen, evals_per_sec=round(evals_per_sec, 1), **search)
+        if log:
+            log(f"{name:12} {category:10} {evals_per_sec:9.0f} evals/s {search['nodes']:9} nodes "
+                f"{search['nps']:7} nps {search['elapsed']:7.2f}s  {search['best_move']} {search['score']:+.2f}")
+    return {
+        "machine": machine_info(),
+        "settings": {"depth": depth, "eval_iterations": eval_iterations, "repeat": repeat,
+                     "evaluator": type(evaluator).__name__,
+                     "evaluator_fingerprint": f"{evaluator_fingerprint(evaluator):016x}"},
+        "positions": positions,
+        "categories": summarize(positions),
+    }
+
+
+def summarize(positions):
+    """Per-category and overall throughput: total work over total time."""
+    groups = {}
+    for result in positions.values():
+        groups.setdefault(result["category"], []).append(result)
+    groups["total"] = list(positions.values())
+    summary = {}
+    for category, results in groups.items():
+        nodes = sum(result["nodes"] for result in results)
+        elapsed = sum(result["elapsed"] for result in results)
+        # Mean time per evaluation, weighted the same for every position
+        eval_time = sum(1 / result["evals_per_sec"] for result in results if result["evals_per_sec"])
+        summary[category] = {
+            "positions": len(results),
+            "nodes": nodes,
+            "elapsed": round(elapsed, 6),
+            "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+            "evals_per_sec": round(len(results) / eval_time, 1) if eval_time else 0.0,
+        }
+    return summary
+
+
+def compare(results, baseline, nps_tolerance=DEFAULT_NPS_TOLERANCE, nodes_tolerance=DEFAULT_NODES_TOLERANCE,
+            time_tolerance=None):
+    """Compares results to a baseline; returns (report lines, regressions).
+
+    Throughput (evals/s, nodes/s) is compared per category, where a single
+    short search can't swing it much; node counts per position. Time to
+    depth is only checked when time_tolerance is given. A baseline of
+    another depth or evaluator isn't comparable at all.
+    """
+    lines = []
+    regressions = []
+    if results["settings"]["depth"] != baseline["settings"]["depth"]:
+        regressions.append(f"baseline was searched to depth {baseline['settings']['depth']}, "
+                           f"these results to {results['settings']['depth']}")
+        return lines, regressions
+    # Other weights or another network search other trees: same class isn't enough
+    ours, theirs = results["settings"], baseline["settings"]
+    if ours.get("evaluator_fingerprint") != theirs.get("evaluator_fingerprint"):
+        regressions.append(f"baseline was measured with another evaluator ({theirs.get('evaluator')} "
+                           f"{theirs.get('evaluator_fingerprint', 'without a fingerprint, save it again')}), "
+                           f"these results with {ours.get('evaluator')} {ours.get('evaluator_fingerprint')}")
+        return lines, regressions
+    ours, theirs = results["machine"], baseline["machine"]
+    if (ours["host"], ours["processor"], ours["python"]) != (theirs["host"], theirs["processor"], theirs["python"]):
+        lines.append(f"note: baseline is from {theirs['host']} ({theirs['processor'] or theirs['machine']}, "
+                     f"{theirs['python']}), throughput may not be comparable")
+
+    def check(label, value, reference, tolerance, higher_is_better):
+        if not reference:
+            return
+        change = value / reference - 1
+        regressed = tolerance is not None and (change < -tolerance if higher_is_better else change > tolerance)
+        lines.append(f"{label:40} {reference:>12.6g} -> {value:>12.6g} {change * 100:+7.1f}%"
+                     f"{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(f"{label}: {reference:.6g} -> {value:.6g} ({change * 100:+.1f}%)")
+
+    for category, summary in results["categories"].items():
+        reference = baseline["categories"].get(category)
+        if reference is None:
+            continue
+        check(f"{category} evals/s", summary["evals_per_sec"], reference["evals_per_sec"], nps_tolerance, True)
+        check(f"{category} nodes/s", summary["nps"], reference["nps"], nps_tolerance, True)
+    for name, result in results["positions"].items():
+        reference = baseline["positions"].get(name)
+        if reference is None:
+            lines.append(f"{name}: not in the baseline")
+            continue
+        if reference["fen"] != result["fen"]:
+            regressions.append(f"{name}: the baseline has a different position")
+            continue
+        check(f"{name} nodes", result["nodes"], reference["nodes"], nodes_tolerance, False)
+        check(f"{name} time to depth {result['depth']}", result["elapsed"], reference["elapsed"], time_tolerance, False)
+        if result["best_move"] != reference["best_move"]:
+            lines.append(f"{name}: best move {reference['best_move']} -> {result['best_move']}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark evaluation and search speed on fixed positions and compare to a baseline.")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--eval-iterations", type=int, default=DEFAULT_EVAL_ITERATIONS,
+                        help="evaluate_board calls per position")
+    parser.add_argument("--repeat", type=int, default=1, help="searches per position, the fastest one counts")
+    parser.add_argument("--category", action="append", choices=CATEGORIES, help="only these categories (repeatable)")
+    parser.add_argument("--nnue", help="benchmark the network in this file (see nnue.py) instead of MinMax")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="baseline JSON to compare against (a file written by --out)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead")
+    parser.add_argument("--nps-tolerance", type=float, default=DEFAULT_NPS_TOLERANCE,
+                        help="allowed relative drop in evals/s and nodes/s")
+    parser.add_argument("--nodes-tolerance", type=float, default=DEFAULT_NODES_TOLERANCE,
+                        help="allowed relative growth of node counts")
+    parser.add_argument("--time-tolerance", type=float,
+                        help="allowed relative growth of time to depth (default: not checked)")
+    args = parser.parse_args()
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline")
+
+    create_engine = None
+    if args.nnue:
+        import minmax
+        from nnue import NNUE
+
+        network = NNUE(args.nnue)
+
+        def create_engine():
+            return minmax.Engine(network)
+    results = run_benchmark(args.depth, args.eval_iterations, max(1, args.repeat), args.category or CATEGORIES,
+                            create_engine)
+    for category, summary in results["categories"].items():
+        print(f"{category:10} {summary['evals_per_sec']:9.0f} evals/s {summary['nodes']:9} nodes "
+              f"{summary['nps']:7} nps {summary['elapsed']:7.2f}s")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote baseline {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline, args.nps_tolerance, args.nodes_tolerance, args.time_tolerance)
+        print(f"\nagainst {args.baseline} (commit {baseline['machine'].get('commit')}):")
+        for line in lines:
+            print(line)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
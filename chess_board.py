@@ -1,10 +1,12 @@
 import pygame
+import assets
+from renderer import BoardRenderer
 from game import ChessGame
-from evaluations import MinMax
+from position_info import PositionInfo
+import game_events
+from game_events import wait_events
 import chess
 
-pygame.init()
-
 # --- Constants for colors and dimensions ---
 WIDTH, HEIGHT = 640, 700
 SQUARE_SIZE = WIDTH // 8
@@ -29,85 +31,56 @@ TEXT_COLOR_LOSS = (150, 0, 0) # Dark red for loss message
 TEXT_COLOR_DRAW = (100, 100, 100) # Grey for draw message
 
 INFO_PANEL_BG = (70, 70, 70) # Dark grey background for the info panel
+PANEL_RECT = pygame.Rect(0, WIDTH, WIDTH, INFO_PANEL_HEIGHT)
 
 # --- Pygame Setup ---
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Enhanced Chess GUI")
-
-# Load images
+# The display, piece images and fonts come from the shared asset cache in setup(),
+# so the main menu can switch to this mode without reloading them.
+screen = None
 pieces = {}
-for color in ['w', 'b']:
-    for piece in ['P', 'R', 'N', 'B', 'Q', 'K']:
-        try:
-            img = pygame.image.load(f"images/{color}{piece}.png")
-            img = pygame.transform.scale(img, (SQUARE_SIZE, SQUARE_SIZE))
-            pieces[color + piece] = img
-        except pygame.error:
-            print(f"Error loading image: images/{color}{piece}.png. Make sure the 'images' folder exists and contains all piece images.")
-            # Fallback for missing images (you might want a placeholder)
-            pieces[color + piece] = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
-            pieces[color + piece].fill((100, 100, 100)) # Gray square as placeholder
-
-# --- Font Setup ---
-pygame.font.init() # Initialize font module
-FONT_DEFAULT = pygame.font.SysFont("Arial", 28, bold=True)
-FONT_SCORE = pygame.font.SysFont("Arial", 36, bold=True) # Slightly smaller score font
-FONT_MESSAGE = pygame.font.SysFont("Arial", 48, bold=True)
+FONT_DEFAULT = None
+FONT_SCORE = None
+FONT_MESSAGE = None
+
+def setup():
+    global screen, pieces, FONT_DEFAULT, FONT_SCORE, FONT_MESSAGE
+    screen = assets.get_display((WIDTH, HEIGHT), "Enhanced Chess GUI")
+    pieces = assets.get_piece_images(SQUARE_SIZE)
+    FONT_DEFAULT = assets.get_font("Arial", 28, bold=True)
+    FONT_SCORE = assets.get_font("Arial", 36, bold=True) # Slightly smaller score font
+    FONT_MESSAGE = assets.get_font("Arial", 48, bold=True)
 
 # --- Drawing Functions ---
 
 def draw_turn_info(game):
     turn_text = "White's Turn" if game.is_white_turn() else "Black's Turn"
-    text_surface = FONT_DEFAULT.render(turn_text, True, TEXT_COLOR_WHITE)
+    text_surface = assets.render_text(FONT_DEFAULT, turn_text, TEXT_COLOR_WHITE)
 
     # Position the turn info in the info panel (centered)
     text_rect = text_surface.get_rect(center=(WIDTH // 2, WIDTH + INFO_PANEL_HEIGHT // 2))
     screen.blit(text_surface, text_rect)
 
-def game_score(game):
-    minmax = MinMax()
-    score = minmax.evaluate_board(game.board)
-
-    # Determine score text color
-    if score > 0:
-        score_color = TEXT_COLOR_WIN
-    elif score < 0:
-        score_color = TEXT_COLOR_LOSS
+def game_score(game, position_info):
+    # Computed in the background; until it arrives the panel shows a placeholder
+    info = position_info.get(game.board)
+    if info is None:
+        score_text, score_color = "Score: ...", TEXT_COLOR_WHITE
     else:
-        score_color = TEXT_COLOR_WHITE # Neutral for zero score
+        # Determine score text color
+        if info.score > 0:
+            score_color = TEXT_COLOR_WIN
+        elif info.score < 0:
+            score_color = TEXT_COLOR_LOSS
+        else:
+            score_color = TEXT_COLOR_WHITE # Neutral for zero score
+        score_text = f"Score: {info.score:.1f}" # Format score to one decimal place
 
-    score_text = f"Score: {score:.1f}" # Format score to one decimal place
-    text_surface = FONT_SCORE.render(score_text, True, score_color)
+    text_surface = assets.render_text(FONT_SCORE, score_text, score_color)
 
     # NEW POSITION: Top-left of the info panel, with some padding
     text_rect = text_surface.get_rect(midleft=(20, WIDTH + INFO_PANEL_HEIGHT // 2)) # 20px from left edge
     screen.blit(text_surface, text_rect)
 
-def highlight_square(square, color):
-    """Draws a semi-transparent colored overlay on a square."""
-    s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA) # Create a surface with alpha channel
-    s.fill(color)
-    row = 7 - chess.square_rank(square)
-    col = chess.square_file(square)
-    screen.blit(s, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-
-def highlight_legal_move(square, is_capture):
-    """Highlights legal moves, differentiating between empty squares and captures."""
-    if is_capture:
-        highlight_square(square, HIGHLIGHT_CAPTURE)
-    else:
-        # Draw a small transparent circle in the center for empty squares
-        row = 7 - chess.square_rank(square)
-        col = chess.square_file(square)
-        center_x = col * SQUARE_SIZE + SQUARE_SIZE // 2
-        center_y = row * SQUARE_SIZE + SQUARE_SIZE // 2
-        
-        # Outer darker circle for subtle depth
-        pygame.draw.circle(screen, HIGHLIGHT_LEGAL_MOVE_DOT, (center_x, center_y), SQUARE_SIZE // 4)
-        # Inner colored circle
-        pygame.draw.circle(screen, HIGHLIGHT_LEGAL_MOVE_RING, (center_x, center_y), SQUARE_SIZE // 5)
-
-
 def display_message(screen, message, result_type):
     """Displays game over messages with a semi-transparent overlay."""
     # Draw a semi-transparent overlay over the entire screen
@@ -130,25 +103,26 @@ def display_message(screen, message, result_type):
     screen.blit(text_surface, text_rect)
     pygame.display.flip()
 
-def draw_board(game):
-    """Draws the chessboard and pieces."""
-    colors = [pygame.Color(BOARD_LIGHT), pygame.Color(BOARD_DARK)]
-    for row in range(8):
-        for col in range(8):
-            color = colors[(row + col) % 2]
-            pygame.draw.rect(screen, color, pygame.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-            
-            # Get the chess.square object
-            square = chess.square(col, 7 - row) # chess.square expects file, then rank (col, row from bottom)
-            
-            piece = game.get_piece_at(square)
-            if piece:
-                color_letter = 'w' if piece.color == chess.WHITE else 'b'
-                img = pieces[color_letter + piece.symbol().upper()]
-                screen.blit(img, pygame.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    
-    # Draw a strong border around the board
-    pygame.draw.rect(screen, BOARD_BORDER_COLOR, (0, 0, WIDTH, WIDTH), 3) # (x, y, width, height), thickness
+def create_renderer():
+    return BoardRenderer(screen, SQUARE_SIZE, pieces, BOARD_LIGHT, BOARD_DARK, BOARD_BORDER_COLOR,
+                         dot_colors=[HIGHLIGHT_LEGAL_MOVE_DOT, HIGHLIGHT_LEGAL_MOVE_RING])
+
+def draw_board(renderer, game, selected_square, legal_moves_for_selected):
+    """Draws the chessboard, pieces and highlights, repainting only the squares that changed."""
+    overlays = []
+    dots = set()
+    # Highlight king if in check
+    if game.is_check():
+        overlays.append((game.get_king_square(game.board.turn), CHECK_HIGHLIGHT))
+    if selected_square is not None:
+        overlays.append((selected_square, HIGHLIGHT_SELECTED))
+        for move in legal_moves_for_selected:
+            # Captures get a red overlay, empty squares a dot
+            if game.get_piece_at(move.to_square) is not None:
+                overlays.append((move.to_square, HIGHLIGHT_CAPTURE))
+            else:
+                dots.add(move.to_square)
+    renderer.draw(game.board, overlays, dots)
 
 # Convert mouse click to square
 def get_square(pos):
@@ -159,55 +133,68 @@ def get_square(pos):
     return chess.square(col, row)
 
 # --- Main Game Loop ---
-def main():
+def run(on_first_frame=None):
+    """Plays until the window is closed (returns "quit") or Escape is pressed (returns "menu").
+
+    The loop sleeps in pygame.event.wait() between input events, so an idle
+    board costs no CPU.
+    """
     game = ChessGame()
-    clock = pygame.time.Clock()
+    renderer = create_renderer()
+    panel_position = None # Position the info panel was last drawn for; None forces a full redraw
+    position_info = PositionInfo(on_update=lambda: game_events.post(game_events.PANEL_READY))
+    game_over = False
     running = True
+    exit_action = "quit"
     selected_square = None
     legal_moves_for_selected = [] # Store chess.Move objects or target squares
 
     while running:
-        # Check for game over
-        if game.is_game_over():
+        # Check for game over; the board resets when the GAME_RESTART timer fires
+        if not game_over and game.is_game_over():
             result = game.get_result()
             display_message(screen, "Game Over! " + result, result)
-            pygame.time.wait(3000) # Wait 3 seconds
-            game.reset() # Reset the game for a new round
-            selected_square = None
-            legal_moves_for_selected = []
+            game_over = True
+            game_events.start_restart_timer()
 
         # Drawing sequence
-        screen.fill(INFO_PANEL_BG) # Fill the entire screen with a consistent background
-
-        draw_board(game)
-
-        # Highlight king if in check
-        if game.is_check():
-            check_square = game.get_king_square(game.board.turn)
-            highlight_square(check_square, CHECK_HIGHLIGHT)
-        
-       
-        if selected_square is not None:
-            highlight_square(selected_square, HIGHLIGHT_SELECTED)
-            
-            for move in legal_moves_for_selected:
-                target_square = move.to_square
-                is_capture = game.get_piece_at(target_square) is not None # Check if target square has a piece
-                highlight_legal_move(target_square, is_capture)
-
-        
-        draw_turn_info(game)
-        game_score(game) 
-
-        pygame.display.flip()
-        clock.tick(60) 
+        if not game_over:
+            if panel_position is None:
+                screen.fill(INFO_PANEL_BG) # Fill the entire screen with a consistent background
+                renderer.invalidate()
+
+            draw_board(renderer, game, selected_square, legal_moves_for_selected)
+
+            # The info panel only changes with the position or when its evaluation arrives
+            panel_rects = []
+            if (game.fen(), position_info.generation) != panel_position:
+                pygame.draw.rect(screen, INFO_PANEL_BG, PANEL_RECT)
+                draw_turn_info(game)
+                game_score(game, position_info)
+                panel_position = (game.fen(), position_info.generation)
+                panel_rects.append(PANEL_RECT)
+
+            renderer.present(panel_rects)
+        if on_first_frame is not None:
+            on_first_frame()
+            on_first_frame = None
 
       
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                exit_action = "menu"
+                running = False
 
-            elif event.type == pygame.MOUSEBUTTONDOWN:
+            elif event.type == game_events.GAME_RESTART:
+                game.reset() # Reset the game for a new round
+                selected_square = None
+                legal_moves_for_selected = []
+                panel_position = None
+                game_over = False
+
+            elif event.type == pygame.MOUSEBUTTONDOWN and not game_over:
                 square = get_square(pygame.mouse.get_pos())
                 piece = game.get_piece_at(square)
 
@@ -216,9 +203,7 @@ def main():
                     if piece and piece.color == game.board.turn:
                         selected_square = square
                         # Get legal moves for the selected piece
-                        legal_moves_for_selected = [
-                            move for move in game.board.legal_moves if move.from_square == selected_square
-                        ]
+                        legal_moves_for_selected = game.moves_from(selected_square)
                 else:
                  
                     move_made = False
@@ -232,9 +217,7 @@ def main():
                     
                         if piece and piece.color == game.board.turn:
                             selected_square = square
-                            legal_moves_for_selected = [
-                                move for move in game.board.legal_moves if move.from_square == selected_square
-                            ]
+                            legal_moves_for_selected = game.moves_from(selected_square)
                         else: 
                             selected_square = None
                             legal_moves_for_selected = []
@@ -242,6 +225,14 @@ def main():
                         selected_square = None
                         legal_moves_for_selected = []
 
+    game_events.stop_timers()
+    position_info.close()
+    renderer.report("Player vs Player")
+    return exit_action
+
+def main():
+    setup()
+    run()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,251 @@
+import argparse
+import json
+import random
+import time
+
+import chess
+
+from evaluations import phase_name
+
+# Terms of MinMax.evaluate_board that get timed. get_piece_value is left out on
+# purpose: it is called once per piece and wrapping it costs more than it does.
+PROFILED_TERMS = (
+    "evaluate_checkmate_or_draw",
+    "game_phase",
+    "evaluate_piece_squares",
+    "evaluate_pawn_structure",
+    "evaluate_mobility",
+    "evaluate_center_control",
+    "evaluate_king_safety_combined",
+    "evaluate_blocked_bishops",
+    "check_connected_rooks",
+    "evaluate_rook_movement",
+    "evaluate_passed_pawns",
+    "evaluate_attacks",
+)
+
+ROOT = "evaluate_board"
+TERMINAL_PHASE = "Terminal"  # evaluate_board returned before asking for the phase
+MAX_SAMPLES = 10000  # durations kept per (phase, term) for the percentiles
+
+
+class TermStats:
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+        self.samples = []
+
+    def add(self, elapsed, self_time):
+        self.calls += 1
+        self.total += elapsed
+        self.self_time += self_time
+        # Reservoir sampling keeps the percentiles honest once the cap is hit
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(elapsed)
+        else:
+            index = random.randrange(self.calls)
+            if index < MAX_SAMPLES:
+                self.samples[index] = elapsed
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.total += other.total
+        self.self_time += other.self_time
+        self.samples.extend(other.samples[:MAX_SAMPLES - len(self.samples)])
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class EvalProfiler:
+    """Times the individual terms of a MinMax evaluator.
+
+    install() shadows the profiled methods with timing wrappers on the
+    evaluator instance and uninstall() deletes them again, so an evaluator
+    that is not being profiled runs the plain class methods. Only one
+    evaluate_board call out of every sample_every is timed.
+    """
+
+    def __init__(self, evaluator, sample_every=1):
+        self.evaluator = evaluator
+        self.sample_every = max(1, int(sample_every))
+        self.evaluations = 0
+        self.sampled_evaluations = 0
+        self.stats = {}  # (phase, term) -> TermStats
+        self.stacks = {}  # collapsed stack -> self time in seconds
+        self._sampling = False
+        self._stack = []
+        self._child_time = []
+        self._pending = []
+        self._phase = None
+
+    def install(self):
+        for name in PROFILED_TERMS:
+            setattr(self.evaluator, name, self._wrap(name, getattr(type(self.evaluator), name).__get__(self.evaluator)))
+        self.evaluator.evaluate_board = self._wrap_root(type(self.evaluator).evaluate_board.__get__(self.evaluator))
+
+    def uninstall(self):
+        for name in PROFILED_TERMS + (ROOT,):
+            self.evaluator.__dict__.pop(name, None)
+
+    def reset(self):
+        self.evaluations = 0
+        self.sampled_evaluations = 0
+        self.stats.clear()
+        self.stacks.clear()
+
+    def _wrap(self, name, func):
+        profiler = self
+        perf_counter = time.perf_counter
+
+        def timed(*args):
+            if not profiler._sampling:
+                return func(*args)
+            profiler._stack.append(name)
+            profiler._child_time.append(0.0)
+            start = perf_counter()
+            try:
+                result = func(*args)
+            finally:
+                elapsed = perf_counter() - start
+                child_time = profiler._child_time.pop()
+                path = tuple(profiler._stack)
+                profiler._stack.pop()
+                profiler._child_time[-1] += elapsed
+                profiler._pending.append((name, path, elapsed, elapsed - child_time))
+            if name == "game_phase":
+                profiler._phase = phase_name(result)
+            return result
+
+        return timed
+
+    def _wrap_root(self, func):
+        profiler = self
+        perf_counter = time.perf_counter
+
+        def timed_evaluate_board(board):
+            profiler.evaluations += 1
+            if profiler._sampling or profiler.evaluations % profiler.sample_every:
+                return func(board)
+            profiler._sampling = True
+            profiler._phase = None
+            profiler._stack.append(ROOT)
+            profiler._child_time.append(0.0)
+            start = perf_counter()
+            try:
+                return func(board)
+            finally:
+                elapsed = perf_counter() - start
+                child_time = profiler._child_time.pop()
+                profiler._stack.pop()
+                profiler._sampling = False
+                profiler._pending.append((ROOT, (ROOT,), elapsed, elapsed - child_time))
+                profiler._flush()
+
+        return timed_evaluate_board
+
+    def _flush(self):
+        phase = self._phase or TERMINAL_PHASE
+        self.sampled_evaluations += 1
+        for name, path, elapsed, self_time in self._pending:
+            term = self.stats.get((phase, name))
+            if term is None:
+                term = self.stats[(phase, name)] = TermStats()
+            term.add(elapsed, self_time)
+            stack = ";".join((ROOT, phase) + path[1:])
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + self_time
+        self._pending.clear()
+
+    def term_totals(self):
+        """Per-term statistics summed over all phases."""
+        totals = {}
+        for (_, name), term in self.stats.items():
+            totals.setdefault(name, TermStats()).merge(term)
+        return totals
+
+    def to_dict(self):
+        def describe(term):
+            return {
+                "calls": term.calls,
+                "total_ms": round(term.total * 1000, 3),
+                "self_ms": round(term.self_time * 1000, 3),
+                "mean_us": round(term.total / term.calls * 1e6, 2) if term.calls else 0.0,
+                "p50_us": round(term.percentile(50) * 1e6, 2),
+                "p90_us": round(term.percentile(90) * 1e6, 2),
+                "p99_us": round(term.percentile(99) * 1e6, 2),
+            }
+
+        phases = {}
+        for (phase, name), term in self.stats.items():
+            phases.setdefault(phase, {})[name] = describe(term)
+        return {
+            "evaluations": self.evaluations,
+            "sampled_evaluations": self.sampled_evaluations,
+            "sample_every": self.sample_every,
+            "terms": {name: describe(term) for name, term in self.term_totals().items()},
+            "phases": phases,
+        }
+
+    def report(self):
+        """Human readable table of the terms, most expensive first."""
+        totals = self.term_totals()
+        root_total = totals[ROOT].total if ROOT in totals else 0.0
+        lines = [
+            f"{self.sampled_evaluations} of {self.evaluations} evaluations sampled (1 in {self.sample_every})",
+            f"{'term':32} {'calls':>8} {'total ms':>10} {'share':>7} {'p50 us':>9} {'p99 us':>9}",
+        ]
+        for name, term in sorted(totals.items(), key=lambda item: -item[1].total):
+            share = term.total / root_total * 100 if root_total else 0.0
+            lines.append(
+                f"{name:32} {term.calls:>8} {term.total * 1000:>10.2f} {share:>6.1f}%"
+                f" {term.percentile(50) * 1e6:>9.1f} {term.percentile(99) * 1e6:>9.1f}"
+            )
+        phase_totals = {}
+        for (phase, name), term in self.stats.items():
+            if name == ROOT:
+                phase_totals[phase] = term
+        for phase, term in sorted(phase_totals.items()):
+            lines.append(f"{phase}: {term.calls} evaluations, {term.total * 1000:.2f} ms")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Writes folded stacks (self time in microseconds) for flamegraph.pl or speedscope."""
+        with open(path, "w") as f:
+            for stack, self_time in sorted(self.stacks.items()):
+                f.write(f"{stack} {max(1, int(self_time * 1e6))}\n")
+
+
+def main():
+    from minmax import Engine
+
+    parser = argparse.ArgumentParser(description="Profile the evaluation terms during a search.")
+    parser.add_argument("--fen", action="append", help="position to search (repeatable, default: start position)")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--sample-every", type=int, default=1, help="time one evaluation out of N")
+    parser.add_argument("--json", help="write the statistics as JSON to this file")
+    parser.add_argument("--collapsed", help="write folded stacks for a flamegraph to this file")
+    args = parser.parse_args()
+
+    engine = Engine()
+    profiler = engine.evaluator.enable_profiling(args.sample_every)
+    try:
+        for fen in args.fen or [chess.STARTING_FEN]:
+            engine.find_best_move(chess.Board(fen), args.depth)
+    finally:
+        engine.evaluator.disable_profiling()
+
+    print(profiler.report())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(profiler.to_dict(), f, indent=2)
+    if args.collapsed:
+        profiler.write_collapsed(args.collapsed)
+
+
+if __name__ == "__main__":
+    main()
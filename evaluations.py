@@ -1,12 +1,163 @@
 import chess
+import json
 import math
+import os
+
+from see import see
+
+# The evaluation is tapered: every term has a middlegame and an endgame
+# weight, blended by the integer game phase (PHASE_MAX with all minor and
+# major pieces on the board, 0 with none left), so nothing jumps when a
+# piece comes off.
+PHASE_WEIGHTS = {chess.KNIGHT: 1, chess.BISHOP: 1, chess.ROOK: 2, chess.QUEEN: 4}
+PHASE_MAX = 24
+
+# evaluate_board is the dot product of features() with the weights: one
+# FEATURE_NAMES entry per term and phase. tune_eval.py writes tuned weights
+# to WEIGHTS_FILE, which every MinMax loads at startup when it exists.
+TERMS = (
+    "pawn", "knight", "bishop", "rook", "queen",
+    "piece_squares",  # PIECE_SQUARE_TABLES
+    "pawn_structure", "mobility", "center_control",
+    "king_safety", "blocked_bishops", "connected_rooks", "rook_files", "passed_pawns",
+    "attacks",
+)
+FEATURE_NAMES = tuple(f"{term}_mg" for term in TERMS) + tuple(f"{term}_eg" for term in TERMS)
+
+_MATERIAL = {"pawn": 1, "knight": 3, "bishop": 3, "rook": 5, "queen": 9}
+_MIDDLEGAME = {"piece_squares": 1, "pawn_structure": 0.8, "mobility": 0.1, "center_control": 0.7,
+               "king_safety": 1.5, "blocked_bishops": 1.0, "connected_rooks": 0.4, "rook_files": 0.3,
+               "passed_pawns": 0, "attacks": 0.6}
+_ENDGAME = dict(_MIDDLEGAME, king_safety=0, blocked_bishops=0, connected_rooks=0, rook_files=0, passed_pawns=2.0)
+DEFAULT_WEIGHTS = dict(
+    [(f"{term}_mg", value) for term, value in list(_MATERIAL.items()) + list(_MIDDLEGAME.items())]
+    + [(f"{term}_eg", value) for term, value in list(_MATERIAL.items()) + list(_ENDGAME.items())]
+)
+
+
+def phase_name(phase):
+    """Rough name of an integer phase, for display and profiles."""
+    if phase >= 16:
+        return "Middlegame"
+    if phase > 6:
+        return "Transition"
+    return "Endgame"
+
+
+def _build_piece_square_tables():
+    """(middlegame, endgame) 64-entry tables per piece type, from white's side.
+
+    They hold the square bonuses that used to be separate phase-specific
+    terms, with those terms' weights already applied: developed minor
+    pieces and central knights, knight outposts, e4/d4 pawns and castled
+    kings in the middlegame; pawns close to promotion and king
+    centralization in the endgame.
+    """
+    tables = {piece_type: ([0.0] * 64, [0.0] * 64) for piece_type in chess.PIECE_TYPES}
+    central_squares = [chess.E4, chess.E5, chess.D4, chess.D5, chess.C4, chess.C5, chess.F4, chess.F5]
+    for square in chess.SQUARES:
+        rank = chess.square_rank(square)
+        file = chess.square_file(square)
+
+        knight_mg, knight_eg = tables[chess.KNIGHT]
+        bishop_mg, bishop_eg = tables[chess.BISHOP]
+        if square not in (chess.B1, chess.G1, chess.C1, chess.F1):
+            knight_mg[square] += 0.2
+            bishop_mg[square] += 0.2
+        if square in (chess.C3, chess.F3, chess.D2, chess.E2):
+            knight_mg[square] += 0.1
+        if rank == 4 and 1 < file < 6:
+            knight_mg[square] += 0.3 * 0.7
+        elif rank == 5:
+            knight_mg[square] += 0.5 * 0.7
+        elif rank == 6:
+            knight_mg[square] += 1.5 * 0.7
+
+        pawn_mg, pawn_eg = tables[chess.PAWN]
+        if square in (chess.E4, chess.D4):
+            pawn_mg[square] += 0.5
+        pawn_eg[square] += {1: 2, 2: 1, 3: 0.5}.get(7 - rank, 0) * 1.5
+
+        king_mg, king_eg = tables[chess.KING]
+        if square == chess.G1:
+            king_mg[square] += 0.3 * 1.5
+        elif square == chess.C1:
+            king_mg[square] += 0.2 * 1.5
+        king_eg[square] -= min(chess.square_distance(square, center) for center in central_squares) * 0.15 * 0.5
+    return tables
+
+
+PIECE_SQUARE_TABLES = _build_piece_square_tables()
+
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_weights.json")
+
+
+def load_weights(path=None):
+    """Weights in FEATURE_NAMES order; names missing from the file keep their default.
+
+    A bare term name (without _mg/_eg) sets both phases. Without a path
+    WEIGHTS_FILE is used if it exists, else the defaults.
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    if path is None:
+        path = WEIGHTS_FILE
+        if not os.path.exists(path):
+            return [weights[name] for name in FEATURE_NAMES]
+    with open(path) as f:
+        data = json.load(f)
+    for name, value in data.get("weights", data).items():
+        names = [f"{name}_mg", f"{name}_eg"] if name in TERMS else [name]
+        for name in names:
+            if name not in weights:
+                raise ValueError(f"{path}: unknown evaluation feature {name!r}")
+            weights[name] = float(value)
+    return [weights[name] for name in FEATURE_NAMES]
+
+
+def save_weights(path, weights, **info):
+    data = dict(info, weights={name: round(float(value), 6) for name, value in zip(FEATURE_NAMES, weights)})
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
 
 class MinMax:
 
-    central_squares = [
-        chess.E4, chess.E5, chess.D4, chess.D5,
-        chess.C4, chess.C5, chess.F4, chess.F5,      
-    ]
+    profiler = None
+
+    def __init__(self, weights_file=None):
+        self.weights = load_weights(weights_file)
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights):
+        # The terms with a weight in each phase, for features(weighted_only=True);
+        # worked out here rather than on every evaluation
+        self._weights = weights
+        by_name = dict(zip(FEATURE_NAMES, weights))
+        self._mg_weighted = frozenset(term for term in TERMS if by_name[f"{term}_mg"])
+        self._eg_weighted = frozenset(term for term in TERMS if by_name[f"{term}_eg"])
+
+    def fingerprint(self):
+        """Identifies these weights, e.g. for analysis_cache: scores of other weights differ."""
+        return f"MinMax {json.dumps(self.weights)}"
+
+    def enable_profiling(self, sample_every=1):
+        # Timing wrappers live on the instance only while profiling is on
+        from eval_profiler import EvalProfiler
+        if self.profiler is None:
+            self.profiler = EvalProfiler(self, sample_every)
+            self.profiler.install()
+        return self.profiler
+
+    def disable_profiling(self):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.uninstall()
+            self.profiler = None
+        return profiler
 
     def get_piece_value(self, piece):
         if piece is None:
@@ -26,68 +177,31 @@ class MinMax:
             return 0 
         return 0
 
-    def get_game_phase(self, board):
-
-        total_material = 0
-        piece_values = {
-            chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3,
-            chess.ROOK: 5, chess.QUEEN: 9
-        }
-
-        for piece_type in piece_values:
-            total_material += len(board.pieces(piece_type, chess.WHITE)) * piece_values[piece_type]
-            total_material += len(board.pieces(piece_type, chess.BLACK)) * piece_values[piece_type]
-
-        if total_material >= 50: 
+    def game_phase(self, board):
+        """PHASE_MAX with every knight, bishop, rook and queen on the board, down to 0 with none."""
+        phase = 0
+        for piece_type, weight in PHASE_WEIGHTS.items():
+            phase += chess.popcount(board.pieces_mask(piece_type, chess.WHITE) | board.pieces_mask(piece_type, chess.BLACK)) * weight
+        return min(phase, PHASE_MAX)
 
-            white_developed_knights_bishops = 0
-            black_developed_knights_bishops = 0
-
-            
-            if board.piece_at(chess.B1) != chess.Piece(chess.KNIGHT, chess.WHITE): white_developed_knights_bishops += 1
-            if board.piece_at(chess.G1) != chess.Piece(chess.KNIGHT, chess.WHITE): white_developed_knights_bishops += 1
-            if board.piece_at(chess.C1) != chess.Piece(chess.BISHOP, chess.WHITE): white_developed_knights_bishops += 1
-            if board.piece_at(chess.F1) != chess.Piece(chess.BISHOP, chess.WHITE): white_developed_knights_bishops += 1
-            
-            
-            if board.piece_at(chess.B8) != chess.Piece(chess.KNIGHT, chess.BLACK): black_developed_knights_bishops += 1
-            if board.piece_at(chess.G8) != chess.Piece(chess.KNIGHT, chess.BLACK): black_developed_knights_bishops += 1
-            if board.piece_at(chess.C8) != chess.Piece(chess.BISHOP, chess.BLACK): black_developed_knights_bishops += 1
-            if board.piece_at(chess.F8) != chess.Piece(chess.BISHOP, chess.BLACK): black_developed_knights_bishops += 1
-
-          
-            if white_developed_knights_bishops >= 2 or black_developed_knights_bishops >= 2:
-                return "Middlegame"
-            else:
-                return "Opening"
-        elif total_material >= 20: 
-            return "Middlegame"
-        else:
-            return "Endgame"
-
-    def evaluate_pieces_deployment(self, board):
-        score = 0
-        
-        
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                if piece.color == chess.WHITE:
-                    if piece.piece_type in [chess.KNIGHT, chess.BISHOP]:
-                       
-                        if square not in [chess.B1, chess.G1, chess.C1, chess.F1]:
-                            score += 0.2
-                       
-                        if piece.piece_type == chess.KNIGHT and square in [chess.C3, chess.F3, chess.D2, chess.E2]:
-                            score += 0.1
-                else: 
-                    if piece.piece_type in [chess.KNIGHT, chess.BISHOP]:
-                        if square not in [chess.B8, chess.G8, chess.C8, chess.F8]:
-                            score -= 0.2
-                        if piece.piece_type == chess.KNIGHT and square in [chess.C6, chess.F6, chess.D7, chess.E7]:
-                            score -= 0.1
-        
+    def get_game_phase(self, board):
+        return phase_name(self.game_phase(board))
+
+    def evaluate_piece_squares(self, board):
+        """(middlegame, endgame) sums of PIECE_SQUARE_TABLES; black's squares are mirrored."""
+        mg = eg = 0.0
+        for piece_type, (table_mg, table_eg) in PIECE_SQUARE_TABLES.items():
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+                mg += table_mg[square]
+                eg += table_eg[square]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+                mg -= table_mg[chess.square_mirror(square)]
+                eg -= table_eg[chess.square_mirror(square)]
+        return mg, eg
+
+    def evaluate_blocked_bishops(self, board):
         # bishops blocked by pawns
+        score = 0
         # white
         if board.piece_at(chess.C1) == chess.Piece(chess.BISHOP, chess.WHITE) and board.piece_at(chess.D2) == chess.Piece(chess.PAWN, chess.WHITE):
             score -= 0.3
@@ -195,26 +309,10 @@ class MinMax:
                         threat_count += 1
         
         score -= threat_count * 0.15 # Penalty for squares around the king being attacked
+        # (castled kings get their bonus from the king piece-square table)
 
-        
-        if color == chess.WHITE:
-            if board.has_kingside_castling_rights or board.has_queenside_castling_rights:
-                if king_square == chess.G1: score += 0.3
-                elif king_square == chess.C1: score += 0.2
-        else: 
-            if board.has_kingside_castling_rights or board.has_queenside_castling_rights:
-                if king_square == chess.G8: score -= 0.3
-                elif king_square == chess.C8: score -= 0.2
-                
         return score
 
-    def evaluate_king_activity(self, king_square):
-        
-        if king_square is None:
-            return 0
-        distance_to_center = min([chess.square_distance(king_square, square) for square in self.central_squares])
-        return -distance_to_center * 0.15 
-
     def evaluate_passed_pawns(self, board, color):
         score = 0
         enemy_color = not color
@@ -397,33 +495,28 @@ class MinMax:
         
         return score
 
-    def evaluate_attacks(self, board): 
-            score = 0
-
-            for color in [chess.WHITE, chess.BLACK]:
-                factor = 1 if color == chess.WHITE else -1
-                
-                
-                attacking_pieces_bitboard = (
-                    board.pieces(chess.KNIGHT, color)
-                    | board.pieces(chess.BISHOP, color)
-                    | board.pieces(chess.ROOK, color)
-                    | board.pieces(chess.QUEEN, color)
-                )
+    def evaluate_attacks(self, board):
+        # Material the knights, bishops, rooks and queens could win by taking
+        # an enemy piece, counting the whole exchange on that square
+        score = 0
 
-                
-                for attacker_square in attacking_pieces_bitboard:
-                    for target_square in board.attacks(attacker_square):
-                        piece = board.piece_at(target_square)
-                        if piece and piece.color != color:
-                            value = self.get_piece_value(piece)
-                            defenders = board.attackers(not color, target_square)
-
-                            if not defenders:
-                                score += factor * value * 0.5  # Attack on undefended piece
-                            else:
-                                score += factor * value * 0.2  # Pressure on defended piece
-            return score
+        for color in [chess.WHITE, chess.BLACK]:
+            factor = 1 if color == chess.WHITE else -1
+
+            attacking_pieces_bitboard = (
+                board.pieces_mask(chess.KNIGHT, color)
+                | board.pieces_mask(chess.BISHOP, color)
+                | board.pieces_mask(chess.ROOK, color)
+                | board.pieces_mask(chess.QUEEN, color)
+            )
+            targets = board.occupied_co[not color] & ~board.kings
+
+            for attacker_square in chess.scan_forward(attacking_pieces_bitboard):
+                for target_square in chess.scan_forward(board.attacks_mask(attacker_square) & targets):
+                    gain = see(board, chess.Move(attacker_square, target_square))
+                    if gain > 0:
+                        score += factor * gain * 0.5
+        return score
 
     def evaluate_board(self, board):
 
@@ -432,120 +525,49 @@ class MinMax:
             return terminal_score
 
         score = 0
-        game_phase = self.get_game_phase(board)
-
-
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.get_piece_value(piece)
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
-
-        
-        score += self.evaluate_pawn_structure(board, chess.WHITE) * 0.8
-        score -= self.evaluate_pawn_structure(board, chess.BLACK) * 0.8
-        
-       
-        score += self.evaluate_mobility(board) * 0.1 
-
-       
-        score += self.evaluate_center_control(board) * 0.7 
-
-        
-        if game_phase == "Opening" or game_phase == "Middlegame":
-            score += self.evaluate_king_safety_combined(board, chess.WHITE) * 1.5 
-            score -= self.evaluate_king_safety_combined(board, chess.BLACK) * 1.5
-        elif game_phase == "Endgame":
-            
-            white_king_square = board.king(chess.WHITE)
-            black_king_square = board.king(chess.BLACK)
-            if white_king_square:
-                score += self.evaluate_king_activity(white_king_square) * 0.5
-            if black_king_square:
-                score -= self.evaluate_king_activity(black_king_square) * 0.5
-
-        
-        if game_phase == "Opening":
-            score += self.evaluate_pieces_deployment(board) * 1.0 
-            
-            for square in [chess.E4, chess.D4]:
-                piece = board.piece_at(square)
-                if piece and piece.piece_type == chess.PAWN and piece.color == chess.WHITE:
-                    score += 0.5
-            for square in [chess.D5, chess.E5]:
-                piece = board.piece_at(square)
-                if piece and piece.piece_type == chess.PAWN and piece.color == chess.BLACK:
-                    score -= 0.5
-
-        elif game_phase == "Middlegame":
-            
-            score += self.middle_game_knight_deployement(board) * 0.7
-           
-            score += self.check_connected_rooks(board, chess.WHITE) * 0.4
-            score -= self.check_connected_rooks(board, chess.BLACK) * 0.4
-            
-            score += self.evaluate_rook_movement(board) * 0.3
-            
-        elif game_phase == "Endgame":
-            
-            score += self.evaluate_passed_pawns(board, chess.WHITE) * 2.0 
-            score -= self.evaluate_passed_pawns(board, chess.BLACK) * 2.0
-
-            
-            score += self.close_pawns_to_promote(board) * 1.5 
-
-        
-        score += self.evaluate_attacks(board) * 0.6 
-
-        return score
-    
-  
-
-    def middle_game_knight_deployement(self, board):
-        score = 0
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece is None:
-                continue
-
-            if piece.piece_type == chess.KNIGHT:
-                knight_rank = chess.square_rank(square)
-                knight_file = chess.square_file(square)
-
-                if piece.color == chess.WHITE:
-                    
-                    if (knight_rank == 4 and 1 < knight_file < 6): score += 0.3 
-                    elif knight_rank == 5: score += 0.5 
-                    elif knight_rank == 6: score += 1.5 
-                elif piece.color == chess.BLACK:
-                    if (knight_rank == 3 and 1 < knight_file < 6): score -= 0.3 
-                    elif knight_rank == 2: score -= 0.5
-                    elif knight_rank == 1: score -= 1.5
+        for feature, weight in zip(self.features(board, weighted_only=True), self.weights):
+            score += feature * weight
         return score
 
-    def close_pawns_to_promote(self, board):
-        score = 0
-        for color in [chess.WHITE, chess.BLACK]:
-            pawns = board.pieces(chess.PAWN, color)
-            promotion_rank = 7 if color == chess.WHITE else 0
-
-            for square in pawns:
-                rank = chess.square_rank(square)
-                distance = abs(promotion_rank - rank)
-
-                if distance == 1: 
-                    bonus = 2
-                elif distance == 2: 
-                    bonus = 1
-                elif distance == 3: 
-                    bonus = 0.5
-                elif distance ==0:
-                    bonus == 9
-                else:
-                    bonus = 0
-                
-                score += bonus if color == chess.WHITE else -bonus
-        return score
\ No newline at end of file
+    def features(self, board, weighted_only=False):
+        """Terms of the evaluation from white's point of view, in FEATURE_NAMES order.
+
+        The middlegame half is scaled by phase / PHASE_MAX and the endgame
+        half by the rest. With weighted_only, terms whose weight is 0 in
+        every phase that counts here are left at 0 instead of computed.
+        """
+        mg_share = self.game_phase(board) / PHASE_MAX
+        eg_share = 1 - mg_share
+        mg_weighted = self._mg_weighted
+        eg_weighted = self._eg_weighted
+
+        def wanted(term):
+            return not weighted_only or bool(mg_share and term in mg_weighted) or bool(eg_share and term in eg_weighted)
+
+        mg = dict.fromkeys(TERMS, 0)
+        eg = dict.fromkeys(TERMS, 0)
+        for term, piece_type in zip(TERMS, (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)):
+            mg[term] = eg[term] = chess.popcount(board.pieces_mask(piece_type, chess.WHITE)) - chess.popcount(board.pieces_mask(piece_type, chess.BLACK))
+
+        if wanted("piece_squares"):
+            mg["piece_squares"], eg["piece_squares"] = self.evaluate_piece_squares(board)
+        if wanted("pawn_structure"):
+            mg["pawn_structure"] = eg["pawn_structure"] = self.evaluate_pawn_structure(board, chess.WHITE) - self.evaluate_pawn_structure(board, chess.BLACK)
+        if wanted("mobility"):
+            mg["mobility"] = eg["mobility"] = self.evaluate_mobility(board)
+        if wanted("center_control"):
+            mg["center_control"] = eg["center_control"] = self.evaluate_center_control(board)
+        if wanted("king_safety"):
+            mg["king_safety"] = eg["king_safety"] = self.evaluate_king_safety_combined(board, chess.WHITE) - self.evaluate_king_safety_combined(board, chess.BLACK)
+        if wanted("blocked_bishops"):
+            mg["blocked_bishops"] = eg["blocked_bishops"] = self.evaluate_blocked_bishops(board)
+        if wanted("connected_rooks"):
+            mg["connected_rooks"] = eg["connected_rooks"] = self.check_connected_rooks(board, chess.WHITE) - self.check_connected_rooks(board, chess.BLACK)
+        if wanted("rook_files"):
+            mg["rook_files"] = eg["rook_files"] = self.evaluate_rook_movement(board)
+        if wanted("passed_pawns"):
+            mg["passed_pawns"] = eg["passed_pawns"] = self.evaluate_passed_pawns(board, chess.WHITE) - self.evaluate_passed_pawns(board, chess.BLACK)
+        if wanted("attacks"):
+            mg["attacks"] = eg["attacks"] = self.evaluate_attacks(board)
+
+        return [mg[term] * mg_share for term in TERMS] + [eg[term] * eg_share for term in TERMS]
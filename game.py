@@ -1,24 +1,71 @@
 import chess
 
+
+class PositionState:
+    """Everything the GUIs ask about one position, computed once.
+
+    moves_from maps a from-square to its legal moves, legal is the set of
+    all legal moves; check, game_over and result describe the position.
+    """
+
+    def __init__(self, board):
+        self.fen = board.fen()
+        self.legal = set()
+        self.moves_from = {}
+        for move in board.legal_moves:
+            self.legal.add(move)
+            self.moves_from.setdefault(move.from_square, []).append(move)
+        self.check = board.is_check()
+
+        outcome = board.outcome()
+        self.game_over = outcome is not None
+        if outcome is None:
+            self.result = None
+        elif outcome.termination == chess.Termination.CHECKMATE:
+            self.result = "Checkmate"
+        elif outcome.termination == chess.Termination.STALEMATE:
+            self.result = "Stalemate"
+        elif outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
+            self.result = "Draw by insufficient material"
+        else:
+            self.result = "Game over"
+
+
 class ChessGame:
     def __init__(self):
         self.board = chess.Board()
         self.selected_square = None
+        # PositionState of the current position; change the board through
+        # push/pop/reset so it gets rebuilt
+        self._state = None
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = PositionState(self.board)
+        return self._state
+
+    def push(self, move):
+        self.board.push(move)
+        self._state = None
+
+    def pop(self):
+        move = self.board.pop()
+        self._state = None
+        return move
 
     def get_legal_moves(self, square):
 
         """Get all legal moves for the piece at the given square"""
-        legal_moves = []
+        return [move.to_square for move in self.moves_from(square)]
 
-        for move in self.board.legal_moves:
-            if move.from_square == square:
-                legal_moves.append(move.to_square)
-
-        return legal_moves
+    def moves_from(self, square):
+        """Legal chess.Move objects starting on square."""
+        return self.state.moves_from.get(square, [])
 
 
     def try_move(self, from_square, to_square):
-        
+
         piece = self.get_piece_at(from_square)
 
         if piece and piece.piece_type == chess.PAWN:
@@ -30,8 +77,8 @@ class ChessGame:
         else:
             move = chess.Move(from_square, to_square)
 
-        if move in self.board.legal_moves:
-            self.board.push(move)
+        if move in self.state.legal:
+            self.push(move)
             return True
         return False
 
@@ -41,10 +88,10 @@ class ChessGame:
 
     def is_white_turn(self):
         return self.board.turn == chess.WHITE
-    
+
     def is_check(self):
-        return self.board.is_check()
-    
+        return self.state.check
+
     def get_king_square(self, color):
         if color == chess.WHITE:
             return self.board.king(chess.WHITE)
@@ -52,17 +99,14 @@ class ChessGame:
             return self.board.king(chess.BLACK)
 
     def is_game_over(self):
-        return self.board.is_game_over()
+        return self.state.game_over
 
     def get_result(self):
-        if self.board.is_checkmate():
-            return "Checkmate"
-        elif self.board.is_stalemate():
-            return "Stalemate"
-        elif self.board.is_insufficient_material():
-            return "Draw by insufficient material"
-        else:
-            return "Game over"
+        return self.state.result or "Game over"
+
+    def fen(self):
+        return self.state.fen
 
     def reset(self):
         self.board.reset()
+        self._state = None
@@ -0,0 +1,115 @@
+import threading
+
+import pygame
+
+import minmax
+
+# Custom events the game loops sleep on with pygame.event.wait()
+AI_MOVE_READY = pygame.USEREVENT + 1   # move=chess.Move or None, search_id=int
+ANIMATION_TICK = pygame.USEREVENT + 2
+PANEL_READY = pygame.USEREVENT + 3     # the info panel evaluation arrived
+GAME_RESTART = pygame.USEREVENT + 4    # the game-over message has been shown long enough
+
+ANIMATION_FPS = 60
+GAME_OVER_PAUSE = 3000  # ms the game-over message stays up
+
+
+def post(event_type, **attributes):
+    """Posts a custom event; safe to call from worker threads."""
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(event_type, **attributes))
+
+
+def wait_events(timeout=0):
+    """Sleeps until at least one event arrives (or timeout ms pass, if > 0) and returns all pending events."""
+    event = pygame.event.wait(timeout) if timeout > 0 else pygame.event.wait()
+    events = [event] if event.type != pygame.NOEVENT else []
+    return events + pygame.event.get()
+
+
+def start_restart_timer():
+    pygame.time.set_timer(GAME_RESTART, GAME_OVER_PAUSE, 1)
+
+
+def stop_timers():
+    pygame.time.set_timer(GAME_RESTART, 0)
+    pygame.time.set_timer(ANIMATION_TICK, 0)
+    # Drop anything left over so the next scene doesn't see this one's events
+    pygame.event.clear([AI_MOVE_READY, ANIMATION_TICK, PANEL_READY, GAME_RESTART])
+
+
+class AIWorker:
+    """Runs engine searches on a background thread so the game loop can sleep.
+
+    start() hands the search a copy of the board; when it finishes an
+    AI_MOVE_READY event is posted. Results of cancelled searches are dropped.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.control = None
+        self.search_id = 0
+        self.thinking = False
+
+    def busy(self):
+        return self.thinking
+
+    def start(self, board, search):
+        """search(board, control) runs on the worker thread and returns the move."""
+        self.cancel()
+        self.search_id += 1
+        search_id = self.search_id
+        control = self.control = minmax.SearchControl()
+        self.thinking = True
+
+        def run():
+            move = search(board, control)
+            self.thinking = False  # before posting, so the loop never waits on a finished search
+            if not control.stop_event.is_set():
+                post(AI_MOVE_READY, move=move, search_id=search_id)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        return search_id
+
+    def cancel(self):
+        if self.control is not None:
+            self.control.stop()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.control = None
+        self.thinking = False
+
+
+class MoveAnimation:
+    """Slides a piece from one square to another over duration ms.
+
+    While it runs ANIMATION_TICK fires ANIMATION_FPS times a second; the
+    move is pushed by the caller once done() is true.
+    """
+
+    def __init__(self, move, piece, duration):
+        self.move = move
+        self.piece = piece
+        self.duration = duration
+        self.start_time = pygame.time.get_ticks()
+        pygame.time.set_timer(ANIMATION_TICK, 1000 // ANIMATION_FPS)
+
+    def progress(self):
+        if self.duration <= 0:
+            return 1.0
+        return min(1.0, (pygame.time.get_ticks() - self.start_time) / self.duration)
+
+    def done(self):
+        return self.progress() >= 1.0
+
+    def position(self, renderer):
+        """Top-left pixel of the sliding piece."""
+        start = renderer.square_rect(self.move.from_square).topleft
+        end = renderer.square_rect(self.move.to_square).topleft
+        t = self.progress()
+        return (round(start[0] + (end[0] - start[0]) * t), round(start[1] + (end[1] - start[1]) * t))
+
+    def stop(self):
+        pygame.time.set_timer(ANIMATION_TICK, 0)
@@ -1,14 +1,17 @@
+import time
+STARTUP_BEGIN = time.perf_counter()
+
 import pygame
 import sys
-import subprocess
+import importlib
 import math
+import assets
 
 pygame.init()
 
 # Screen setup
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Chess Master")
+screen = assets.get_display((WIDTH, HEIGHT), "Chess Master")
 icon = pygame.Surface((32, 32))
 icon.fill((0, 0, 0))
 pygame.display.set_icon(icon)
@@ -32,6 +35,21 @@ copyright_font = pygame.font.SysFont("Arial", 16)
 clock = pygame.time.Clock()
 FPS = 60
 
+# Game modes run as scenes in this process and share its window and asset cache.
+# Their modules (and python-chess and the engine behind them) are imported on first use.
+SCENES = {
+    "pvp": "chess_board",
+    "ai": "player_vs_ai",
+    "ai_vs_ai": "ai_vs_ai",
+}
+
+# Print import, setup and time-to-first-frame measurements (--timing)
+SHOW_TIMINGS = False
+
+def report_timing(text):
+    if SHOW_TIMINGS:
+        print(f"[timing] {text}")
+
 # Load chess piece images (placeholders)
 try:
     king_img = pygame.image.load("chess_pieces/king.png")
@@ -81,7 +99,7 @@ class Button:
         pygame.draw.rect(screen, GOLD, self.rect, width=2, border_radius=12)
         
         # Draw text
-        text_surf = button_font.render(self.text, True, BG_COLOR)
+        text_surf = assets.render_text(button_font, self.text, BG_COLOR)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
 
@@ -95,6 +113,15 @@ for i, text in enumerate(button_texts):
 time_passed = 0
 particles = []
 
+# Pre-rendered decorations, built on first use
+BOARD_ANGLE_STEP = 0.5 # Degrees between the cached rotation frames of the background board
+BOARD_FRAME_CACHE_BYTES = 16 * 1024 * 1024 # Memory cap for those frames; past it frames are rotated on the fly
+background = None
+board_surf = None
+board_frames = {} # angle step index -> rotated board surface
+board_frames_bytes = 0
+king_img_flipped = None
+
 def create_checkerboard():
     board_size = 200
     square_size = board_size // 8
@@ -107,6 +134,36 @@ def create_checkerboard():
     
     return board_surf
 
+def get_background():
+    """Background color plus the line grid.
+
+    The grid's opacity animation never showed (the display has no per-pixel
+    alpha, so the lines are drawn opaque), so it is drawn once.
+    """
+    global background
+    if background is None:
+        background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        background.fill(BG_COLOR)
+        for i in range(20):
+            pygame.draw.line(background, DARK_BROWN, (0, i * 30), (WIDTH, i * 30), 2)
+            pygame.draw.line(background, DARK_BROWN, (i * 40, 0), (i * 40, HEIGHT), 2)
+    return background
+
+def get_board_frame(angle):
+    """The background checkerboard rotated to angle, rounded to BOARD_ANGLE_STEP."""
+    global board_surf, board_frames_bytes
+    index = round(angle / BOARD_ANGLE_STEP)
+    frame = board_frames.get(index)
+    if frame is None:
+        if board_surf is None:
+            board_surf = create_checkerboard()
+        frame = pygame.transform.rotate(board_surf, index * BOARD_ANGLE_STEP).convert()
+        size = frame.get_width() * frame.get_height() * frame.get_bytesize()
+        if board_frames_bytes + size <= BOARD_FRAME_CACHE_BYTES:
+            board_frames[index] = frame
+            board_frames_bytes += size
+    return frame
+
 def create_particles():
     # Create new particles
     if len(particles) < 30 and pygame.time.get_ticks() % 200 < 20:
@@ -128,26 +185,17 @@ def create_particles():
             particles.remove(particle)
 
 def draw_menu():
-    # Fill background
-    screen.fill(BG_COLOR)
+    global king_img_flipped
+    # Background color and grid, pre-rendered
+    screen.blit(get_background(), (0, 0))
     
     # Draw decorative elements
     time_passed = pygame.time.get_ticks() / 1000
     
-    # Animated background pattern
-    for i in range(20):
-        opacity = 20 + 10 * math.sin(time_passed + i * 0.1)
-        line_color = (DARK_BROWN[0], DARK_BROWN[1], DARK_BROWN[2], opacity)
-        line_width = 2
-        pygame.draw.line(screen, line_color, (0, i * 30), (WIDTH, i * 30), line_width)
-        pygame.draw.line(screen, line_color, (i * 40, 0), (i * 40, HEIGHT), line_width)
-    
     # Draw checkerboard in the background
-    board_surf = create_checkerboard()
-    board_rect = board_surf.get_rect(center=(WIDTH//2, HEIGHT//2))
     board_angle = 15 * math.sin(time_passed * 0.2)
-    rotated_board = pygame.transform.rotate(board_surf, board_angle)
-    rotated_rect = rotated_board.get_rect(center=board_rect.center)
+    rotated_board = get_board_frame(board_angle)
+    rotated_rect = rotated_board.get_rect(center=(WIDTH//2, HEIGHT//2))
     screen.blit(rotated_board, rotated_rect)
     
     # Create glowing effect for the title
@@ -161,13 +209,15 @@ def draw_menu():
                           piece_y - king_img.get_height() // 2 + piece_bounce))
     
     # Draw mirrored chess piece on the right
-    screen.blit(pygame.transform.flip(king_img, True, False), 
+    if king_img_flipped is None:
+        king_img_flipped = pygame.transform.flip(king_img, True, False)
+    screen.blit(king_img_flipped, 
                 (WIDTH - piece_x - king_img.get_width() // 2, 
                  piece_y - king_img.get_height() // 2 + piece_bounce))
     
     # Draw title with shadow
-    title = title_font.render("Chess Master", True, DARK_BROWN)
-    title_shadow = title_font.render("Chess Master", True, GOLD)
+    title = assets.render_text(title_font, "Chess Master", DARK_BROWN)
+    title_shadow = assets.render_text(title_font, "Chess Master", GOLD)
     shadow_offset = 2 + glow_offset
     screen.blit(title_shadow, (WIDTH // 2 - title_shadow.get_width() // 2 + shadow_offset, 
                                80 + shadow_offset))
@@ -182,16 +232,20 @@ def draw_menu():
     create_particles()
     
     # Draw copyright
-    copyright_text = copyright_font.render("© Chess Master 2025", True, TEXT_COLOR)
+    copyright_text = assets.render_text(copyright_font, "© Chess Master 2025", TEXT_COLOR)
     screen.blit(copyright_text, (WIDTH - copyright_text.get_width() - 10, HEIGHT - 30))
     
     pygame.display.flip()
 
 def main_menu():
+    first_frame = True
     while True:
         clock.tick(FPS)
         
         draw_menu()
+        if first_frame:
+            report_timing(f"menu: first frame {(time.perf_counter() - STARTUP_BEGIN) * 1000:.0f} ms after start")
+            first_frame = False
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -212,14 +266,32 @@ def main_menu():
                             sys.exit()
 
 def launch_game(mode):
-    if mode == "pvp":
-        subprocess.run(["python", "chess_board.py"])
-    elif mode == "ai":
+    global screen
+    if mode == "ai":
         print("Launching Player vs AI mode...")
-        subprocess.run(["python", "player_vs_ai.py"])
     elif mode == "ai_vs_ai":
         print("Launching AI vs AI mode...")
-        subprocess.run(["python", "ai_vs_ai.py"])
+
+    start = time.perf_counter()
+    module = importlib.import_module(SCENES[mode])
+    imported = time.perf_counter()
+    module.setup()
+    ready = time.perf_counter()
+
+    def first_frame():
+        now = time.perf_counter()
+        report_timing(f"{mode}: import {(imported - start) * 1000:.0f} ms, setup {(ready - imported) * 1000:.0f} ms, "
+                      f"first frame {(now - start) * 1000:.0f} ms after click")
+
+    action = module.run(on_first_frame=first_frame)
+
+    # Back to the menu in the same window
+    screen = assets.get_display((WIDTH, HEIGHT), "Chess Master")
+    if action == "quit":
+        pygame.quit()
+        sys.exit()
 
 if __name__ == "__main__":
+    SHOW_TIMINGS = "--timing" in sys.argv[1:]
+    report_timing(f"menu: pygame import and setup {(time.perf_counter() - STARTUP_BEGIN) * 1000:.0f} ms")
     main_menu()
\ No newline at end of file
@@ -1,101 +1,771 @@
+import argparse
+import atexit
+import threading
+import time
 import chess
 from game import ChessGame
 from evaluations import MinMax
+from see import see
 
-evaluator = MinMax()  
+# Default hash table sizes of an Engine (entries)
+TT_MAX_ENTRIES = 1_000_000
+EVAL_CACHE_MAX_ENTRIES = 500_000
 
-def minimax(board, depth, alpha, beta, is_maximizing):
-    if depth == 0 or board.is_game_over():
-        return evaluator.evaluate_board(board)
-    
-    if is_maximizing:
-        max_eval = -float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, False)
-            board.pop()
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break  
-        return max_eval
-    else:
-        min_eval = float('inf')
-        for move in board.legal_moves:
-            board.push(move)
-            eval = minimax(board, depth - 1, alpha, beta, True)
-            board.pop()
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break  
-        return min_eval
+MAX_DEPTH = 64  # iteration cap for searches that are bounded by time instead
+SEE_PRUNE_DEPTH = 1  # captures that lose material (see() < 0) are skipped at this remaining depth
+MAX_CHECK_EXTENSIONS = 4  # checks searched one ply deeper, per line
+
+# Being mated ply plies from the root scores -(MATE_SCORE - ply), so a
+# faster mate always scores higher. Anything beyond MATE_BOUND is a mate;
+# the evaluation itself never gets near it.
+MATE_SCORE = 1000
+MATE_BOUND = MATE_SCORE - 256
+
+EXACT = 0
+LOWERBOUND = 1
+UPPERBOUND = 2
+
+# Stages of Engine.staged_moves, in the order they're searched
+HASH_MOVE = 0
+GOOD_CAPTURES = 1  # captures and promotions that don't lose material by see()
+KILLERS = 2  # quiet moves that caused a cutoff at the same ply before
+QUIET_MOVES = 3
+LOSING_CAPTURES = 4
+
+
+class SearchStats:
+    """Counters collected during one call to find_best_move."""
+
+    def __init__(self):
+        self.nodes = 0
+        self.depth = 0
+        self.seldepth = 0
+        self.elapsed = 0.0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.see_pruned = 0  # losing captures skipped near the leaves
+        self.move_loops = 0  # nodes that searched moves (not cut off by the table, not leaves)
+        self.quiet_generations = 0  # of those, nodes that got as far as generating quiet moves
+        self.illegal_skipped = 0  # pseudo-legal moves that left the king in check
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.persistent_hits = 0  # of the tt_hits, entries found in the persistent cache
+        self.eval_probes = 0
+        self.eval_hits = 0
+        self.best_move = None
+        self.score = None
+        self.iterations = []
+        self.root_move_nodes = {}
+        self.lines = []  # (move, score, pv) of the multipv best moves of the last iteration, best first
+
+    @property
+    def nps(self):
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    @property
+    def first_move_cutoff_ratio(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def quiets_skipped(self):
+        """Nodes whose search ended before their quiet moves were generated."""
+        return self.move_loops - self.quiet_generations
+
+    @property
+    def quiets_skipped_ratio(self):
+        return self.quiets_skipped / self.move_loops if self.move_loops else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def eval_cache_hit_rate(self):
+        return self.eval_hits / self.eval_probes if self.eval_probes else 0.0
+
+    @property
+    def effective_branching_factor(self):
+        # Ratio of the node counts of the last two completed iterations
+        if len(self.iterations) < 2 or self.iterations[-2]["nodes"] == 0:
+            return 0.0
+        return self.iterations[-1]["nodes"] / self.iterations[-2]["nodes"]
+
+    def to_dict(self):
+        return {
+            "best_move": self.best_move.uci() if self.best_move else None,
+            "score": self.score,
+            "depth": self.depth,
+            "seldepth": self.seldepth,
+            "nodes": self.nodes,
+            "elapsed": round(self.elapsed, 6),
+            "nps": self.nps,
+            "beta_cutoffs": self.beta_cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_ratio": round(self.first_move_cutoff_ratio, 4),
+            "see_pruned": self.see_pruned,
+            "move_loops": self.move_loops,
+            "quiets_skipped": self.quiets_skipped,
+            "quiets_skipped_ratio": round(self.quiets_skipped_ratio, 4),
+            "illegal_skipped": self.illegal_skipped,
+            "tt_hit_rate": round(self.tt_hit_rate, 4),
+            "persistent_hits": self.persistent_hits,
+            "eval_cache_hit_rate": round(self.eval_cache_hit_rate, 4),
+            "effective_branching_factor": round(self.effective_branching_factor, 3),
+            "iterations": self.iterations,
+            "lines": [{"move": move.uci(), "score": score, "pv": [m.uci() for m in pv]}
+                      for move, score, pv in self.lines],
+        }
+
+
+class SearchAborted(Exception):
+    pass
+
+
+class SearchControl:
+    """Limits of a running search. Other threads may call stop() or move the deadline."""
+
+    def __init__(self, deadline=None, max_nodes=None, clock=time.perf_counter):
+        self.deadline = deadline  # clock() value
+        self.max_nodes = max_nodes
+        self.clock = clock
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def should_stop(self, nodes):
+        if self.stop_event.is_set():
+            return True
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            return True
+        return self.deadline is not None and self.clock() >= self.deadline
+
+
+def mate_in(score):
+    """Moves to mate for a mate score (negative when getting mated), None for other scores."""
+    if score is None or abs(score) < MATE_BOUND:
+        return None
+    moves = (MATE_SCORE - abs(score) + 1) // 2
+    return moves if score > 0 else -moves
+
+
+def score_to_tt(score, ply):
+    # Mate scores are stored as distances from the node, not from the root,
+    # so an entry stays right when the position is reached at another ply
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class PlyState:
+    """Search data of one distance from the root, kept for the engine's lifetime.
+
+    The move lists are reused by every node at this ply rather than built
+    anew; a node's lists stay intact while deeper plies use theirs.
+    """
+
+    __slots__ = ("killers", "captures", "losing", "quiets")
+
+    def __init__(self):
+        self.killers = [None, None]  # the last two quiet moves that caused a cutoff here
+        self.captures = []  # (see gain, move), good captures and promotions
+        self.losing = []  # (see gain, move), captures that lose material
+        self.quiets = []
+
+
+class Engine:
+    """One searcher with its own evaluator, hash tables and limits.
+
+    Engines don't share anything, so several can play each other or serve
+    separate sessions in one process. An evaluator with incremental = True
+    (nnue.NNUE) is told about every move the search makes and takes back
+    through its reset/push/pop methods. The tables are kept between searches
+    (a new search starts from what the previous one learned) until clear().
+    An Engine pickles without its tables, so a configured engine can be
+    sent to a worker process.
+
+    With pseudo_legal, the search below the root generates pseudo-legal
+    moves and throws a move away once it's been made and turns out to
+    leave the king in check. Only the root moves are generated legally,
+    and a node without any legal move is checkmate or stalemate. The
+    results are the same as with legal moves (see check_pseudo_legal).
+    """
+
+    def __init__(self, evaluator=None, tt_max_entries=TT_MAX_ENTRIES, eval_cache_max_entries=EVAL_CACHE_MAX_ENTRIES,
+                 pseudo_legal=False):
+        self.evaluator = evaluator if evaluator is not None else MinMax()
+        self.pseudo_legal = pseudo_legal
+        self.tt_max_entries = tt_max_entries
+        self.eval_cache_max_entries = eval_cache_max_entries
+        self.transposition_table = {}
+        self.eval_cache = {}
+        # Optional analysis_cache.AnalysisCache behind the transposition
+        # table, see open_persistent_cache
+        self.persistent_cache = None
+        self.last_stats = None  # SearchStats of the last search
+        self.plies = []  # PlyState per ply from the root, grown as deep as the searches go
+        self._closes_at_exit = False
+
+    def __getstate__(self):
+        state = dict(self.__dict__, transposition_table={}, eval_cache={}, last_stats=None, plies=[],
+                     _closes_at_exit=False)
+        cache = self.persistent_cache
+        state["persistent_cache"] = (cache.path, cache.size_mb) if cache is not None else None
+        return state
+
+    def __setstate__(self, state):
+        cache = state.pop("persistent_cache")
+        self.__dict__.update(state, persistent_cache=None)
+        if cache is not None:
+            self.open_persistent_cache(*cache)
+
+    def clear(self):
+        """Forgets everything learned so far, e.g. between games."""
+        if self.persistent_cache is not None:
+            self.persistent_cache.merge(self.transposition_table)
+        self.transposition_table.clear()
+        self.eval_cache.clear()
+
+    def set_evaluator(self, evaluator):
+        """Switches evaluators: the tables are cleared and the persistent cache reopened for the new one."""
+        cache = self.persistent_cache
+        self.close_persistent_cache()
+        self.evaluator = evaluator
+        self.transposition_table.clear()
+        self.eval_cache.clear()
+        if cache is not None:
+            self.open_persistent_cache(cache.path, cache.size_mb)
+
+    def open_persistent_cache(self, path, size_mb=None):
+        """Backs the transposition table with an on-disk cache shared between runs.
+
+        Positions missing from the table are looked up in the file; the table
+        is merged into it by clear(), close_persistent_cache() and at exit.
+        The file is only used if it was written with the same evaluator (and
+        weights), otherwise the first merge replaces it. Change evaluators
+        with set_evaluator() so the cache follows.
+        """
+        from analysis_cache import AnalysisCache, DEFAULT_SIZE_MB, evaluator_fingerprint
+
+        self.close_persistent_cache()
+        self.persistent_cache = AnalysisCache(path, size_mb or DEFAULT_SIZE_MB,
+                                              fingerprint=evaluator_fingerprint(self.evaluator))
+        if not self._closes_at_exit:
+            atexit.register(self.close_persistent_cache)
+            self._closes_at_exit = True
+        return self.persistent_cache
+
+    def close_persistent_cache(self, merge=True):
+        if self.persistent_cache is None:
+            return
+        if merge:
+            self.persistent_cache.merge(self.transposition_table)
+        self.persistent_cache.close()
+        self.persistent_cache = None
+        if self._closes_at_exit:
+            # The hook holds on to the engine; don't keep it alive until exit
+            atexit.unregister(self.close_persistent_cache)
+            self._closes_at_exit = False
+
+    def evaluate(self, board, stats):
+        # evaluate_board only looks at the position, never at the move history,
+        # so the transposition key is enough to reuse a previous result.
+        key = board._transposition_key()
+        stats.eval_probes += 1
+        score = self.eval_cache.get(key)
+        if score is None:
+            score = self.evaluator.evaluate_board(board)
+            if len(self.eval_cache) >= self.eval_cache_max_entries:
+                self.eval_cache.clear()
+            self.eval_cache[key] = score
+        else:
+            stats.eval_hits += 1
+        return score
 
 
-def find_best_move(board, depth):
-    best_move = None
-    max_eval = -float('inf')
-    alpha = -float('inf')
-    beta = float('inf')
+    def staged_moves(self, board, hash_move, ply, stats):
+        """Yields (move, stage) for the legal moves of board in search order.
 
-    for move in board.legal_moves:
-        board.push(move)
-        eval = minimax(board, depth - 1, alpha, beta, False)
-        board.pop()
-        if eval > max_eval:
-            max_eval = eval
-            best_move = move
-        alpha = max(alpha, eval)
+        Every stage is generated only when the ones before it have been
+        searched without a cutoff: the hash move (checked with is_legal, no
+        move generation), captures and promotions that don't lose material
+        by see(), biggest gain first, the killer moves of this ply, the
+        remaining quiet moves and finally the losing captures. With
+        pseudo_legal the moves are only pseudo-legal.
+        """
+        state = self.plies[ply]
+        if self.pseudo_legal:
+            is_valid = board.is_pseudo_legal
+            generate_moves = board.generate_pseudo_legal_moves
+            captures_generated = board.generate_pseudo_legal_captures()
+        else:
+            is_valid = board.is_legal
+            generate_moves = board.generate_legal_moves
+            captures_generated = board.generate_legal_captures()
+        if hash_move is not None and is_valid(hash_move):
+            yield hash_move, HASH_MOVE
+        else:
+            hash_move = None
 
-    return best_move
+        captures = state.captures
+        losing = state.losing
+        captures.clear()
+        losing.clear()
+        for moves in (captures_generated, generate_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied)):
+            for move in moves:
+                if move == hash_move:
+                    continue
+                gain = see(board, move)
+                if gain >= 0:
+                    captures.append((gain, move))
+                else:
+                    losing.append((gain, move))
+        captures.sort(key=lambda item: -item[0])
+        for _, move in captures:
+            yield move, GOOD_CAPTURES
 
+        first_killer, second_killer = state.killers
+        for killer in (first_killer, second_killer):
+            if killer is not None and killer != hash_move and is_valid(killer) and not board.is_capture(killer):
+                yield killer, KILLERS
 
+        stats.quiet_generations += 1
+        quiets = state.quiets
+        quiets.clear()
+        # Castling counts as a move to the rook's square, so only the
+        # opponent's pieces are masked out; the en passant square isn't one
+        quiets.extend(generate_moves(chess.BB_ALL, ~board.occupied_co[not board.turn]))
+        # Moves to these squares may have been searched already; comparing
+        # squares first keeps Move.__eq__ off the common path
+        special = {move.to_square for move in (hash_move, first_killer, second_killer) if move is not None}
+        ep_square = board.ep_square
+        if ep_square is not None:
+            special.add(ep_square)
+        for move in quiets:
+            if move.promotion:
+                continue
+            if move.to_square in special and (move == hash_move or move == first_killer or move == second_killer
+                                              or board.is_en_passant(move)):
+                continue
+            yield move, QUIET_MOVES
 
+        losing.sort(key=lambda item: -item[0])
+        for _, move in losing:
+            yield move, LOSING_CAPTURES
 
+    def negamax(self, board, depth, alpha, beta, ply, stats, control=None, extensions=0):
+        """Alpha-beta search returning the score from the side to move's point of view.
 
+        extensions counts the check extensions already made on the way here.
+        """
+        stats.nodes += 1
+        if control is not None and stats.nodes & 15 == 0 and control.should_stop(stats.nodes):
+            raise SearchAborted
+        if ply > stats.seldepth:
+            stats.seldepth = ply
 
-def minimax2(board, depth, alpha, beta, is_maximizing):
-    if depth == 0 or board.is_game_over():
-        return -1*evaluator.evaluate_board(board)
-    
-    if is_maximizing:
-        max_eval = -float('inf')
-        for move in board.legal_moves:
+        in_check = board.is_check()
+        if in_check and extensions < MAX_CHECK_EXTENSIONS:
+            depth += 1
+            extensions += 1
+
+        if depth == 0:
+            game_over = True
+        elif self.pseudo_legal:
+            # Checkmate and stalemate show up as having no legal move below
+            game_over = board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition()
+        else:
+            game_over = board.is_game_over()
+        if game_over:
+            if in_check and board.is_checkmate():
+                return -(MATE_SCORE - ply)
+            score = self.evaluate(board, stats)
+            return score if board.turn == chess.WHITE else -score
+
+        # Mate distance pruning: nothing here can beat being mated right now or
+        # mating next move, so a mate already found closer to the root decides
+        alpha = max(alpha, -(MATE_SCORE - ply))
+        beta = min(beta, MATE_SCORE - ply - 1)
+        if alpha >= beta:
+            return alpha
+
+        alpha_orig = alpha
+        key = board._transposition_key()
+        stats.tt_probes += 1
+        entry = self.transposition_table.get(key)
+        if self.persistent_cache is not None and depth >= self.persistent_cache.min_depth and (entry is None or entry[0] < depth):
+            # Earlier iterations leave shallow entries; the file may have a deeper one
+            stored = self.persistent_cache.probe(key)
+            if stored is not None and (entry is None or stored[0] > entry[0]):
+                stats.persistent_hits += 1
+                entry = self.transposition_table[key] = stored
+        hash_move = None
+        if entry is not None:
+            stats.tt_hits += 1
+            entry_depth, entry_score, entry_flag, hash_move = entry
+            entry_score = score_from_tt(entry_score, ply)
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWERBOUND and entry_score >= beta:
+                    return entry_score
+                if entry_flag == UPPERBOUND and entry_score <= alpha:
+                    return entry_score
+
+        best_score = -float('inf')
+        best_move = None
+        evaluator = self.evaluator
+        incremental = getattr(evaluator, "incremental", False)
+        pseudo_legal = self.pseudo_legal
+        prune_losing = depth <= SEE_PRUNE_DEPTH and not in_check
+        stats.move_loops += 1
+        searched = 0
+        for move, stage in self.staged_moves(board, hash_move, ply, stats):
+            # Right above the leaves a losing capture only matters if it checks
+            # (the static evaluation can't see the recapture anyway)
+            if stage == LOSING_CAPTURES and prune_losing and best_move is not None and not board.gives_check(move):
+                stats.see_pruned += 1
+                continue
+            if incremental:
+                evaluator.push(board, move)
             board.push(move)
-            eval = minimax2(board, depth - 1, alpha, beta, False)
+            if pseudo_legal and board.was_into_check():
+                board.pop()
+                if incremental:
+                    evaluator.pop()
+                stats.illegal_skipped += 1
+                continue
+            score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1, stats, control, extensions)
             board.pop()
-            max_eval = max(max_eval, eval)
-            alpha = max(alpha, eval)
+            if incremental:
+                evaluator.pop()
+            searched += 1
+            if score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
             if beta <= alpha:
-                break  
-        return max_eval
-    else:
-        min_eval = float('inf')
-        for move in board.legal_moves:
+                stats.beta_cutoffs += 1
+                if searched == 1:
+                    stats.first_move_cutoffs += 1
+                if stage != GOOD_CAPTURES and stage != LOSING_CAPTURES and not move.promotion and not board.is_capture(move):
+                    killers = self.plies[ply].killers
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                break
+
+        if best_move is None:
+            # Only in pseudo-legal mode: every move left the king in check
+            if in_check:
+                return -(MATE_SCORE - ply)
+            score = self.evaluate(board, stats)  # stalemate, scored like the legal search does
+            return score if board.turn == chess.WHITE else -score
+
+        if best_score <= alpha_orig:
+            flag = UPPERBOUND
+        elif best_score >= beta:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        if len(self.transposition_table) >= self.tt_max_entries:
+            self.transposition_table.clear()
+        self.transposition_table[key] = (depth, score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+
+    def search_root(self, board, depth, root_moves, stats, control=None, multipv=1):
+        """Searches every root move; returns [(move, score), ...] best first.
+
+        The first multipv scores are exact. Each move is searched with alpha at
+        the multipv-th best score so far, so the rest only prove they are worse.
+        """
+        scored = []
+        beta = float('inf')
+        stats.nodes += 1
+        stats.root_move_nodes = {}
+        evaluator = self.evaluator
+        incremental = getattr(evaluator, "incremental", False)
+        if incremental:
+            evaluator.reset(board)
+
+        for move in root_moves:
+            alpha = scored[multipv - 1][1] if len(scored) >= multipv else -float('inf')
+            nodes_before = stats.nodes
+            if incremental:
+                evaluator.push(board, move)
             board.push(move)
-            eval = minimax2(board, depth - 1, alpha, beta, True)
+            score = -self.negamax(board, depth - 1, -beta, -alpha, 1, stats, control)
             board.pop()
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break  
-        return min_eval
+            if incremental:
+                evaluator.pop()
+            stats.root_move_nodes[move] = stats.nodes - nodes_before
+            # Insert after equal scores so the earlier (better ordered) move stays ahead
+            index = len(scored)
+            while index > 0 and scored[index - 1][1] < score:
+                index -= 1
+            scored.insert(index, (move, score))
+
+        return scored
+
+
+    def principal_variation(self, board, max_length):
+        """Follows the hash moves stored in the transposition table from board."""
+        pv = []
+        seen = set()
+        for _ in range(max_length):
+            key = board._transposition_key()
+            entry = self.transposition_table.get(key)
+            if entry is None or entry[3] is None or key in seen or not board.is_legal(entry[3]):
+                break
+            seen.add(key)
+            pv.append(entry[3])
+            board.push(entry[3])
+        for _ in pv:
+            board.pop()
+        return pv
+
+
+    def search(self, board, depth, control=None, on_iteration=None, time_manager=None, search_moves=None, multipv=1):
+        """Iterative deepening up to depth. Returns (best_move, score, stats).
+
+        control (a SearchControl) can end the search early; the result of the
+        last completed iteration is returned then. on_iteration is called with
+        the stats and the principal variation after every completed iteration.
+        time_manager (a time_manager.TimeManager) decides between iterations
+        whether another one is worth starting and sets the hard deadline.
+        search_moves restricts the root to the given legal moves. multipv > 1
+        scores that many best moves exactly in the same iterative deepening
+        loop; stats.lines holds them with their principal variations.
+        """
+        if time_manager is not None:
+            if control is None:
+                control = SearchControl()
+            if not time_manager.pondering:
+                time_manager.start(control)
+        stats = SearchStats()
+        start = time.perf_counter()
+        root_moves = list(board.legal_moves)
+        if search_moves is not None:
+            root_moves = [move for move in root_moves if move in search_moves]
+        best_move = root_moves[0] if root_moves else None
+        best_score = None
+        stack_size = len(board.move_stack)
+        multipv = max(1, multipv)
+        # Killers of another position are no use; check extensions can take
+        # the search MAX_CHECK_EXTENSIONS plies past depth
+        for state in self.plies:
+            state.killers[:] = [None, None]
+        while len(self.plies) <= depth + MAX_CHECK_EXTENSIONS:
+            self.plies.append(PlyState())
+
+        for current_depth in range(1, depth + 1):
+            if not root_moves:
+                break
+            iteration_start = time.perf_counter()
+            nodes_before = stats.nodes
+            try:
+                scored = self.search_root(board, current_depth, root_moves, stats, control, multipv)
+            except SearchAborted:
+                while len(board.move_stack) > stack_size:
+                    board.pop()
+                break
+            best_move, best_score = scored[0]
+
+            # Search the previous best moves first in the next iteration
+            top_moves = [move for move, _ in scored[:multipv]]
+            root_moves = top_moves + [move for move in root_moves if move not in top_moves]
+
+            stats.lines = []
+            for move, score in scored[:multipv]:
+                board.push(move)
+                stats.lines.append((move, score, [move] + self.principal_variation(board, current_depth - 1)))
+                board.pop()
+
+            stats.depth = current_depth
+            iteration_nodes = stats.nodes - nodes_before
+            stats.iterations.append({
+                "depth": current_depth,
+                "nodes": iteration_nodes,
+                "elapsed": round(time.perf_counter() - iteration_start, 6),
+                "score": best_score,
+                "best_move": best_move.uci(),
+                "best_move_share": round(stats.root_move_nodes[best_move] / iteration_nodes, 4) if iteration_nodes else 0.0,
+            })
+            stats.elapsed = time.perf_counter() - start
+            if on_iteration is not None:
+                on_iteration(stats, stats.lines[0][2])
+            # A mate within the full-width depth can't be improved on by searching deeper
+            if all(mate_in(score) is not None and MATE_SCORE - abs(score) <= current_depth for _, score in scored[:multipv]):
+                break
+            if time_manager is not None and not time_manager.should_continue(stats, len(root_moves)):
+                break
+
+        stats.elapsed = time.perf_counter() - start
+        stats.best_move = best_move
+        stats.score = best_score
+        self.last_stats = stats
+        return best_move, best_score, stats
+
+    def find_best_move(self, board, depth, on_stats=None, time_manager=None, control=None):
+        best_move, _, stats = self.search(board, depth, control, time_manager=time_manager)
+        if on_stats is not None:
+            on_stats(stats)
+        return best_move
+
+    def multipv_cost(self, board, depth, max_lines):
+        """Nodes and time of the same fixed-depth search with 1..max_lines lines.
+
+        Every run starts from empty hash tables (this clears the engine's),
+        so the difference between consecutive runs is the cost of that line.
+        """
+        results = []
+        for lines in range(1, max_lines + 1):
+            self.clear()
+            _, _, stats = self.search(board.copy(), depth, multipv=lines)
+            previous = results[-1] if results else {"nodes": 0, "elapsed": 0.0}
+            results.append({
+                "multipv": lines,
+                "nodes": stats.nodes,
+                "elapsed": stats.elapsed,
+                "extra_nodes": stats.nodes - previous["nodes"],
+                "extra_elapsed": stats.elapsed - previous["elapsed"],
+            })
+        self.clear()
+        return results
+
+
+# The engine behind the module-level functions below, for callers that
+# need only one
+default_engine = Engine()
+
+
+def clear_tables():
+    default_engine.clear()
+
+
+def open_persistent_cache(path, size_mb=None):
+    return default_engine.open_persistent_cache(path, size_mb)
+
+
+def close_persistent_cache(merge=True):
+    default_engine.close_persistent_cache(merge)
+
+
+def search(board, depth, control=None, on_iteration=None, time_manager=None, search_moves=None, multipv=1):
+    return default_engine.search(board, depth, control, on_iteration, time_manager, search_moves, multipv)
+
+
+def principal_variation(board, max_length):
+    return default_engine.principal_variation(board, max_length)
+
+
+def find_best_move(board, depth, on_stats=None, time_manager=None, control=None):
+    return default_engine.find_best_move(board, depth, on_stats, time_manager, control)
+
+
+# The search scores positions from the side to move, so black uses the same
+# entry point; find_best_move2 is kept for existing callers.
+def find_best_move2(board, depth, on_stats=None, time_manager=None, control=None):
+    return find_best_move(board, depth, on_stats, time_manager, control)
+
+
+def multipv_cost(board, depth, max_lines):
+    return default_engine.multipv_cost(board, depth, max_lines)
+
+
+# Positions where pseudo-legal moves are most likely to go wrong, for
+# check_pseudo_legal on top of the bench.py positions
+PSEUDO_LEGAL_CHECK_FENS = [
+    "8/8/8/KPp4r/8/8/8/4k3 w - c6 0 1",  # the en passant capture exposes the king
+    "7k/5Q2/6K1/8/8/8/8/8 w - - 0 1",  # most queen moves stalemate
+    "4k3/4r3/8/8/8/8/4B3/4K3 w - - 0 1",  # pinned bishop
+    "r3k2r/8/8/8/8/8/8/R3K1qR w KQkq - 0 1",  # in check, no castling out of it
+    "6rk/6pp/8/6N1/8/8/8/6K1 w - - 0 1",  # smothered mate
+]
+
+
+def check_pseudo_legal(fens, depth, evaluator=None):
+    """Searches every position to depth with legal and with pseudo-legal moves, each from empty tables.
+
+    Returns one row per position: (fen, legal result, pseudo-legal result)
+    with results as (best move, score, nodes, seconds).
+    """
+    rows = []
+    for fen in fens:
+        results = []
+        for pseudo_legal in (False, True):
+            engine = Engine(evaluator, pseudo_legal=pseudo_legal)
+            best_move, score, stats = engine.search(chess.Board(fen), depth)
+            results.append((best_move, score, stats.nodes, stats.elapsed))
+        rows.append((fen, *results))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search one position and print the best lines.")
+    parser.add_argument("--fen", default=chess.STARTING_FEN)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--multipv", type=int, default=1, help="number of best moves to score")
+    parser.add_argument("--cost", action="store_true", help="also measure the marginal cost of each extra line")
+    parser.add_argument("--cache", help="persistent analysis cache file")
+    parser.add_argument("--nnue", help="evaluate with this network (see nnue.py) instead of MinMax")
+    parser.add_argument("--pseudo-legal", action="store_true", help="search pseudo-legal moves below the root")
+    parser.add_argument("--check-pseudo-legal", action="store_true",
+                        help="search the bench.py positions (and --fen) with legal and pseudo-legal moves "
+                             "and check both give the same move and score")
+    args = parser.parse_args()
+    default_engine.pseudo_legal = args.pseudo_legal
+    if args.nnue:
+        from nnue import NNUE
+        default_engine.set_evaluator(NNUE(args.nnue))
+    if args.cache:
+        open_persistent_cache(args.cache)
+
+    if args.check_pseudo_legal:
+        import bench
 
+        fens = [fen for _, _, fen in bench.POSITIONS] + PSEUDO_LEGAL_CHECK_FENS
+        if args.fen != chess.STARTING_FEN:
+            fens.append(args.fen)
+        mismatches = 0
+        times = [0.0, 0.0]
+        for fen, legal, pseudo_legal in check_pseudo_legal(fens, args.depth, default_engine.evaluator):
+            same = legal[:2] == pseudo_legal[:2]
+            mismatches += not same
+            times[0] += legal[3]
+            times[1] += pseudo_legal[3]
+            print(f"{'ok  ' if same else 'DIFF'} {fen}")
+            for name, (move, score, nodes, elapsed) in (("legal", legal), ("pseudo-legal", pseudo_legal)):
+                print(f"     {name:13} {move.uci() if move else '-':6} {score if score is not None else 0:+9.3f} "
+                      f"{nodes:8} nodes {elapsed:7.2f}s")
+        print(f"{len(fens) - mismatches}/{len(fens)} positions agree at depth {args.depth}; "
+              f"legal {times[0]:.2f}s, pseudo-legal {times[1]:.2f}s")
+        raise SystemExit(1 if mismatches else 0)
 
-def find_best_move2(board, depth):
-    best_move = None
-    max_eval = -float('inf')
-    alpha = -float('inf')
-    beta = float('inf')
+    board = chess.Board(args.fen)
+    _, _, stats = search(board, args.depth, multipv=args.multipv)
+    for index, (move, score, pv) in enumerate(stats.lines, 1):
+        print(f"{index}. {move.uci():6} {score:+8.2f}  {' '.join(m.uci() for m in pv)}")
+    print(f"depth {stats.depth}, {stats.nodes} nodes in {stats.elapsed:.2f}s, "
+          f"{stats.quiets_skipped}/{stats.move_loops} nodes done before generating quiet moves")
 
-    for move in board.legal_moves:
-        board.push(move)
-        eval = minimax2(board, depth - 1, alpha, beta, False)
-        board.pop()
-        if eval > max_eval:
-            max_eval = eval
-            best_move = move
-        alpha = max(alpha, eval)
+    if args.cost:
+        print("lines      nodes   +nodes     time    +time")
+        for row in multipv_cost(board, args.depth, args.multipv):
+            print(f"{row['multipv']:5} {row['nodes']:10} {row['extra_nodes']:8} "
+                  f"{row['elapsed']:7.2f}s {row['extra_elapsed']:7.2f}s")
 
-    return best_move
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import argparse
+import hashlib
+import os
+import random
+import time
+
+import chess
+import numpy as np
+
+# A small efficiently updatable network, evaluated with integer NumPy math:
+#
+#   768 inputs: one per (piece colour, piece type, square), seen from each
+#       side in turn: "own" pieces first and the board flipped for black, so
+#       both sides share the same feature transformer weights
+#   accumulator: ft_bias + the ft_weights rows of the pieces on the board,
+#       one vector of HIDDEN values per side
+#   output: clipped ReLU (0..QA) of [side to move, other side] accumulators,
+#       dot out_weights, plus out_bias; divided by QA * QB it's the score in
+#       pawns for the side to move
+#
+# A move only changes two to four inputs, so the search keeps a stack of
+# accumulators and updates them from the parent instead of summing all the
+# pieces again (see push/pop). Weights are stored as int16, the accumulator
+# as int32 so no sum of rows can overflow, and the output is summed in int64:
+# 255 * 32767 per hidden value overflows int32 beyond 256 of them.
+NNUE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nnue.npz")
+FORMAT_VERSION = 1
+INPUTS = 768
+DEFAULT_HIDDEN = 128
+QA = 255  # scale of the feature transformer, and the clipped ReLU ceiling
+QB = 64  # scale of the output weights
+
+
+def feature_index(perspective, color, piece_type, square):
+    if perspective == chess.BLACK:
+        square ^= 56
+    return ((color != perspective) * 6 + piece_type - 1) * 64 + square
+
+
+# FEATURE_ROWS[color][piece_type][square]: the inputs of a piece from white's
+# and black's point of view, to index both accumulator rows at once
+FEATURE_ROWS = [[[np.array([feature_index(chess.WHITE, color, piece_type, square),
+                            feature_index(chess.BLACK, color, piece_type, square)])
+                  for square in chess.SQUARES]
+                 for piece_type in range(7)]
+                for color in (chess.BLACK, chess.WHITE)]
+
+
+def active_features(board, perspective):
+    return [feature_index(perspective, piece.color, piece.piece_type, square)
+            for square, piece in board.piece_map().items()]
+
+
+def move_changes(board, move):
+    """(removed, added) pieces as (color, piece_type, square) when move is played; call before pushing it."""
+    if not move:
+        return [], []
+    color = board.turn
+    from_square = move.from_square
+    to_square = move.to_square
+    piece_type = board.piece_type_at(from_square)
+    if board.is_castling(move):
+        kingside = board.is_kingside_castling(move)
+        rank = chess.square_rank(from_square)
+        # Chess960 castling moves go to the rook's square
+        rook_from = to_square if board.piece_type_at(to_square) == chess.ROOK else chess.square(7 if kingside else 0, rank)
+        return ([(color, chess.KING, from_square), (color, chess.ROOK, rook_from)],
+                [(color, chess.KING, chess.square(6 if kingside else 2, rank)),
+                 (color, chess.ROOK, chess.square(5 if kingside else 3, rank))])
+    removed = [(color, piece_type, from_square)]
+    added = [(color, move.promotion or piece_type, to_square)]
+    if board.is_en_passant(move):
+        removed.append((not color, chess.PAWN, to_square - 8 if color == chess.WHITE else to_square + 8))
+    else:
+        captured = board.piece_type_at(to_square)
+        if captured:
+            removed.append((not color, captured, to_square))
+    return removed, added
+
+
+def save_network(path, ft_weights, ft_bias, out_weights, out_bias, **info):
+    """Writes a quantized network; info (training settings, losses) is stored next to it."""
+    np.savez(path, version=np.int32(FORMAT_VERSION),
+             ft_weights=np.asarray(ft_weights, dtype=np.int16), ft_bias=np.asarray(ft_bias, dtype=np.int16),
+             out_weights=np.asarray(out_weights, dtype=np.int16), out_bias=np.int32(out_bias),
+             info=np.array(repr(info)))
+
+
+def quantize(ft_weights, ft_bias, out_weights, out_bias):
+    """int16/int32 parameters of a network trained in floats (activations clipped to 0..1, output in pawns)."""
+    def to_int16(values, scale):
+        return np.clip(np.round(values * scale), -32767, 32767).astype(np.int16)
+
+    return (to_int16(ft_weights, QA), to_int16(ft_bias, QA), to_int16(out_weights, QB),
+            np.int32(np.round(out_bias * QA * QB)))
+
+
+class NNUE:
+    """Evaluator with the same evaluate_board as evaluations.MinMax, backed by the network in path.
+
+    Pass it to minmax.Engine; the engine then tells it about every move it
+    makes and takes back (incremental = True) so only the changed inputs
+    are updated. evaluate_board on any other board sums all its pieces.
+    """
+
+    incremental = True
+
+    def __init__(self, path=None):
+        self.path = path or NNUE_FILE
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"{self.path}: no network, train one with train_nnue.py")
+        with np.load(self.path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"{self.path}: network format {int(data['version'])}, expected {FORMAT_VERSION}")
+            self.ft_weights = data["ft_weights"]
+            self.ft_bias = data["ft_bias"]
+            self.out_weights = data["out_weights"]
+            self.out_bias = int(data["out_bias"])
+        self.hidden = len(self.ft_bias)
+        if self.ft_weights.shape != (INPUTS, self.hidden) or self.out_weights.shape != (2 * self.hidden,):
+            raise ValueError(f"{self.path}: unexpected network shapes")
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.ft_weights, self.ft_bias, self.out_weights, np.int32(self.out_bias)):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self._fingerprint = f"NNUE {self.hidden} {digest.hexdigest()}"
+        self._output_weights = self.out_weights.astype(np.int64)  # makes the output dot products int64
+        self._board = None
+        self._base = 0
+        self._stack = []  # [changes, accumulator or None until needed] per ply since reset()
+
+    def __getstate__(self):
+        return dict(self.__dict__, _board=None, _base=0, _stack=[])
+
+    def fingerprint(self):
+        """Identifies the network by its parameters, not its path (see MinMax.fingerprint)."""
+        return self._fingerprint
+
+    def refresh(self, board):
+        """Accumulator (2 x hidden, white's point of view first) of board from scratch."""
+        accumulator = np.empty((2, self.hidden), dtype=np.int32)
+        for row, perspective in enumerate((chess.WHITE, chess.BLACK)):
+            accumulator[row] = self.ft_bias
+            accumulator[row] += self.ft_weights[active_features(board, perspective)].sum(axis=0, dtype=np.int32)
+        return accumulator
+
+    # --- Incremental updates, driven by the search ---
+
+    def reset(self, board):
+        """Starts following board: the root of a search."""
+        self._board = board
+        self._base = len(board.move_stack)
+        self._stack = [[None, self.refresh(board)]]
+
+    def push(self, board, move):
+        # Only the changes are worked out here, the accumulator waits until a
+        # position below actually gets evaluated (most get a cutoff first)
+        self._stack.append([move_changes(board, move), None])
+
+    def pop(self):
+        self._stack.pop()
+
+    def accumulator(self, board):
+        if board is not self._board or len(board.move_stack) != self._base + len(self._stack) - 1:
+            return self.refresh(board)
+        stack = self._stack
+        index = len(stack) - 1
+        while stack[index][1] is None:
+            index -= 1
+        while index < len(stack) - 1:
+            accumulator = stack[index][1].copy()
+            index += 1
+            removed, added = stack[index][0]
+            for color, piece_type, square in removed:
+                accumulator -= self.ft_weights[FEATURE_ROWS[color][piece_type][square]]
+            for color, piece_type, square in added:
+                accumulator += self.ft_weights[FEATURE_ROWS[color][piece_type][square]]
+            stack[index][1] = accumulator
+        return stack[-1][1]
+
+    # --- Evaluation ---
+
+    def evaluate_checkmate_or_draw(self, board):
+        """Score of a finished game, None while it goes on."""
+        if board.is_seventyfive_moves() or board.is_insufficient_material() or board.is_fivefold_repetition():
+            return 0
+        # One pass over the legal moves instead of is_checkmate() and is_stalemate()
+        if not any(board.generate_legal_moves()):
+            if board.is_check():
+                return 1000 if board.turn == chess.BLACK else -1000
+            return 0
+        return None
+
+    def evaluate_board(self, board):
+        """Score in pawns from white's point of view, like MinMax.evaluate_board."""
+        terminal_score = self.evaluate_checkmate_or_draw(board)
+        if terminal_score is not None:
+            return terminal_score
+        accumulator = self.accumulator(board)
+        us, them = (0, 1) if board.turn == chess.WHITE else (1, 0)
+        hidden = self.hidden
+        output = (int(np.clip(accumulator[us], 0, QA) @ self._output_weights[:hidden])
+                  + int(np.clip(accumulator[them], 0, QA) @ self._output_weights[hidden:])
+                  + self.out_bias)
+        score = output / (QA * QB)
+        return score if board.turn == chess.WHITE else -score
+
+
+def check_incremental(evaluator, fens, plies=60, seed=0):
+    """Plays random moves from each position and compares the incremental accumulator with a full refresh.
+
+    Returns the number of mismatching positions.
+    """
+    rng = random.Random(seed)
+    mismatches = 0
+    for fen in fens:
+        board = chess.Board(fen)
+        evaluator.reset(board)
+        for _ in range(plies):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            evaluator.push(board, move)
+            board.push(move)
+            if not np.array_equal(evaluator.accumulator(board), evaluator.refresh(board)):
+                mismatches += 1
+        for _ in range(len(evaluator._stack) - 1):
+            board.pop()
+            evaluator.pop()
+            if not np.array_equal(evaluator.accumulator(board), evaluator.refresh(board)):
+                mismatches += 1
+    return mismatches
+
+
+def evals_per_second(evaluator, boards, iterations, incremental=False):
+    """evaluate_board calls per second on the positions, or with incremental one move deeper in each."""
+    start = time.perf_counter()
+    calls = 0
+    while calls < iterations:
+        for board in boards:
+            if not incremental:
+                evaluator.evaluate_board(board)
+                calls += 1
+                continue
+            evaluator.reset(board)
+            for move in board.legal_moves:
+                evaluator.push(board, move)
+                board.push(move)
+                evaluator.evaluate_board(board)
+                board.pop()
+                evaluator.pop()
+                calls += 1
+    elapsed = time.perf_counter() - start
+    return calls / elapsed if elapsed > 0 else 0.0
+
+
+def main():
+    import bench
+    import minmax
+    from evaluations import MinMax
+
+    parser = argparse.ArgumentParser(description="Check the network's incremental updates and compare its speed with MinMax.")
+    parser.add_argument("--file", default=NNUE_FILE, help="network file written by train_nnue.py")
+    parser.add_argument("--fen", action="append", help="position (repeatable, default: the bench.py positions)")
+    parser.add_argument("--iterations", type=int, default=2000, help="evaluations per measurement")
+    parser.add_argument("--depth", type=int, default=3, help="depth of the search speed comparison, 0 to skip it")
+    args = parser.parse_args()
+
+    fens = args.fen or [fen for _, _, fen in bench.POSITIONS]
+    network = NNUE(args.file)
+    handcrafted = MinMax()
+    mismatches = check_incremental(network, fens)
+    print(f"incremental updates: {'OK' if not mismatches else f'{mismatches} mismatches'}")
+
+    boards = [chess.Board(fen) for fen in fens]
+    minmax_rate = evals_per_second(handcrafted, boards, args.iterations)
+    print(f"MinMax          {minmax_rate:9.0f} evals/s")
+    full_rate = evals_per_second(network, boards, args.iterations)
+    print(f"NNUE (refresh)  {full_rate:9.0f} evals/s  x{full_rate / minmax_rate:.1f}")
+    incremental_rate = evals_per_second(network, boards, args.iterations, incremental=True)
+    print(f"NNUE (one move) {incremental_rate:9.0f} evals/s  x{incremental_rate / minmax_rate:.1f}")
+
+    if args.depth > 0:
+        for name, evaluator in (("MinMax", handcrafted), ("NNUE", network)):
+            nodes = elapsed = 0
+            for board in boards:
+                _, _, stats = minmax.Engine(evaluator).search(board.copy(), args.depth)
+                nodes += stats.nodes
+                elapsed += stats.elapsed
+            print(f"{name:15} {nodes:9} nodes in {elapsed:.2f}s, {nodes / elapsed:.0f} nodes/s at depth {args.depth}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
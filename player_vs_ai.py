@@ -1,10 +1,14 @@
 import pygame
+import assets
+from renderer import BoardRenderer
 from game import ChessGame  # Assumes ChessGame class is in game.py
 import chess
-from evaluations import MinMax  # Assumes MinMax class is in evaluations.py
-from minmax import find_best_move  # Assumes find_best_move function is in minmax.py
+from position_info import PositionInfo
+from minmax import find_best_move, mate_in, MAX_DEPTH  # Assumes find_best_move function is in minmax.py
+from time_manager import GameClock
+import game_events
+from game_events import AIWorker, MoveAnimation, wait_events
 
-pygame.init()
 
 # --- Constants for colors and dimensions ---
 WIDTH, HEIGHT = 640, 700
@@ -30,93 +34,74 @@ TEXT_COLOR_DRAW = (100, 100, 100) # Grey for draw message
 TEXT_COLOR_PHASE = (0, 150, 200) # Blue for game phase info
 
 INFO_PANEL_BG = (70, 70, 70) # Dark grey background for the info panel
+PANEL_RECT = pygame.Rect(0, WIDTH, WIDTH, INFO_PANEL_HEIGHT)
+PANEL_SEARCH_DEPTH = 0 # > 0 upgrades the panel score to a search of this depth in the background
+AI_MOVE_DELAY = 500 # ms the AI's piece takes to slide to its square; 0 plays the move instantly
 
 # --- Pygame Setup ---
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Enhanced Chess GUI (Player vs AI)")
-
-# Load images
+# The display, piece images and fonts come from the shared asset cache in setup(),
+# so the main menu can switch to this mode without reloading them.
+screen = None
 pieces = {}
-for color in ['w', 'b']:
-    for piece in ['P', 'R', 'N', 'B', 'Q', 'K']:
-        try:
-            img = pygame.image.load(f"images/{color}{piece}.png")
-            img = pygame.transform.scale(img, (SQUARE_SIZE, SQUARE_SIZE))
-            pieces[color + piece] = img
-        except pygame.error:
-            print(f"Error loading image: images/{color}{piece}.png. Make sure the 'images' folder exists and contains all piece images.")
-            # Fallback for missing images (you might want a placeholder)
-            pieces[color + piece] = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
-            pieces[color + piece].fill((100, 100, 100)) # Gray square as placeholder
-
-# --- Font Setup ---
-pygame.font.init()
-FONT_DEFAULT = pygame.font.SysFont("Arial", 28, bold=True)
-FONT_SCORE_PHASE = pygame.font.SysFont("Arial", 24, bold=True)
-FONT_MESSAGE = pygame.font.SysFont("Arial", 48, bold=True)
+FONT_DEFAULT = None
+FONT_SCORE_PHASE = None
+FONT_MESSAGE = None
+
+def setup():
+    global screen, pieces, FONT_DEFAULT, FONT_SCORE_PHASE, FONT_MESSAGE
+    screen = assets.get_display((WIDTH, HEIGHT), "Enhanced Chess GUI (Player vs AI)")
+    pieces = assets.get_piece_images(SQUARE_SIZE)
+    FONT_DEFAULT = assets.get_font("Arial", 28, bold=True)
+    FONT_SCORE_PHASE = assets.get_font("Arial", 24, bold=True)
+    FONT_MESSAGE = assets.get_font("Arial", 48, bold=True)
 
 # --- Drawing Functions ---
 
-def draw_info_panel(game):
+def draw_info_panel(game, position_info):
     """Draws the turn info, score, and game phase in the dedicated info panel."""
     # Fill the info panel background
     pygame.draw.rect(screen, INFO_PANEL_BG, (0, WIDTH, WIDTH, INFO_PANEL_HEIGHT))
 
     # --- Turn Info ---
     turn_text = "White's Turn" if game.is_white_turn() else "Black's Turn"
-    text_surface = FONT_DEFAULT.render(turn_text, True, TEXT_COLOR_WHITE)
+    text_surface = assets.render_text(FONT_DEFAULT, turn_text, TEXT_COLOR_WHITE)
     # Centered horizontally in the info panel
     text_rect = text_surface.get_rect(center=(WIDTH // 2, WIDTH + INFO_PANEL_HEIGHT // 2))
     screen.blit(text_surface, text_rect)
 
     # --- Score (Evaluation) ---
-    evaluator = MinMax()
-    score = evaluator.evaluate_board(game.board)
-
-    # Determine score text color
-    if score > 0:
-        score_color = TEXT_COLOR_WIN
-    elif score < 0:
-        score_color = TEXT_COLOR_LOSS
+    # Computed in the background; until it arrives the panel shows a placeholder
+    info = position_info.get(game.board)
+    if info is None:
+        score_text, score_color = "Score: ...", TEXT_COLOR_WHITE
+        phase_text = "Phase: ..."
     else:
-        score_color = TEXT_COLOR_WHITE
-
-    score_text = f"Score: {score:.2f}"
-    score_surface = FONT_SCORE_PHASE.render(score_text, True, score_color)
+        # Determine score text color
+        if info.score > 0:
+            score_color = TEXT_COLOR_WIN
+        elif info.score < 0:
+            score_color = TEXT_COLOR_LOSS
+        else:
+            score_color = TEXT_COLOR_WHITE
+        score_text = f"Score: {info.score:.2f}"
+        if mate_in(info.score) is not None:
+            score_text = f"Score: M{mate_in(info.score)}"
+        if info.depth:
+            score_text += f" (d{info.depth})"
+        phase_text = f"Phase: {info.phase.capitalize()}" # Capitalize the phase name
+
+    score_surface = assets.render_text(FONT_SCORE_PHASE, score_text, score_color)
     # Position on the left side of the info panel, slightly above center
     score_rect = score_surface.get_rect(midleft=(20, WIDTH + INFO_PANEL_HEIGHT // 2 - 15))
     screen.blit(score_surface, score_rect)
 
     # --- Game Phase ---
-    phase = evaluator.get_game_phase(game.board)
-    phase_text = f"Phase: {phase.capitalize()}" # Capitalize the phase name
-    phase_surface = FONT_SCORE_PHASE.render(phase_text, True, TEXT_COLOR_PHASE)
+    phase_surface = assets.render_text(FONT_SCORE_PHASE, phase_text, TEXT_COLOR_PHASE)
     # Position on the left side of the info panel, slightly below center
     phase_rect = phase_surface.get_rect(midleft=(20, WIDTH + INFO_PANEL_HEIGHT // 2 + 15))
     screen.blit(phase_surface, phase_rect)
 
 
-def highlight_square(square, color):
-    """Draws a semi-transparent colored overlay on a square."""
-    s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-    s.fill(color)
-    row = 7 - chess.square_rank(square)
-    col = chess.square_file(square)
-    screen.blit(s, (col * SQUARE_SIZE, row * SQUARE_SIZE))
-
-def highlight_legal_move(square, is_capture):
-    """Highlights legal moves, differentiating between empty squares and captures."""
-    if is_capture:
-        highlight_square(square, HIGHLIGHT_CAPTURE)
-    else:
-        row = 7 - chess.square_rank(square)
-        col = chess.square_file(square)
-        center_x = col * SQUARE_SIZE + SQUARE_SIZE // 2
-        center_y = row * SQUARE_SIZE + SQUARE_SIZE // 2
-        
-        pygame.draw.circle(screen, HIGHLIGHT_LEGAL_MOVE_DOT, (center_x, center_y), SQUARE_SIZE // 4)
-        pygame.draw.circle(screen, HIGHLIGHT_LEGAL_MOVE_RING, (center_x, center_y), SQUARE_SIZE // 5)
-
 def display_message(message, result_type):
     """Displays game over messages with a semi-transparent overlay."""
     overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -137,22 +122,29 @@ def display_message(message, result_type):
     screen.blit(text_surface, text_rect)
     pygame.display.flip()
 
-def draw_board(game):
-    """Draws the chessboard and pieces."""
-    colors = [pygame.Color(BOARD_LIGHT), pygame.Color(BOARD_DARK)]
-    for row in range(8):
-        for col in range(8):
-            color = colors[(row + col) % 2]
-            pygame.draw.rect(screen, color, pygame.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-            
-            square = chess.square(col, 7 - row)
-            piece = game.get_piece_at(square)
-            if piece:
-                color_letter = 'w' if piece.color == chess.WHITE else 'b'
-                img = pieces[color_letter + piece.symbol().upper()]
-                screen.blit(img, pygame.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-    
-    pygame.draw.rect(screen, BOARD_BORDER_COLOR, (0, 0, WIDTH, WIDTH), 3)
+def create_renderer():
+    return BoardRenderer(screen, SQUARE_SIZE, pieces, BOARD_LIGHT, BOARD_DARK, BOARD_BORDER_COLOR,
+                         dot_colors=[HIGHLIGHT_LEGAL_MOVE_DOT, HIGHLIGHT_LEGAL_MOVE_RING])
+
+def draw_board(renderer, game, selected_square, legal_moves_for_selected, animation=None):
+    """Draws the chessboard, pieces and highlights, repainting only the squares that changed."""
+    overlays = []
+    dots = set()
+    # Highlight king if in check
+    if game.is_check():
+        overlays.append((game.get_king_square(game.board.turn), CHECK_HIGHLIGHT))
+    if selected_square is not None:
+        overlays.append((selected_square, HIGHLIGHT_SELECTED))
+        for move in legal_moves_for_selected:
+            # Captures get a red overlay, empty squares a dot
+            if game.get_piece_at(move.to_square) is not None:
+                overlays.append((move.to_square, HIGHLIGHT_CAPTURE))
+            else:
+                dots.add(move.to_square)
+    floating = None
+    if animation is not None:
+        floating = (animation.piece, animation.move.from_square, animation.position(renderer))
+    renderer.draw(game.board, overlays, dots, floating)
 
 def get_square(pos):
     """Converts pixel coordinates to a chess.square object."""
@@ -161,68 +153,100 @@ def get_square(pos):
     row = 7 - (y // SQUARE_SIZE)
     return chess.square(col, row)
 
-def main():
+def run(on_first_frame=None):
+    """Plays until the window is closed (returns "quit") or Escape is pressed (returns "menu").
+
+    The loop sleeps in pygame.event.wait() until something happens: input,
+    the AI's move (searched on a worker thread), an animation tick, the
+    panel evaluation or the end of the game-over pause.
+    """
     game = ChessGame()
-    clock = pygame.time.Clock()
+    renderer = create_renderer()
+    panel_position = None # Position the info panel was last drawn for; None forces a full redraw
+    position_info = PositionInfo(PANEL_SEARCH_DEPTH, on_update=lambda: game_events.post(game_events.PANEL_READY))
+    ai = AIWorker()
+    animation = None # MoveAnimation of the AI's move while it slides into place
+    game_over = False
     running = True
+    exit_action = "quit"
     selected_square = None
     legal_moves_for_selected = [] 
 
     AI_DEPTH = 4 
+    AI_CLOCK = None # (seconds, increment) per side, e.g. (300, 2); None searches every move to AI_DEPTH
     PLAYER_COLOR = chess.BLACK 
+    clock_state = GameClock(*AI_CLOCK) if AI_CLOCK else None
+
+    def ai_search(board, control):
+        # Runs on the AI worker thread with its own copy of the board
+        if clock_state:
+            ai_color = board.turn
+            best_move = find_best_move(board, MAX_DEPTH, time_manager=clock_state.time_manager(ai_color), control=control)
+            clock_state.record_move(ai_color)
+            return best_move
+        return find_best_move(board, AI_DEPTH, control=control)
 
     while running:
       
-        if game.is_game_over():
+        if not game_over and game.is_game_over():
             result = game.get_result()
             display_message("Game Over! " + result, result)
-            pygame.time.wait(3000)
-            game.reset()
-            selected_square = None
-            legal_moves_for_selected = []
-            continue 
-
-        
-        screen.fill(INFO_PANEL_BG) 
-        draw_board(game)
-
-        
-        if game.is_check():
-            check_square = game.get_king_square(game.board.turn)
-            highlight_square(check_square, CHECK_HIGHLIGHT)
-        
-    
-        if selected_square is not None:
-            highlight_square(selected_square, HIGHLIGHT_SELECTED)
-            for move in legal_moves_for_selected:
-                target_square = move.to_square
-                is_capture = game.get_piece_at(target_square) is not None
-                highlight_legal_move(target_square, is_capture)
-
-        draw_info_panel(game)
-        pygame.display.flip()
-        clock.tick(60)
+            game_over = True
+            game_events.start_restart_timer()
 
         # --- AI Turn ---
-        if game.board.turn != PLAYER_COLOR: 
-            pygame.time.wait(500)
+        if not game_over and game.board.turn != PLAYER_COLOR and animation is None and not ai.busy():
             print("AI is thinking...") 
-            best_move = find_best_move(game.board, AI_DEPTH)
-            if best_move:
-                print(f"AI makes move: {best_move.uci()}") 
-                
-                game.try_move(best_move.from_square, best_move.to_square)
-           
+            ai.start(game.board.copy(), ai_search)
             selected_square = None
             legal_moves_for_selected = []
-            continue 
 
-        
-        for event in pygame.event.get():
+        if not game_over:
+            if panel_position is None:
+                screen.fill(INFO_PANEL_BG) 
+                renderer.invalidate()
+            draw_board(renderer, game, selected_square, legal_moves_for_selected, animation)
+
+            # The info panel only changes with the position or when its evaluation arrives
+            panel_rects = []
+            if (game.fen(), position_info.generation) != panel_position:
+                draw_info_panel(game, position_info)
+                panel_position = (game.fen(), position_info.generation)
+                panel_rects.append(PANEL_RECT)
+            renderer.present(panel_rects)
+        if on_first_frame is not None:
+            on_first_frame()
+            on_first_frame = None
+
+        for event in wait_events():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                exit_action = "menu"
+                running = False
+
+            elif event.type == game_events.GAME_RESTART:
+                game.reset()
+                clock_state = GameClock(*AI_CLOCK) if AI_CLOCK else None
+                selected_square = None
+                legal_moves_for_selected = []
+                panel_position = None
+                game_over = False
+
+            elif event.type == game_events.AI_MOVE_READY and event.search_id == ai.search_id:
+                best_move = event.move
+                if best_move:
+                    print(f"AI makes move: {best_move.uci()}") 
+                    animation = MoveAnimation(best_move, game.get_piece_at(best_move.from_square), AI_MOVE_DELAY)
+
+            elif event.type == game_events.ANIMATION_TICK and animation is not None and animation.done():
+                animation.stop()
+                game.try_move(animation.move.from_square, animation.move.to_square)
+                animation = None
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                if game_over or game.board.turn != PLAYER_COLOR:
+                    continue
                
                 mouse_y = pygame.mouse.get_pos()[1]
                 if mouse_y >= WIDTH: 
@@ -236,9 +260,7 @@ def main():
                     if piece and piece.color == PLAYER_COLOR:
                         selected_square = square
                 
-                        legal_moves_for_selected = [
-                            move for move in game.board.legal_moves if move.from_square == selected_square
-                        ]
+                        legal_moves_for_selected = game.moves_from(selected_square)
                 else:
                
                     move_made = False
@@ -254,9 +276,7 @@ def main():
                 
                         if piece and piece.color == PLAYER_COLOR:
                             selected_square = square 
-                            legal_moves_for_selected = [
-                                move for move in game.board.legal_moves if move.from_square == selected_square
-                            ]
+                            legal_moves_for_selected = game.moves_from(selected_square)
                         else: 
                             selected_square = None
                             legal_moves_for_selected = []
@@ -264,6 +284,15 @@ def main():
                         selected_square = None
                         legal_moves_for_selected = []
 
+    ai.cancel()
+    game_events.stop_timers()
+    position_info.close()
+    renderer.report("Player vs AI")
+    return exit_action
+
+def main():
+    setup()
+    run()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+import threading
+
+import chess
+
+from evaluations import MinMax
+
+MAX_ENTRIES = 4096
+
+
+class PanelEval:
+    """Score (white's point of view), phase name and the search depth behind the score."""
+
+    def __init__(self, score, phase, depth):
+        self.score = score
+        self.phase = phase
+        self.depth = depth
+
+
+class PositionInfo:
+    """Evaluates positions for the info panel on a background thread.
+
+    get() never blocks: it returns the cached PanelEval of the position, or
+    None while the worker is still on it. Only the newest request is kept,
+    so positions skipped over while the worker was busy are never evaluated.
+    With search_depth > 0 the static score is replaced by a shallow search
+    score once that finishes. generation changes whenever a result arrives,
+    and on_update (if given) is called from the worker thread right after.
+    """
+
+    def __init__(self, search_depth=0, on_update=None):
+        self.search_depth = search_depth
+        self.on_update = on_update
+        self.cache = {}
+        self.generation = 0
+        self.pending = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def get(self, board):
+        key = board._transposition_key()
+        entry = self.cache.get(key)
+        if entry is None or entry.depth < self.search_depth:
+            with self.condition:
+                if self.pending is None or self.pending[0] != key:
+                    self.pending = (key, board.copy())
+                    self.condition.notify()
+        return entry
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def _store(self, key, entry):
+        if len(self.cache) >= MAX_ENTRIES:
+            self.cache.clear()
+        self.cache[key] = entry
+        self.generation += 1
+        if self.on_update is not None:
+            self.on_update()
+
+    def _run(self):
+        evaluator = MinMax()
+        engine = None
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                key, board = self.pending
+                self.pending = None
+
+            entry = self.cache.get(key)
+            if entry is None:
+                entry = PanelEval(evaluator.evaluate_board(board), evaluator.get_game_phase(board), 0)
+                self._store(key, entry)
+
+            if self.search_depth > entry.depth and self.pending is None and not board.is_game_over():
+                import minmax
+                if engine is None:
+                    # Its own tables, so the panel never disturbs the game's searches
+                    engine = minmax.Engine(evaluator)
+                control = minmax.SearchControl()
+                # Give up on the search as soon as the position on screen changes
+                control.should_stop = lambda nodes: self.pending is not None or self.closed
+                _, score, stats = engine.search(board, self.search_depth, control)
+                # A proven mate ends the search early but is as good as the full depth
+                if stats.depth == self.search_depth or minmax.mate_in(score) is not None:
+                    white_score = score if board.turn == chess.WHITE else -score
+                    self._store(key, PanelEval(white_score, entry.phase, self.search_depth))
@@ -0,0 +1,159 @@
+import os
+import time
+
+import chess
+import pygame
+
+# CHESS_FULL_REDRAW=1 repaints every square on every frame (the old behaviour),
+# CHESS_FRAME_STATS=1 prints frame time and CPU use when a game loop ends.
+FULL_REDRAW = os.environ.get("CHESS_FULL_REDRAW") == "1"
+SHOW_FRAME_STATS = os.environ.get("CHESS_FRAME_STATS") == "1"
+
+
+class FrameStats:
+    def __init__(self):
+        self.frames = 0
+        self.draw_time = 0.0
+        self.dirty_pixels = 0
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def add(self, draw_time, dirty_pixels):
+        self.frames += 1
+        self.draw_time += draw_time
+        self.dirty_pixels += dirty_pixels
+
+    def summary(self, screen_pixels):
+        wall = max(time.perf_counter() - self.wall_start, 1e-9)
+        cpu = time.process_time() - self.cpu_start
+        frames = max(self.frames, 1)
+        return (f"{self.frames} frames, {self.draw_time / frames * 1000:.3f} ms drawing per frame, "
+                f"{self.dirty_pixels / frames / screen_pixels * 100:.1f}% of the screen updated per frame, "
+                f"CPU {cpu / wall * 100:.1f}%")
+
+
+class BoardRenderer:
+    """Draws the board from a pre-rendered background, repainting only changed squares.
+
+    Every square remembers what was last drawn on it (piece, overlays, move
+    dot); draw() repaints the squares whose state changed and present()
+    pushes just those rectangles to the display.
+    """
+
+    def __init__(self, screen, square_size, pieces, light, dark, border_color,
+                 dot_colors=None, border_width=3):
+        self.screen = screen
+        self.square_size = square_size
+        self.pieces = pieces
+        self.border_color = border_color
+        self.border_width = border_width
+        self.dot_colors = dot_colors or []
+        self.board_rect = pygame.Rect(0, 0, square_size * 8, square_size * 8)
+
+        self.background = pygame.Surface(self.board_rect.size).convert()
+        for row in range(8):
+            for col in range(8):
+                color = light if (row + col) % 2 == 0 else dark
+                self.background.fill(color, self.square_rect(chess.square(col, 7 - row)))
+
+        self.overlays = {}  # rgba -> pre-filled SRCALPHA surface
+        self.drawn = [None] * 64
+        self.floating_rect = None  # where the last frame's sliding piece was drawn
+        self.dirty = []
+        self.frame_start = None
+        self.stats = FrameStats()
+
+    def square_rect(self, square):
+        row = 7 - chess.square_rank(square)
+        col = chess.square_file(square)
+        return pygame.Rect(col * self.square_size, row * self.square_size, self.square_size, self.square_size)
+
+    def overlay(self, rgba):
+        surface = self.overlays.get(rgba)
+        if surface is None:
+            surface = pygame.Surface((self.square_size, self.square_size), pygame.SRCALPHA)
+            surface.fill(rgba)
+            self.overlays[rgba] = surface
+        return surface
+
+    def invalidate(self):
+        """Forgets what is on screen, e.g. after something was drawn over the board."""
+        self.drawn = [None] * 64
+        self.floating_rect = None
+
+    def draw(self, board, overlays=(), dots=(), floating=None):
+        """Repaints the squares that changed.
+
+        overlays is a sequence of (square, rgba) drawn in order over the
+        pieces; dots are the squares that get a legal-move marker.
+        floating is an optional (piece, from_square, topleft) for a piece
+        being animated: from_square is drawn empty and the piece on top of
+        everything at pixel position topleft.
+        """
+        self.frame_start = time.perf_counter()
+        square_overlays = {}
+        for square, rgba in overlays:
+            square_overlays.setdefault(square, []).append(rgba)
+
+        # Squares under the sliding piece, now or last frame, are repainted
+        covered = [self.floating_rect] if self.floating_rect else []
+        floating_rect = None
+        if floating is not None:
+            floating_rect = pygame.Rect(floating[2], (self.square_size, self.square_size))
+            covered.append(floating_rect)
+
+        for square in chess.SQUARES:
+            piece = None if floating is not None and square == floating[1] else board.piece_at(square)
+            state = (piece, tuple(square_overlays.get(square, ())), square in dots)
+            if state == self.drawn[square] and not FULL_REDRAW:
+                if not covered or self.square_rect(square).collidelist(covered) == -1:
+                    continue
+            self.drawn[square] = state
+            self._draw_square(square, *state)
+
+        if floating_rect is not None:
+            self.screen.blit(self._piece_image(floating[0]), floating_rect)
+            self.dirty.append(floating_rect)
+        self.floating_rect = floating_rect
+
+    def _piece_image(self, piece):
+        color_letter = 'w' if piece.color == chess.WHITE else 'b'
+        return self.pieces[color_letter + piece.symbol().upper()]
+
+    def _draw_square(self, square, piece, overlays, dot):
+        rect = self.square_rect(square)
+        self.screen.blit(self.background, rect, rect)
+        if piece:
+            self.screen.blit(self._piece_image(piece), rect)
+        for rgba in overlays:
+            self.screen.blit(self.overlay(rgba), rect)
+        if dot:
+            radius = self.square_size // 4
+            for color in self.dot_colors:
+                pygame.draw.circle(self.screen, color, rect.center, radius)
+                radius = self.square_size // 5
+
+        # Keep the frame around the board on top of the edge squares
+        if not self.board_rect.inflate(-2 * self.border_width, -2 * self.border_width).contains(rect):
+            self.screen.set_clip(rect)
+            pygame.draw.rect(self.screen, self.border_color, self.board_rect, self.border_width)
+            self.screen.set_clip(None)
+        self.dirty.append(rect)
+
+    def present(self, extra_rects=()):
+        """Updates the changed parts of the display and records the frame."""
+        dirty = self.dirty + list(extra_rects)
+        if FULL_REDRAW:
+            pygame.display.flip()
+            dirty_pixels = self.screen.get_width() * self.screen.get_height()
+        else:
+            if dirty:
+                pygame.display.update(dirty)
+            dirty_pixels = sum(rect.width * rect.height for rect in dirty)
+        if self.frame_start is not None:
+            self.stats.add(time.perf_counter() - self.frame_start, dirty_pixels)
+        self.dirty = []
+
+    def report(self, name):
+        if SHOW_FRAME_STATS:
+            print(f"[frames] {name}: {self.stats.summary(self.screen.get_width() * self.screen.get_height())}")
@@ -0,0 +1,106 @@
+import argparse
+import time
+
+import chess
+
+# Exchange values in pawns; the king is worth more than everything else
+# together so a capture that leaves it en prise never pays off.
+SEE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 100}
+
+
+def attackers_mask(board, square, occupied):
+    """Pieces of either colour attacking square when only occupied blocks sliders.
+
+    Taking pieces off occupied uncovers the sliders behind them (x-rays).
+    """
+    queens = board.queens
+    rooks_queens = (board.rooks | queens) & occupied
+    bishops_queens = (board.bishops | queens) & occupied
+    return occupied & (
+        (chess.BB_KING_ATTACKS[square] & board.kings)
+        | (chess.BB_KNIGHT_ATTACKS[square] & board.knights)
+        | (chess.BB_RANK_ATTACKS[square][chess.BB_RANK_MASKS[square] & occupied] & rooks_queens)
+        | (chess.BB_FILE_ATTACKS[square][chess.BB_FILE_MASKS[square] & occupied] & rooks_queens)
+        | (chess.BB_DIAG_ATTACKS[square][chess.BB_DIAG_MASKS[square] & occupied] & bishops_queens)
+        | (chess.BB_PAWN_ATTACKS[chess.WHITE][square] & board.pawns & board.occupied_co[chess.BLACK])
+        | (chess.BB_PAWN_ATTACKS[chess.BLACK][square] & board.pawns & board.occupied_co[chess.WHITE])
+    )
+
+
+def see(board, move):
+    """Static exchange evaluation of move: material won (in pawns) by the side making it.
+
+    Both sides keep recapturing on the target square with their least
+    valuable attacker, and either may stop when going on loses material.
+    Pins and checks are ignored. Non-captures score what the piece loses
+    if it is taken on its new square, or 0.
+    """
+    from_square = move.from_square
+    to_square = move.to_square
+    color = board.color_at(from_square)
+    occupied = board.occupied ^ chess.BB_SQUARES[from_square]
+
+    if board.is_en_passant(move):
+        gain = [SEE_VALUES[chess.PAWN]]
+        occupied ^= chess.BB_SQUARES[to_square - 8 if color == chess.WHITE else to_square + 8]
+    else:
+        captured = board.piece_type_at(to_square)
+        gain = [SEE_VALUES[captured] if captured else 0]
+    piece_value = SEE_VALUES[board.piece_type_at(from_square)]
+    if move.promotion:
+        gain[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+        piece_value = SEE_VALUES[move.promotion]
+
+    side = not color
+    while True:
+        side_attackers = attackers_mask(board, to_square, occupied) & board.occupied_co[side]
+        if not side_attackers:
+            break
+        for piece_type in chess.PIECE_TYPES:
+            attacker = side_attackers & board.pieces_mask(piece_type, side)
+            if attacker:
+                break
+        # Gain of the side now recapturing if the exchange stops right after it
+        gain.append(piece_value - gain[-1])
+        piece_value = SEE_VALUES[piece_type]
+        occupied ^= attacker & -attacker
+        side = not side
+
+    # Going backwards, each side only recaptures when that beats stopping
+    while len(gain) > 1:
+        last = gain.pop()
+        gain[-1] = -max(-gain[-1], last)
+    return gain[0]
+
+
+def benchmark(fens, repeat):
+    """Average microseconds per see() call over every capture of the positions."""
+    work = []
+    for fen in fens:
+        board = chess.Board(fen)
+        work.extend((board, move) for move in board.generate_legal_captures())
+    if not work:
+        return 0.0, 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, move in work:
+            see(board, move)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(work)) * 1e6, len(work)
+
+
+def main():
+    import bench
+
+    parser = argparse.ArgumentParser(description="Time see() on every capture of some positions "
+                                                 "(tests/test_see.py checks its results).")
+    parser.add_argument("--fen", action="append", help="position (repeatable, default: the bench.py positions)")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    per_call, captures = benchmark(args.fen or [fen for _, _, fen in bench.POSITIONS], args.repeat)
+    print(f"{per_call:.2f} us per call ({captures} captures x {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import struct
+import time
+
+import chess
+
+# One fixed-size little-endian record per position, no file header, so a
+# shard opens directly with numpy.memmap(path, dtype=record_dtype()):
+#   pieces    12 x uint64  bitboards: white P N B R Q K, then black P N B R Q K
+#   stm       uint8        side to move, 1 = white
+#   castling  uint8        bits: 1 white O-O, 2 white O-O-O, 4 black O-O, 8 black O-O-O
+#   ep        uint8        en passant square, 255 = none
+#   result    int8         game result from white's point of view: 1, 0, -1
+#   score     int16        search score in centipawns from white's point of view
+#   ply       uint16       ply of the position in its game
+RECORD_FORMAT = "<12QBBBbhH"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+NO_EP = 255
+SCORE_CLAMP = 32000
+
+DEFAULT_DEPTH = 2
+DEFAULT_RANDOM_PLIES = 8
+DEFAULT_MAX_PLIES = 300
+DEFAULT_SHARD_SIZE = 1_000_000  # records per shard file
+
+
+def record_dtype():
+    """numpy dtype of one record; numpy is only needed to read the data."""
+    import numpy as np
+
+    return np.dtype([
+        ("pieces", "<u8", (12,)),
+        ("stm", "u1"),
+        ("castling", "u1"),
+        ("ep", "u1"),
+        ("result", "i1"),
+        ("score", "<i2"),
+        ("ply", "<u2"),
+    ])
+
+
+def shard_paths(pattern):
+    """Non-empty shards matching pattern (a path or glob), in name order."""
+    return [path for path in sorted(glob.glob(pattern)) if os.path.getsize(path) >= RECORD_SIZE]
+
+
+def open_records(pattern):
+    """Memory-maps every shard matching pattern, in shard_paths order."""
+    import numpy as np
+
+    dtype = record_dtype()
+    return [np.memmap(path, dtype=dtype, mode="r", shape=(os.path.getsize(path) // RECORD_SIZE,))
+            for path in shard_paths(pattern)]
+
+
+def pack_position(board, score, ply):
+    """Record fields of board except the result, which pack_game adds once the game is over."""
+    pieces = [board.pieces_mask(piece_type, color)
+              for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+    castling = (board.has_kingside_castling_rights(chess.WHITE)
+                | board.has_queenside_castling_rights(chess.WHITE) << 1
+                | board.has_kingside_castling_rights(chess.BLACK) << 2
+                | board.has_queenside_castling_rights(chess.BLACK) << 3)
+    ep = board.ep_square if board.ep_square is not None else NO_EP
+    score = max(-SCORE_CLAMP, min(SCORE_CLAMP, int(round(score * 100))))
+    return pieces, board.turn == chess.WHITE, castling, ep, score, ply
+
+
+def pack_game(positions, result):
+    return b"".join(struct.pack(RECORD_FORMAT, *pieces, stm, castling, ep, result, score, ply)
+                    for pieces, stm, castling, ep, score, ply in positions)
+
+
+def board_from_record(record):
+    """Rebuilds a chess.Board from a record (a numpy record or the unpacked tuple)."""
+    if isinstance(record, tuple):
+        pieces, (stm, castling, ep) = record[:12], record[12:15]
+    else:
+        pieces, stm, castling, ep = record["pieces"], record["stm"], record["castling"], record["ep"]
+    board = chess.Board(None)
+    index = 0
+    for color in (chess.WHITE, chess.BLACK):
+        for piece_type in chess.PIECE_TYPES:
+            for square in chess.scan_forward(int(pieces[index])):
+                board.set_piece_at(square, chess.Piece(piece_type, color))
+            index += 1
+    board.turn = bool(stm)
+    rights = 0
+    for bit, square in ((1, chess.H1), (2, chess.A1), (4, chess.H8), (8, chess.A8)):
+        if int(castling) & bit:
+            rights |= chess.BB_SQUARES[square]
+    board.castling_rights = rights
+    board.ep_square = None if int(ep) == NO_EP else int(ep)
+    ply = int(record[17] if isinstance(record, tuple) else record["ply"])
+    board.fullmove_number = ply // 2 + 1
+    return board
+
+
+def play_game(seed, depth, random_plies, max_plies):
+    """Plays one engine game from a random opening; returns (record bytes, positions, result)."""
+    import minmax
+
+    rng = random.Random(seed)
+    board = chess.Board()
+    for _ in range(random_plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+    if board.is_game_over():
+        return b"", 0, 0
+
+    engine = minmax.Engine()  # fresh tables every game
+    positions = []
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        best_move, score, _ = engine.search(board, depth)
+        white_score = score if board.turn == chess.WHITE else -score
+        positions.append(pack_position(board, white_score, board.ply()))
+        board.push(best_move)
+
+    outcome = board.outcome(claim_draw=True)
+    result = 0
+    if outcome is not None and outcome.winner is not None:
+        result = 1 if outcome.winner == chess.WHITE else -1
+    return pack_game(positions, result), len(positions), result
+
+
+def _play(args):
+    return play_game(*args)
+
+
+class ShardWriter:
+    """Appends records to prefix-00000.bin, prefix-00001.bin, ... at most shard_size records each.
+
+    Continues the last existing shard, so several runs add up. A record
+    cut short by a crash at the end of a shard is dropped on open.
+    """
+
+    def __init__(self, prefix, shard_size):
+        self.prefix = prefix
+        self.shard_size = shard_size
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        existing = sorted(glob.glob(f"{glob.escape(prefix)}-[0-9][0-9][0-9][0-9][0-9].bin"))
+        self.index = int(existing[-1][-9:-4]) if existing else 0
+        self.file = None
+        self.count = 0
+        self._open()
+
+    def _path(self):
+        return f"{self.prefix}-{self.index:05d}.bin"
+
+    def _open(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self._path(), "ab")
+        size = self.file.tell()
+        if size % RECORD_SIZE:
+            self.file.truncate(size - size % RECORD_SIZE)
+            self.file.seek(0, os.SEEK_END)
+        self.count = self.file.tell() // RECORD_SIZE
+        if self.count >= self.shard_size:
+            self.index += 1
+            self._open()
+
+    def write(self, data):
+        """Writes whole records, starting a new shard whenever the current one is full."""
+        while data:
+            room = (self.shard_size - self.count) * RECORD_SIZE
+            chunk, data = data[:room], data[room:]
+            self.file.write(chunk)
+            self.count += len(chunk) // RECORD_SIZE
+            if self.count >= self.shard_size:
+                self.file.flush()
+                self.index += 1
+                self._open()
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate labelled positions from parallel engine self-play.")
+    parser.add_argument("--out", default="data/selfplay", help="shard prefix: PREFIX-00000.bin, ...")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--random-plies", type=int, default=DEFAULT_RANDOM_PLIES,
+                        help="random moves at the start of each game")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="records per shard file")
+    parser.add_argument("--seed", type=int, help="seed of the first game (default: random)")
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    jobs = [(seed + index, args.depth, args.random_plies, args.max_plies) for index in range(args.games)]
+    writer = ShardWriter(args.out, args.shard_size)
+    start = time.perf_counter()
+    positions = 0
+    results = {1: 0, 0: 0, -1: 0}
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for games, (data, count, result) in enumerate(pool.imap_unordered(_play, jobs), 1):
+                writer.write(data)
+                positions += count
+                results[result] += 1
+                elapsed = time.perf_counter() - start
+                print(f"\r{games}/{args.games} games, {positions} positions "
+                      f"({positions / elapsed:.1f}/s, {games / elapsed:.2f} games/s)", end="", flush=True)
+    finally:
+        writer.close()
+    print(f"\n+{results[1]} ={results[0]} -{results[-1]} (white's view), "
+          f"seeds {seed}..{seed + args.games - 1}, last shard {writer._path()}")
+
+
+if __name__ == "__main__":
+    main()
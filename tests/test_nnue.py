@@ -0,0 +1,117 @@
+import random
+
+import chess
+import numpy as np
+import pytest
+
+import nnue
+import selfplay
+import train_nnue
+
+# Positions where captures, castling, en passant and promotions are all close
+FENS = [
+    chess.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1P/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "r3k2r/1P4P1/8/8/8/8/1p4p1/R3K2R w KQkq - 0 1",
+    "4k3/8/8/8/2pP4/8/8/R3K2R b KQ d3 0 1",
+]
+
+
+def kind(board, move):
+    if board.is_castling(move):
+        return "castling"
+    if board.is_en_passant(move):
+        return "en passant"
+    if move.promotion:
+        return "promotion"
+    if board.is_capture(move):
+        return "capture"
+    return "quiet"
+
+
+@pytest.fixture
+def network(tmp_path):
+    rng = np.random.default_rng(0)
+    hidden = 32
+    path = tmp_path / "net.npz"
+    nnue.save_network(path, rng.integers(-300, 300, (nnue.INPUTS, hidden)), rng.integers(0, 200, hidden),
+                      rng.integers(-100, 100, 2 * hidden), 50)
+    return nnue.NNUE(str(path))
+
+
+def test_incremental_matches_refresh(network):
+    rng = random.Random(0)
+    seen = set()
+    for fen in FENS:
+        for _ in range(10):
+            board = chess.Board(fen)
+            network.reset(board)
+            for _ in range(40):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                # Favour the moves that change more than two inputs
+                special = [move for move in moves if kind(board, move) != "quiet"]
+                move = rng.choice(special if special and rng.random() < 0.7 else moves)
+                seen.add(kind(board, move))
+                network.push(board, move)
+                board.push(move)
+                assert np.array_equal(network.accumulator(board), network.refresh(board)), board.fen()
+            while len(network._stack) > 1:
+                board.pop()
+                network.pop()
+                assert np.array_equal(network.accumulator(board), network.refresh(board)), board.fen()
+    assert seen >= {"capture", "castling", "en passant", "promotion", "quiet"}
+
+
+def test_evaluate_board_matches_a_fresh_evaluator(network):
+    board = chess.Board(FENS[1])
+    network.reset(board)
+    for move in list(board.legal_moves):
+        network.push(board, move)
+        board.push(move)
+        expected = nnue.NNUE(network.path).evaluate_board(board)  # never reset: full refresh
+        assert network.evaluate_board(board) == expected
+        board.pop()
+        network.pop()
+
+
+def test_quantized_matches_float(tmp_path):
+    # The trainer's float network and its int16 export score the same
+    # positions alike, up to the rounding of the weights
+    float_network = train_nnue.Network(hidden=64, seed=1)
+    p = float_network.params
+    boards = []
+    rng = random.Random(1)
+    for fen in FENS:
+        board = chess.Board(fen)
+        for _ in range(20):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            boards.append(board.copy(stack=False))
+    data = selfplay.pack_game([selfplay.pack_position(board, 0, 0) for board in boards], 0)
+    records = np.frombuffer(data, dtype=selfplay.record_dtype())
+    expected = float_network.forward(*train_nnue.inputs(records))[2]
+
+    path = tmp_path / "quantized.npz"
+    nnue.save_network(path, *nnue.quantize(p["ft_weights"], p["ft_bias"], p["out_weights"], p["out_bias"]))
+    quantized = nnue.NNUE(str(path))
+    for board, score in zip(boards, expected):
+        if quantized.evaluate_checkmate_or_draw(board) is not None:
+            continue
+        got = quantized.evaluate_board(board)
+        if board.turn == chess.BLACK:
+            got = -got  # evaluate_board is from white's point of view, the network from the side to move's
+        assert got == pytest.approx(float(score), abs=0.05)
+
+
+def test_wide_networks_do_not_overflow(tmp_path):
+    hidden = 512
+    path = tmp_path / "wide.npz"
+    nnue.save_network(path, np.full((nnue.INPUTS, hidden), 300), np.full(hidden, 300),
+                      np.full(2 * hidden, 32767), 0)
+    score = nnue.NNUE(str(path)).evaluate_board(chess.Board())
+    assert score == pytest.approx(2 * hidden * nnue.QA * 32767 / (nnue.QA * nnue.QB))
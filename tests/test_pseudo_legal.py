@@ -0,0 +1,12 @@
+import pytest
+
+import bench
+import minmax
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_same_results_as_legal_search(depth):
+    fens = minmax.PSEUDO_LEGAL_CHECK_FENS + [fen for _, _, fen in bench.POSITIONS if depth < 3]
+    for fen, legal, pseudo_legal in minmax.check_pseudo_legal(fens, depth):
+        # (best move, score); node counts may differ
+        assert pseudo_legal[:2] == legal[:2], fen
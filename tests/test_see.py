@@ -0,0 +1,33 @@
+import chess
+import pytest
+
+from see import SEE_VALUES, see
+
+# Positions with a known exchange result: (fen, move, expected gain for the side making it)
+KNOWN_EXCHANGES = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 1),  # undefended pawn
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -2),  # defended three times, queen x-ray
+    ("4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5", 1),
+    ("4k3/8/2p5/3p4/8/8/8/3RK3 w - - 0 1", "d1d5", -4),  # rook for a pawn
+    ("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 1),  # doubled rooks: the x-ray wins the pawn
+    ("3rk3/3r4/8/3p4/8/8/8/3RK3 w - - 0 1", "d1d5", -4),  # outnumbered on the file
+    ("4k3/8/4b3/3p4/8/1Q6/8/4K3 w - - 0 1", "b3d5", -8),  # queen for a pawn
+    ("4k3/8/2b5/3p4/4B3/8/6Q1/4K3 w - - 0 1", "e4d5", 1),  # queen behind bishop on the diagonal
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 1),  # en passant
+    ("3rk3/4P3/8/8/8/8/8/4K3 w - - 0 1", "e7d8q", 4),  # capture with promotion, king takes back
+    ("4k3/8/8/3q4/8/8/3R4/3K4 w - - 0 1", "d2d5", 9),  # undefended queen
+    ("3k4/3q4/8/8/8/8/3R4/3K4 b - - 0 1", "d7d2", -4),  # queen for a rook
+    ("8/8/8/8/8/3k4/3R4/2K1Q3 b - - 0 1", "d3d2", -95),  # the king takes a defended rook: loses the king
+    ("4k3/8/8/8/3n4/8/2P5/4K3 w - - 0 1", "c2c3", 0),  # quiet move to a safe square
+    ("4k3/8/8/8/3n4/8/1P6/4K3 w - - 0 1", "b2b3", -1),  # pawn steps into the knight's reach
+    ("4k3/8/8/8/8/2n5/8/R3K3 w - - 0 1", "a1a2", -5),  # quiet rook move onto an attacked square
+]
+
+
+@pytest.mark.parametrize("fen, uci, expected", KNOWN_EXCHANGES)
+def test_known_exchange(fen, uci, expected):
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(uci)
+    assert board.is_pseudo_legal(move)
+    assert see(board, move) == expected
+
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import chess
+import pytest
+
+import minmax
+from time_manager import MOVE_OVERHEAD, GameClock, TimeManager
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def iteration_stats(*iterations):
+    """SearchStats stand-in: (best move, score, seconds, nodes) per completed iteration."""
+    stats = SimpleNamespace(iterations=[], effective_branching_factor=0.0)
+    for best_move, score, elapsed, nodes in iterations:
+        stats.iterations.append({"best_move": best_move, "score": score, "elapsed": elapsed, "nodes": nodes,
+                                 "best_move_share": 0.5})
+    if len(iterations) > 1:
+        stats.effective_branching_factor = iterations[-1][3] / iterations[-2][3]
+    return stats
+
+
+def test_budgets_from_the_clock():
+    manager = TimeManager(60, 0, moves_to_go=30, clock=FakeClock())
+    assert manager.soft == pytest.approx(2.0)
+    assert manager.hard == pytest.approx(8.0)
+    # Never more than what is left, less the overhead
+    short = TimeManager(0.5, 0, moves_to_go=1, clock=FakeClock())
+    assert short.hard <= 0.5 - MOVE_OVERHEAD + 1e-9
+
+
+def test_fixed_keeps_the_overhead():
+    manager = TimeManager.fixed(1.0, clock=FakeClock())
+    assert manager.soft == manager.hard == pytest.approx(1.0 - MOVE_OVERHEAD)
+
+
+def test_hard_deadline_follows_the_simulated_clock():
+    clock = FakeClock()
+    manager = TimeManager(60, 0, moves_to_go=30, clock=clock)
+    control = minmax.SearchControl()
+    manager.start(control)
+    assert not control.should_stop(0)
+    clock.advance(7.9)
+    assert not control.should_stop(0)
+    clock.advance(0.2)
+    assert control.should_stop(0)
+
+
+def test_stops_once_the_soft_budget_is_used():
+    clock = FakeClock()
+    manager = TimeManager(60, 0, moves_to_go=30, clock=clock)
+    manager.start()
+    moves = [(chess.Move.from_uci("e2e4"), 0.3, 0.1, 100 * 5 ** depth) for depth in range(1, 6)]
+    clock.advance(0.5)
+    assert manager.should_continue(iteration_stats(*moves[:1]))
+    clock.advance(1.6)
+    assert not manager.should_continue(iteration_stats(*moves[:2]))
+
+
+def test_best_move_change_stretches_the_soft_budget():
+    e4, d4 = chess.Move.from_uci("e2e4"), chess.Move.from_uci("d2d4")
+    clock = FakeClock()
+    stable = TimeManager(60, 0, moves_to_go=30, clock=clock)
+    changing = TimeManager(60, 0, moves_to_go=30, clock=clock)
+    stable.start()
+    changing.start()
+    clock.advance(1.0)
+    first = iteration_stats((e4, 0.3, 0.01, 100))
+    assert stable.should_continue(first) and changing.should_continue(first)
+    clock.advance(1.2)  # past the soft budget of 2s
+    assert not stable.should_continue(iteration_stats((e4, 0.3, 0.01, 100), (e4, 0.3, 0.01, 200)))
+    assert changing.should_continue(iteration_stats((e4, 0.3, 0.01, 100), (d4, 0.3, 0.01, 200)))
+    assert changing.stretch > 1
+
+
+def test_no_new_iteration_that_would_miss_the_hard_deadline():
+    clock = FakeClock()
+    manager = TimeManager(60, 0, moves_to_go=30, clock=clock)
+    manager.start()
+    e4 = chess.Move.from_uci("e2e4")
+    clock.advance(1.0)
+    # The next iteration would take about 2s x 5 = 10s, past the 8s hard budget
+    assert not manager.should_continue(iteration_stats((e4, 0.3, 0.2, 100), (e4, 0.3, 2.0, 500)))
+
+
+def test_single_legal_move_is_played_at_once():
+    manager = TimeManager(60, 0, moves_to_go=30, clock=FakeClock())
+    manager.start()
+    stats = iteration_stats((chess.Move.from_uci("e1f1"), 0.0, 0.01, 10))
+    assert not manager.should_continue(stats, legal_moves=1)
+
+
+def test_pondering_waits_for_the_clock_to_start():
+    manager = TimeManager(60, 0, moves_to_go=30, clock=FakeClock())
+    manager.pondering = True
+    stats = iteration_stats((chess.Move.from_uci("e2e4"), 0.3, 100.0, 100))
+    assert manager.should_continue(stats)
+
+
+def test_search_with_a_simulated_clock():
+    # Every reading of the clock costs a millisecond: the search has to
+    # stop on its own within the hard budget of simulated time
+    clock = FakeClock()
+
+    def ticking():
+        clock.advance(0.001)
+        return clock.now
+
+    manager = TimeManager(3, 0, moves_to_go=30, clock=ticking)
+    start = clock.now
+    best_move, _, stats = minmax.Engine().search(chess.Board(), minmax.MAX_DEPTH, time_manager=manager)
+    assert best_move in chess.Board().legal_moves
+    assert stats.depth >= 1
+    assert clock.now - start < manager.hard + 0.01
+
+
+def test_game_clock_charges_the_mover():
+    clock = FakeClock()
+    game = GameClock(10, 0.5, clock=clock)
+    game.time_manager(chess.WHITE)
+    clock.advance(2.0)
+    game.record_move(chess.WHITE)
+    assert game.remaining[chess.WHITE] == pytest.approx(8.5)
+    assert game.remaining[chess.BLACK] == 10
+    game.time_manager(chess.BLACK)
+    clock.advance(11.0)
+    game.record_move(chess.BLACK)
+    assert game.flagged(chess.BLACK)
@@ -0,0 +1,115 @@
+import time
+
+MOVE_OVERHEAD = 0.05  # seconds kept back for GUI/communication lag
+DEFAULT_MOVES_TO_GO = 30
+MIN_BUDGET = 0.01
+
+# How far the soft budget stretches or shrinks after an iteration
+BEST_MOVE_CHANGE_FACTOR = 1.5
+SCORE_DROP_FACTOR = 1.3
+SCORE_DROP_MARGIN = 0.3  # pawns
+DOMINANT_MOVE_FACTOR = 0.5
+DOMINANT_MOVE_SHARE = 0.85  # share of the root nodes spent on the best move
+DOMINANT_MOVE_STABILITY = 3  # iterations in a row with the same best move
+MAX_STRETCH = 2.5
+
+
+class TimeManager:
+    """Decides how long one move may take from the clock of the side to move.
+
+    The soft budget is checked between iterations: no new iteration starts
+    once it (stretched or shrunk by what the last iterations showed) is
+    used up, or when the next iteration is not expected to finish within
+    the hard budget. The hard budget is the deadline that aborts a running
+    iteration. clock can be replaced by a simulated clock in tests.
+    """
+
+    def __init__(self, time_left, increment=0.0, moves_to_go=None, move_overhead=MOVE_OVERHEAD,
+                 clock=time.perf_counter):
+        self.clock = clock
+        self.pondering = False
+        self.start_time = None
+        self.stretch = 1.0
+        self.stable_iterations = 0
+        self.last_best_move = None
+        self.last_score = None
+
+        usable = max(MIN_BUDGET, time_left - move_overhead)
+        moves = moves_to_go if moves_to_go else DEFAULT_MOVES_TO_GO
+        base = time_left / moves + increment * 0.75
+        self.soft = max(MIN_BUDGET, min(base, usable))
+        self.hard = max(self.soft, min(base * 4, usable * 0.4 if moves > 1 else usable))
+
+    @classmethod
+    def fixed(cls, seconds, move_overhead=MOVE_OVERHEAD, clock=time.perf_counter):
+        """Exactly seconds per move (less the overhead), as for UCI movetime."""
+        manager = cls(seconds, move_overhead=move_overhead, clock=clock)
+        manager.soft = manager.hard = max(MIN_BUDGET, seconds - move_overhead)
+        return manager
+
+    def start(self, control=None):
+        self.start_time = self.clock()
+        self.pondering = False
+        if control is not None:
+            # The deadline runs on the same clock as the budgets
+            control.clock = self.clock
+            control.deadline = self.start_time + self.hard
+
+    def elapsed(self):
+        return self.clock() - self.start_time if self.start_time is not None else 0.0
+
+    def should_continue(self, stats, legal_moves=None):
+        """Called after every completed iteration with the search statistics."""
+        if self.start_time is None:
+            return True  # still pondering
+        iteration = stats.iterations[-1]
+        best_move = iteration["best_move"]
+        score = iteration["score"]
+
+        if legal_moves == 1:
+            return False
+
+        if self.last_best_move is not None and best_move != self.last_best_move:
+            self.stretch = min(MAX_STRETCH, self.stretch * BEST_MOVE_CHANGE_FACTOR)
+            self.stable_iterations = 0
+        else:
+            self.stable_iterations += 1
+        if self.last_score is not None and score < self.last_score - SCORE_DROP_MARGIN:
+            self.stretch = min(MAX_STRETCH, self.stretch * SCORE_DROP_FACTOR)
+        if (self.stable_iterations >= DOMINANT_MOVE_STABILITY
+                and iteration.get("best_move_share", 0.0) >= DOMINANT_MOVE_SHARE):
+            self.stretch = max(DOMINANT_MOVE_FACTOR, self.stretch * DOMINANT_MOVE_FACTOR)
+        self.last_best_move = best_move
+        self.last_score = score
+
+        elapsed = self.elapsed()
+        if elapsed >= self.soft * self.stretch:
+            return False
+        # Don't start an iteration that would run into the hard deadline
+        branching = stats.effective_branching_factor or 5.0
+        return elapsed + iteration["elapsed"] * branching < self.hard
+
+
+class GameClock:
+    """Remaining time of both sides in a game played with base time + increment."""
+
+    def __init__(self, base, increment=0.0, clock=time.perf_counter):
+        self.increment = increment
+        self.clock = clock
+        self.remaining = {True: base, False: base}  # keyed by chess.WHITE / chess.BLACK
+        self.move_start = None
+
+    def time_manager(self, color):
+        """Starts color's clock and returns the TimeManager for its move."""
+        self.move_start = self.clock()
+        return TimeManager(self.remaining[color], self.increment, clock=self.clock)
+
+    def record_move(self, color):
+        """Stops color's clock after its move and adds the increment."""
+        if self.move_start is not None:
+            self.remaining[color] -= self.clock() - self.move_start
+            self.remaining[color] += self.increment
+        self.move_start = None
+
+    def flagged(self, color):
+        return self.remaining[color] <= 0
@@ -0,0 +1,344 @@
+import argparse
+import importlib
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chess
+import chess.pgn
+
+import minmax
+from time_manager import GameClock
+
+# A small spread of balanced openings; every one is played twice with colours swapped.
+DEFAULT_OPENINGS = [
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",    # 1.e4 e5 2.Nf3
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",      # Sicilian
+    "rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",      # French
+    "rnbqkbnr/pp1ppppp/2p5/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",      # Caro-Kann
+    "rnbqkbnr/ppp1pppp/8/3p4/2PP4/8/PP2PPPP/RNBQKBNR b KQkq - 0 2",      # Queen's Gambit
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",      # 1.d4 Nf6
+    "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1",        # English
+    "rnbqkbnr/pppp1ppp/8/4p3/2B1P3/8/PPPP1PPP/RNBQK1NR b KQkq - 1 2",    # Bishop's opening
+]
+
+MAX_PLIES = 200  # games still running after this many plies are adjudicated as draws
+RANDOM_PLIES = 4  # random moves added to every opening after the first round, so rounds don't repeat
+
+
+class EngineConfig:
+    """One side of the match, e.g. EngineConfig.parse("A", "depth=3,eval=evaluations:MinMax").
+
+    tc=BASE+INC plays on a clock (seconds) through the time manager; depth
+    then only caps the iterations.
+    """
+
+    def __init__(self, name, depth=3, eval_spec="evaluations:MinMax", time_control=None):
+        self.name = name
+        self.depth = depth
+        self.eval_spec = eval_spec
+        self.time_control = time_control
+
+    @classmethod
+    def parse(cls, name, text):
+        options = {}
+        for item in filter(None, text.split(",")):
+            key, _, value = item.partition("=")
+            options[key.strip()] = value.strip()
+        config = cls(name)
+        for key, value in options.items():
+            if key == "depth":
+                config.depth = int(value)
+            elif key == "eval":
+                config.eval_spec = value
+            elif key == "tc":
+                base, _, increment = value.partition("+")
+                config.time_control = (float(base), float(increment or 0))
+                if "depth" not in options:
+                    config.depth = minmax.MAX_DEPTH
+            else:
+                raise ValueError(f"Unknown engine option: {key}")
+        return config
+
+    def describe(self):
+        text = f"depth={self.depth},eval={self.eval_spec}"
+        if self.time_control:
+            text += f",tc={self.time_control[0]:g}+{self.time_control[1]:g}"
+        return text
+
+    def create_evaluator(self):
+        module_name, _, class_name = self.eval_spec.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)()
+
+
+    def create_engine(self):
+        return minmax.Engine(self.create_evaluator())
+
+
+# Per-process minmax.Engine of each configuration
+_worker_engines = {}
+
+
+def _engine_move(config, board, clock):
+    engine = _worker_engines.get(config.name)
+    if engine is None:
+        engine = _worker_engines[config.name] = config.create_engine()
+    if clock is None:
+        return engine.find_best_move(board, config.depth)
+    move = engine.find_best_move(board, config.depth, time_manager=clock.time_manager(board.turn))
+    clock.record_move(board.turn)
+    return move
+
+
+def play_game(index, fen, white, black, max_plies=MAX_PLIES):
+    """Plays one game in the current process and returns a summary dict."""
+    for config in (white, black):
+        _worker_engines.pop(config.name, None)  # fresh tables every game
+    board = chess.Board(fen)
+    clocks = {
+        chess.WHITE: GameClock(*white.time_control) if white.time_control else None,
+        chess.BLACK: GameClock(*black.time_control) if black.time_control else None,
+    }
+    moves = []
+    flagged = None
+    while not board.is_game_over(claim_draw=True) and len(moves) < max_plies:
+        config = white if board.turn == chess.WHITE else black
+        clock = clocks[board.turn]
+        move = _engine_move(config, board, clock)
+        if clock is not None and clock.flagged(board.turn):
+            flagged = board.turn
+            break
+        board.push(move)
+        moves.append(move.uci())
+
+    outcome = board.outcome(claim_draw=True)
+    if flagged is not None:
+        result = "0-1" if flagged == chess.WHITE else "1-0"
+        termination = "time forfeit"
+    else:
+        result = outcome.result() if outcome else "1/2-1/2"
+        termination = outcome.termination.name.lower() if outcome else "adjudication"
+    return {
+        "index": index,
+        "fen": fen,
+        "white": white.name,
+        "black": black.name,
+        "moves": moves,
+        "result": result,
+        "termination": termination,
+    }
+
+
+def game_to_pgn(summary, configs):
+    board = chess.Board(summary["fen"])
+    game = chess.pgn.Game()
+    game.setup(board)
+    game.headers["Event"] = "Engine match"
+    game.headers["Round"] = str(summary["index"] + 1)
+    game.headers["White"] = f"{summary['white']} ({configs[summary['white']].describe()})"
+    game.headers["Black"] = f"{summary['black']} ({configs[summary['black']].describe()})"
+    game.headers["Result"] = summary["result"]
+    game.headers["Termination"] = summary["termination"]
+    node = game
+    for uci in summary["moves"]:
+        node = node.add_variation(chess.Move.from_uci(uci))
+    return game
+
+
+def score_for(summary, name):
+    if summary["result"] == "1/2-1/2":
+        return 0.5
+    white_won = summary["result"] == "1-0"
+    return 1.0 if white_won == (summary["white"] == name) else 0.0
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class MatchStats:
+    """Win/draw/loss counts from engine A's point of view."""
+
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, score):
+        if score == 1.0:
+            self.wins += 1
+        elif score == 0.5:
+            self.draws += 1
+        else:
+            self.losses += 1
+
+    def score(self):
+        return (self.wins + 0.5 * self.draws) / self.games if self.games else 0.5
+
+    def variance(self):
+        s = self.score()
+        if not self.games:
+            return 0.0
+        return (self.wins * (1 - s) ** 2 + self.draws * (0.5 - s) ** 2 + self.losses * s ** 2) / self.games
+
+    def elo(self, z=1.96):
+        """Elo difference and its (low, high) confidence interval."""
+        s = self.score()
+        margin = z * math.sqrt(self.variance() / self.games) if self.games else 0.5
+        return elo_from_score(s), elo_from_score(s - margin), elo_from_score(s + margin)
+
+    def llr(self, elo0, elo1):
+        """Log-likelihood ratio of H1 (elo1) against H0 (elo0), normal approximation."""
+        variance = self.variance()
+        if not self.games or variance == 0:
+            return 0.0
+        s0 = 1 / (1 + 10 ** (-elo0 / 400))
+        s1 = 1 / (1 + 10 ** (-elo1 / 400))
+        return self.games * (s1 - s0) * (2 * self.score() - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def load_openings(path):
+    with open(path) as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+
+
+def vary_opening(fen, plies, rng):
+    """fen after plies random legal moves, None if the game ends on the way."""
+    board = chess.Board(fen)
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            return None
+        board.push(rng.choice(moves))
+    return None if board.is_game_over(claim_draw=True) else board.fen()
+
+
+def round_openings(openings, rounds, random_plies=RANDOM_PLIES, seed=0):
+    """The openings of every round: the book itself first, then random continuations of it.
+
+    The engines are deterministic, so replaying a position replays the
+    game; a repeated game would only make the error bars look smaller.
+    Every position is played once per pair of games, whatever the round.
+    """
+    rng = random.Random(seed)
+    seen = set(openings)
+    result = [list(openings)]
+    for _ in range(1, rounds):
+        if random_plies <= 0:
+            raise ValueError("more than one round needs random plies, the games would repeat")
+        varied = []
+        for fen in openings:
+            for _ in range(100):
+                candidate = vary_opening(fen, random_plies, rng)
+                if candidate is not None and candidate not in seen:
+                    seen.add(candidate)
+                    varied.append(candidate)
+                    break
+        result.append(varied)
+    return result
+
+
+def run_match(config_a, config_b, openings, rounds, workers, pgn_path=None,
+              sprt=None, max_plies=MAX_PLIES, report=print, random_plies=RANDOM_PLIES, seed=0):
+    """Plays rounds passes over the openings (two games each, colours swapped).
+
+    Rounds after the first start random_plies random moves into each
+    opening (see round_openings). sprt is an optional (elo0, elo1, alpha,
+    beta) tuple; the match stops as soon as the log-likelihood ratio
+    leaves the SPRT bounds.
+    """
+    configs = {config_a.name: config_a, config_b.name: config_b}
+    jobs = []
+    for fens in round_openings(openings, rounds, random_plies, seed):
+        for fen in fens:
+            jobs.append((fen, config_a, config_b))
+            jobs.append((fen, config_b, config_a))
+
+    stats = MatchStats()
+    decision = None
+    bounds = sprt_bounds(sprt[2], sprt[3]) if sprt else None
+    pgn_file = open(pgn_path, "a") if pgn_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(play_game, index, fen, white, black, max_plies)
+                for index, (fen, white, black) in enumerate(jobs)
+            ]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                summary = future.result()
+                stats.add(score_for(summary, config_a.name))
+                if pgn_file:
+                    print(game_to_pgn(summary, configs), file=pgn_file, end="\n\n")
+                    pgn_file.flush()
+
+                elo, low, high = stats.elo()
+                line = (f"game {stats.games}/{len(jobs)}: +{stats.wins} ={stats.draws} -{stats.losses}"
+                        f"  elo {elo:+.1f} [{low:+.1f}, {high:+.1f}]")
+                if sprt:
+                    llr = stats.llr(sprt[0], sprt[1])
+                    line += f"  llr {llr:.2f} ({bounds[0]:.2f}, {bounds[1]:.2f})"
+                    if llr <= bounds[0]:
+                        decision = "H0"
+                    elif llr >= bounds[1]:
+                        decision = "H1"
+                report(line)
+                if decision:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    finally:
+        if pgn_file:
+            pgn_file.close()
+    return stats, decision
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a headless match between two engine configurations.")
+    parser.add_argument("--engine-a", default="depth=3", help="e.g. depth=3,eval=evaluations:MinMax or tc=10+0.1")
+    parser.add_argument("--engine-b", default="depth=2")
+    parser.add_argument("--openings", help="file with one FEN per line (default: built-in list)")
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the opening list")
+    parser.add_argument("--random-plies", type=int, default=RANDOM_PLIES,
+                        help="random moves played into each opening in rounds after the first")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random opening moves")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES)
+    parser.add_argument("--pgn", help="append finished games to this PGN file")
+    parser.add_argument("--sprt", nargs=2, type=float, metavar=("ELO0", "ELO1"),
+                        help="stop early with an SPRT of elo0 against elo1")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    args = parser.parse_args()
+
+    config_a = EngineConfig.parse("A", args.engine_a)
+    config_b = EngineConfig.parse("B", args.engine_b)
+    openings = load_openings(args.openings) if args.openings else DEFAULT_OPENINGS
+    sprt = (args.sprt[0], args.sprt[1], args.alpha, args.beta) if args.sprt else None
+    if args.rounds > 1 and args.random_plies <= 0:
+        parser.error("--rounds > 1 needs --random-plies, the games would repeat")
+
+    print(f"A: {config_a.describe()}")
+    print(f"B: {config_b.describe()}")
+    stats, decision = run_match(config_a, config_b, openings, args.rounds, args.workers,
+                                args.pgn, sprt, args.max_plies, random_plies=args.random_plies, seed=args.seed)
+    elo, low, high = stats.elo()
+    print(f"Final: {stats.games} games, A scored {stats.score() * 100:.1f}%, "
+          f"elo {elo:+.1f} [{low:+.1f}, {high:+.1f}]")
+    if sprt:
+        print(f"SPRT: {'accept H1' if decision == 'H1' else 'accept H0' if decision == 'H0' else 'inconclusive'}")
+
+
+if __name__ == "__main__":
+    main()
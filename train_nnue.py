@@ -0,0 +1,145 @@
+import argparse
+import time
+
+import numpy as np
+
+import selfplay
+from nnue import DEFAULT_HIDDEN, INPUTS, NNUE_FILE, quantize, save_network
+
+SCORE_SCALE = 0.5  # sigmoid(SCORE_SCALE * pawns): 4 pawns up ~ 88% expected score
+MATE_CLAMP = 20  # pawns; self-play scores beyond this are mates, trained as this
+
+
+def load_records(pattern, positions, seed):
+    """A random sample of up to positions records of the shards (0 = all), in memory."""
+    shards = selfplay.open_records(pattern)
+    if not shards:
+        raise SystemExit(f"No self-play records match {pattern}")
+    total = sum(len(shard) for shard in shards)
+    rng = np.random.default_rng(seed)
+    fraction = min(1.0, positions / total) if positions else 1.0
+    records = [shard[:] if fraction >= 1.0 else shard[rng.random(len(shard)) < fraction] for shard in shards]
+    return np.concatenate(records)
+
+
+def inputs(records):
+    """Dense 0/1 inputs of the side to move and of the other side (records x 768 each), as in nnue.feature_index."""
+    count = len(records)
+    pieces = np.ascontiguousarray(records["pieces"], dtype="<u8")
+    # Bit n of a bitboard is square n: (records, 12 bitboards, 64 squares)
+    squares = np.unpackbits(pieces.view(np.uint8).reshape(count, 12, 8), axis=2, bitorder="little")
+    white = squares.reshape(count, INPUTS)
+    # Black's view: black pieces first, ranks flipped
+    flipped = squares.reshape(count, 12, 8, 8)[:, :, ::-1, :]
+    black = np.concatenate((flipped[:, 6:], flipped[:, :6]), axis=1).reshape(count, INPUTS)
+    white_to_move = records["stm"].astype(bool)[:, None]
+    us = np.where(white_to_move, white, black).astype(np.float32)
+    them = np.where(white_to_move, black, white).astype(np.float32)
+    return us, them
+
+
+def targets(records, score_weight):
+    """Expected score for the side to move: a blend of the search score and the game result."""
+    sign = np.where(records["stm"].astype(bool), 1.0, -1.0)
+    pawns = np.clip(records["score"] / 100, -MATE_CLAMP, MATE_CLAMP) * sign
+    result = (records["result"] * sign + 1) / 2
+    return (score_weight / (1 + np.exp(-SCORE_SCALE * pawns)) + (1 - score_weight) * result).astype(np.float32)
+
+
+class Network:
+    """The float network nnue.NNUE evaluates after quantize(): activations in 0..1, output in pawns."""
+
+    def __init__(self, hidden, seed):
+        rng = np.random.default_rng(seed)
+        self.params = {
+            "ft_weights": rng.normal(0, 1 / np.sqrt(32), (INPUTS, hidden)).astype(np.float32),
+            "ft_bias": np.full(hidden, 0.1, dtype=np.float32),
+            "out_weights": rng.normal(0, 1 / np.sqrt(2 * hidden), 2 * hidden).astype(np.float32),
+            "out_bias": np.zeros((), dtype=np.float32),
+        }
+        self.m = {name: np.zeros_like(value) for name, value in self.params.items()}
+        self.v = {name: np.zeros_like(value) for name, value in self.params.items()}
+        self.steps = 0
+
+    def forward(self, us, them):
+        p = self.params
+        pre = np.concatenate((us @ p["ft_weights"], them @ p["ft_weights"]), axis=1) + np.tile(p["ft_bias"], 2)
+        hidden = np.clip(pre, 0, 1)
+        return pre, hidden, hidden @ p["out_weights"] + p["out_bias"]
+
+    def loss(self, us, them, target):
+        output = self.forward(us, them)[2]
+        return float(np.mean((1 / (1 + np.exp(-SCORE_SCALE * output)) - target) ** 2))
+
+    def step(self, us, them, target, learning_rate):
+        """One Adam step on the mean squared error of sigmoid(SCORE_SCALE * output); returns the batch loss."""
+        p = self.params
+        pre, hidden, output = self.forward(us, them)
+        predicted = 1 / (1 + np.exp(-SCORE_SCALE * output))
+        error = predicted - target
+        d_output = 2 * error * predicted * (1 - predicted) * SCORE_SCALE / len(target)
+        d_hidden = np.outer(d_output, p["out_weights"]) * ((pre > 0) & (pre < 1))
+        size = len(p["ft_bias"])
+        gradients = {
+            "out_weights": hidden.T @ d_output,
+            "out_bias": d_output.sum(),
+            "ft_weights": us.T @ d_hidden[:, :size] + them.T @ d_hidden[:, size:],
+            "ft_bias": d_hidden[:, :size].sum(axis=0) + d_hidden[:, size:].sum(axis=0),
+        }
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        self.steps += 1
+        for name, gradient in gradients.items():
+            self.m[name] = beta1 * self.m[name] + (1 - beta1) * gradient
+            self.v[name] = beta2 * self.v[name] + (1 - beta2) * gradient ** 2
+            update = (self.m[name] / (1 - beta1 ** self.steps)) / (np.sqrt(self.v[name] / (1 - beta2 ** self.steps)) + epsilon)
+            p[name] = (p[name] - learning_rate * update).astype(np.float32)
+        return float(np.mean(error ** 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the NNUE evaluation network on self-play records.")
+    parser.add_argument("--data", default="data/selfplay-*.bin", help="self-play shards (glob)")
+    parser.add_argument("--positions", type=int, default=1_000_000, help="sample size, 0 = all")
+    parser.add_argument("--out", default=NNUE_FILE)
+    parser.add_argument("--hidden", type=int, default=DEFAULT_HIDDEN, help="accumulator size per side")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    parser.add_argument("--score-weight", type=float, default=0.5,
+                        help="share of the search score in the target, the rest is the game result")
+    parser.add_argument("--validation", type=float, default=0.05, help="share of the positions held out")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = load_records(args.data, args.positions, args.seed)
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(records))
+    held_out = int(len(records) * args.validation)
+    validation, training = records[order[:held_out]], records[order[held_out:]]
+    if not len(training):
+        raise SystemExit("No training positions")
+    validation_inputs = inputs(validation)
+    validation_targets = targets(validation, args.score_weight)
+    print(f"{len(training)} training positions, {len(validation)} held out")
+
+    network = Network(args.hidden, args.seed)
+    start = time.perf_counter()
+    for epoch in range(1, args.epochs + 1):
+        order = rng.permutation(len(training))
+        losses = []
+        for first in range(0, len(order), args.batch_size):
+            batch = training[order[first:first + args.batch_size]]
+            losses.append(network.step(*inputs(batch), targets(batch, args.score_weight), args.learning_rate))
+        validation_loss = network.loss(*validation_inputs, validation_targets) if held_out else float("nan")
+        print(f"epoch {epoch}: loss {np.mean(losses):.6f}, validation {validation_loss:.6f} "
+              f"({time.perf_counter() - start:.1f}s)")
+
+    p = network.params
+    save_network(args.out, *quantize(p["ft_weights"], p["ft_bias"], p["out_weights"], p["out_bias"]),
+                 positions=len(training), epochs=args.epochs, score_weight=args.score_weight,
+                 validation_loss=round(validation_loss, 6))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
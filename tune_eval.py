@@ -0,0 +1,148 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import selfplay
+from evaluations import FEATURE_NAMES, MinMax, load_weights, save_weights, WEIGHTS_FILE
+
+CHUNK_SIZE = 2000  # positions per feature-extraction task
+
+
+def extract_chunk(task):
+    """Runs in a worker: feature rows and labels for some records of one shard."""
+    path, rows = task
+    records = selfplay.open_records(path)[0][rows]
+    evaluator = MinMax()
+    features = np.zeros((len(records), len(FEATURE_NAMES)), dtype=np.float32)
+    labels = np.zeros(len(records), dtype=np.float32)
+    keep = np.zeros(len(records), dtype=bool)
+    for index, record in enumerate(records):
+        board = selfplay.board_from_record(record)
+        # Mates and draws are scored outside the feature vector
+        if board.is_game_over() or evaluator.evaluate_checkmate_or_draw(board) != 0:
+            continue
+        features[index] = evaluator.features(board)
+        labels[index] = (int(record["result"]) + 1) / 2
+        keep[index] = True
+    return features[keep], labels[keep]
+
+
+def extract_features(pattern, positions, workers, seed):
+    """Feature matrix (positions x features) and game results (1, 0.5, 0) of a random sample of the shards."""
+    paths = selfplay.shard_paths(pattern)
+    shards = selfplay.open_records(pattern)
+    if not shards:
+        raise SystemExit(f"No self-play records match {pattern}")
+    total = sum(len(shard) for shard in shards)
+    rng = np.random.default_rng(seed)
+    fraction = min(1.0, positions / total) if positions else 1.0
+
+    tasks = []
+    for path, shard in zip(paths, shards):
+        rows = np.arange(len(shard)) if fraction >= 1.0 else np.flatnonzero(rng.random(len(shard)) < fraction)
+        for start in range(0, len(rows), CHUNK_SIZE):
+            tasks.append((path, rows[start:start + CHUNK_SIZE]))
+
+    features, labels = [], []
+    done = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for chunk_features, chunk_labels in pool.imap(extract_chunk, tasks):
+            features.append(chunk_features)
+            labels.append(chunk_labels)
+            done += len(chunk_labels)
+            elapsed = time.perf_counter() - start
+            print(f"\rfeatures: {done} positions ({done / elapsed:.0f}/s)", end="", flush=True)
+    print()
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def loss(features, labels, weights, k):
+    predicted = 1 / (1 + np.exp(-k * (features @ weights)))
+    return float(np.mean((predicted - labels) ** 2))
+
+
+def fit_k(features, labels, weights):
+    """Scaling of eval (pawns) to expected score that best fits the current weights."""
+    best_k = None
+    best_loss = None
+    low, high = 0.01, 5.0
+    for _ in range(4):
+        for k in np.linspace(low, high, 25):
+            current = loss(features, labels, weights, k)
+            if best_loss is None or current < best_loss:
+                best_k, best_loss = k, current
+        step = (high - low) / 24
+        low, high = max(1e-4, best_k - step), best_k + step
+    return float(best_k)
+
+
+def tune(features, labels, weights, k, iterations, learning_rate, fixed=(), report_every=100):
+    """Full-batch Adam on the mean squared error between sigmoid(k * eval) and the game results."""
+    weights = np.array(weights, dtype=np.float64)
+    free = np.array([name not in fixed for name in FEATURE_NAMES], dtype=np.float64)
+    features = features.astype(np.float64)
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    n = len(labels)
+    for step in range(1, iterations + 1):
+        predicted = 1 / (1 + np.exp(-k * (features @ weights)))
+        error = predicted - labels
+        gradient = features.T @ (error * predicted * (1 - predicted)) * (2 * k / n) * free
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        weights -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + epsilon)
+        if report_every and step % report_every == 0:
+            print(f"iteration {step}: loss {float(np.mean(error ** 2)):.6f}")
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the evaluation weights on self-play results (Texel method).")
+    parser.add_argument("--data", default="data/selfplay-*.bin", help="self-play shards (glob)")
+    parser.add_argument("--positions", type=int, default=1_000_000, help="sample size, 0 = all")
+    parser.add_argument("--features", help="cache file for the extracted features (.npz); reused when it exists")
+    parser.add_argument("--start", help="weights file to start from (default: current weights)")
+    parser.add_argument("--out", default=WEIGHTS_FILE)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--learning-rate", type=float, default=0.01)
+    parser.add_argument("--fix", nargs="*", default=["pawn_mg", "pawn_eg"], help="features whose weight stays as it is")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    unknown = set(args.fix) - set(FEATURE_NAMES)
+    if unknown:
+        parser.error(f"unknown features: {', '.join(sorted(unknown))}")
+
+    if args.features and os.path.exists(args.features):
+        data = np.load(args.features)
+        features, labels = data["features"], data["labels"]
+        print(f"Loaded {len(labels)} positions from {args.features}")
+    else:
+        features, labels = extract_features(args.data, args.positions, args.workers, args.seed)
+        if args.features:
+            np.savez(args.features, features=features, labels=labels)
+
+    weights = np.array(load_weights(args.start), dtype=np.float64)
+    start = time.perf_counter()
+    k = fit_k(features, labels, weights)
+    loss_before = loss(features, labels, weights, k)
+    print(f"{len(labels)} positions, k = {k:.4f}, loss {loss_before:.6f}")
+
+    tuned = tune(features, labels, weights, k, args.iterations, args.learning_rate, args.fix)
+    loss_after = loss(features, labels, tuned, k)
+    print(f"loss {loss_before:.6f} -> {loss_after:.6f} in {time.perf_counter() - start:.1f}s")
+    for name, old, new in zip(FEATURE_NAMES, weights, tuned):
+        print(f"  {name:22} {old:8.3f} -> {new:8.3f}")
+
+    save_weights(args.out, tuned, k=round(k, 6), positions=int(len(labels)),
+                 loss_before=round(loss_before, 6), loss_after=round(loss_after, 6))
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import sys
+import threading
+import time
+
+import chess
+
+import minmax
+from evaluations import MinMax
+from time_manager import TimeManager
+
+ENGINE_NAME = "Chess-AI"
+ENGINE_AUTHOR = "josephchamoun"
+
+DEFAULT_HASH_MB = 64
+TT_ENTRY_BYTES = 200  # rough size of one transposition table entry in CPython
+MAX_MULTIPV = 32
+
+
+def score_to_uci(score):
+    mate = minmax.mate_in(score)
+    if mate is not None:
+        return f"mate {mate}"
+    return f"cp {int(round(score * 100))}"
+
+
+class UciEngine:
+    """Reads UCI commands and runs the search on a worker thread."""
+
+    def __init__(self, output=sys.stdout, engine=None):
+        self.output = output
+        self.engine = engine if engine is not None else minmax.Engine()
+        self.board = chess.Board()
+        self.thread = None
+        self.control = None
+        self.release = None  # set once the search may report bestmove
+        self.time_manager = None
+        self.stop_on_ponderhit = False
+        self.multipv = 1
+        self.output_lock = threading.Lock()
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    # --- Commands ---
+
+    def uci(self):
+        self.send(f"id name {ENGINE_NAME}")
+        self.send(f"id author {ENGINE_AUTHOR}")
+        self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max 4096")
+        self.send("option name Threads type spin default 1 min 1 max 1")
+        self.send(f"option name MultiPV type spin default 1 min 1 max {MAX_MULTIPV}")
+        self.send("option name CacheFile type string default <empty>")
+        self.send("option name EvalFile type string default <empty>")
+        self.send("uciok")
+
+    def setoption(self, tokens):
+        text = " ".join(tokens)
+        name, _, value = text.partition(" value ")
+        name = name.replace("name", "", 1).strip().lower()
+        if name == "hash":
+            self.engine.tt_max_entries = max(1, int(value)) * 1024 * 1024 // TT_ENTRY_BYTES
+            self.engine.transposition_table.clear()
+        elif name == "multipv":
+            self.multipv = max(1, min(MAX_MULTIPV, int(value)))
+        elif name == "cachefile":
+            # Persistent analysis cache; merged on ucinewgame and at exit
+            value = value.strip()
+            if value and value != "<empty>":
+                self.engine.open_persistent_cache(value)
+            else:
+                self.engine.close_persistent_cache()
+        elif name == "evalfile":
+            # NNUE network (see nnue.py); empty goes back to the handcrafted evaluation
+            value = value.strip()
+            if value and value != "<empty>":
+                from nnue import NNUE
+                try:
+                    evaluator = NNUE(value)
+                except (OSError, ValueError) as error:
+                    self.send(f"info string {error}")
+                    return
+            else:
+                evaluator = MinMax()
+            self.engine.set_evaluator(evaluator)
+        elif name == "threads":
+            # The search is single threaded; the option exists so GUIs can set it.
+            pass
+
+    def position(self, tokens):
+        if not tokens:
+            return
+        if tokens[0] == "startpos":
+            board = chess.Board()
+            rest = tokens[1:]
+        elif tokens[0] == "fen":
+            fen_end = tokens.index("moves") if "moves" in tokens else len(tokens)
+            board = chess.Board(" ".join(tokens[1:fen_end]))
+            rest = tokens[fen_end:]
+        else:
+            return
+        if rest and rest[0] == "moves":
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        self.board = board
+
+    def go(self, tokens):
+        self.stop()
+        params = {}
+        flags = set()
+        search_moves = []
+        index = 0
+        while index < len(tokens):
+            token = tokens[index]
+            if token in ("infinite", "ponder"):
+                flags.add(token)
+                index += 1
+            elif token == "searchmoves":
+                # Moves up to the next keyword; ones illegal here are ignored
+                index += 1
+                while index < len(tokens):
+                    try:
+                        move = chess.Move.from_uci(tokens[index])
+                    except ValueError:
+                        break
+                    if self.board.is_legal(move):
+                        search_moves.append(move)
+                    index += 1
+            else:
+                if index + 1 < len(tokens):
+                    params[token] = int(tokens[index + 1])
+                index += 2
+
+        depth = params.get("depth", minmax.MAX_DEPTH)
+        time_manager = None
+        time_key, inc_key = ("wtime", "winc") if self.board.turn == chess.WHITE else ("btime", "binc")
+        if "movetime" in params:
+            time_manager = TimeManager.fixed(params["movetime"] / 1000)
+        elif time_key in params:
+            time_manager = TimeManager(params[time_key] / 1000, params.get(inc_key, 0) / 1000,
+                                       params.get("movestogo"))
+        if time_manager is not None and "ponder" in flags:
+            time_manager.pondering = True  # the clock starts on ponderhit
+        # Pondering without any limit would never end after ponderhit: move
+        # with what the ponder search found instead
+        self.stop_on_ponderhit = ("ponder" in flags and time_manager is None
+                                  and "depth" not in params and "nodes" not in params)
+
+        control = minmax.SearchControl(max_nodes=params.get("nodes"))
+        self.control = control
+        self.time_manager = time_manager
+        # UCI forbids sending bestmove during "go infinite" or while pondering
+        self.release = threading.Event()
+        if not flags:
+            self.release.set()
+        self.thread = threading.Thread(target=self._search,
+                                       args=(self.board.copy(), depth, control, time_manager, self.release,
+                                             search_moves or None),
+                                       daemon=True)
+        self.thread.start()
+
+    def ponderhit(self):
+        if self.control is None:
+            return
+        if self.time_manager is not None:
+            self.time_manager.start(self.control)
+        if self.stop_on_ponderhit:
+            self.control.stop()
+        self.release.set()
+
+    def stop(self):
+        if self.control is not None:
+            self.control.stop()
+            self.release.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.thread = None
+        self.control = None
+        self.time_manager = None
+
+    # --- Search thread ---
+
+    def _search(self, board, depth, control, time_manager, release, search_moves=None):
+        start = time.perf_counter()
+
+        def report(stats, pv):
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            hashfull = min(1000, len(self.engine.transposition_table) * 1000 // max(1, self.engine.tt_max_entries))
+            # One info line per MultiPV line, all from the same iteration
+            for index, (_, score, line) in enumerate(stats.lines, 1):
+                self.send(
+                    f"info depth {stats.depth} seldepth {stats.seldepth} multipv {index} score {score_to_uci(score)}"
+                    f" nodes {stats.nodes} nps {int(stats.nodes / elapsed)} time {int(elapsed * 1000)}"
+                    f" hashfull {hashfull} pv {' '.join(move.uci() for move in line)}"
+                )
+
+        best_move, _, stats = self.engine.search(board, depth, control, on_iteration=report,
+                                                 time_manager=time_manager, search_moves=search_moves,
+                                                 multipv=self.multipv)
+
+        release.wait()
+        if best_move is None:
+            self.send("bestmove 0000")
+            return
+        board.push(best_move)
+        pv = self.engine.principal_variation(board, 1)
+        board.pop()
+        if pv:
+            self.send(f"bestmove {best_move.uci()} ponder {pv[0].uci()}")
+        else:
+            self.send(f"bestmove {best_move.uci()}")
+
+    # --- Main loop ---
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        try:
+            return self.dispatch(command, args)
+        except (ValueError, OSError) as error:
+            # Bad input from the GUI (a FEN, an illegal move, a number):
+            # report it and keep going with the previous state
+            self.send(f"info string {command}: {error}")
+            return True
+
+    def dispatch(self, command, args):
+        if command == "uci":
+            self.uci()
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.setoption(args)
+        elif command == "ucinewgame":
+            self.stop()
+            self.engine.clear()
+            self.board = chess.Board()
+        elif command == "position":
+            self.position(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "ponderhit":
+            self.ponderhit()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def run(self, stream=sys.stdin):
+        for line in stream:
+            if not self.handle(line.strip()):
+                return
+        # End of input: let a bounded search finish, interrupt an infinite one
+        if self.release is not None and self.release.is_set() and self.thread is not None:
+            self.thread.join()
+        self.stop()
+
+
+def main():
+    UciEngine().run()
+
+
+if __name__ == "__main__":
+    main()